@@ -0,0 +1,169 @@
+"""
+================================================================================
+NIAGARA AUTH PIPELINE v2.0
+================================================================================
+Logs in to upcoming districts while earlier districts are downloading.
+
+A multi-district run used to log in right before each district's downloads,
+so every district added ~15 s of browser time to the run. The pipeline
+starts the logins for the next few districts (AUTH_LOOKAHEAD) on a bounded
+pool (AUTH_WORKERS browsers at a time) as soon as the run begins; when the
+download loop reaches a district its cookies are usually ready and are
+handed to process_district(session_cookies=...).
+
+    - only AUTH_LOOKAHEAD districts ahead of the one being downloaded are
+      logged in, so sessions are not left idle long enough to expire
+    - cookies that waited longer than REVALIDATE_AFTER are checked with
+      NiagaraAuth.validate_session() and renewed if the station dropped them
+    - the login function is pluggable (SessionCache.get in the scheduler, a
+      stub in tests); the default is a headless Selenium login
+    - the browser goes back to the pool after the login; process_district()
+      takes it out again for page toggling when toggle_interval > 0
+
+USAGE:
+    pipeline = AuthPipeline(districts, headless=True)
+    for district in districts:
+        cookies = pipeline.get(district)    # waits only if still logging in
+        process_district(district, session_cookies=cookies)
+    pipeline.close()
+================================================================================
+"""
+
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from logging_config import get_logger
+
+logger = get_logger("auth_pipeline")
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+AUTH_WORKERS = 3             # concurrent logins (browsers)
+AUTH_LOOKAHEAD = 3           # districts logged in ahead of the current one
+REVALIDATE_AFTER = 5 * 60    # seconds before ready cookies are re-checked
+
+Cookies = Dict[str, str]
+LoginFunc = Callable[[str, bool], Optional[Cookies]]
+
+
+def browser_login(district: str, headless: bool = True) -> Optional[Cookies]:
+    """Selenium login for one district (browser returned to the pool afterwards)."""
+    from niagara_auth import NiagaraAuth
+
+    auth = NiagaraAuth(district)
+    try:
+        return auth.login(headless=headless)
+    finally:
+        auth.close()
+
+
+def session_is_valid(district: str, cookies: Cookies) -> bool:
+    """Check cookies against the district's station."""
+    from niagara_auth import NiagaraAuth
+    return NiagaraAuth(district).validate_session(cookies)
+
+
+# ============================================================================
+# PIPELINE
+# ============================================================================
+class AuthPipeline:
+    """Bounded look-ahead logins for a list of districts."""
+
+    def __init__(
+        self,
+        districts: Sequence[str],
+        headless: bool = True,
+        workers: int = AUTH_WORKERS,
+        lookahead: int = AUTH_LOOKAHEAD,
+        login: LoginFunc = browser_login,
+        validate: Callable[[str, Cookies], bool] = session_is_valid
+    ) -> None:
+        self.districts: List[str] = [d.upper() for d in districts]
+        self.headless = headless
+        self.lookahead = max(0, lookahead)
+        self._login = login
+        self._validate = validate
+        self._executor = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix='auth')
+        self._futures: Dict[str, 'Future[Tuple[Optional[Cookies], float]]'] = {}
+        self._lock = threading.Lock()
+        self._next = 0
+
+        self.wait_seconds = 0.0     # download loop time spent waiting on logins
+        self.login_seconds = 0.0    # total time spent logging in
+        self.renewed = 0
+
+        self._fill(0)
+
+    def _timed_login(self, district: str) -> Tuple[Optional[Cookies], float]:
+        start = time.monotonic()
+        try:
+            cookies = self._login(district, self.headless)
+        except Exception as e:
+            logger.error("Login for %s failed: %s", district, e)
+            cookies = None
+        finished = time.monotonic()
+        with self._lock:
+            self.login_seconds += finished - start
+        logger.info("Login for %s %s in %.1fs", district, 'ready' if cookies else 'failed', finished - start)
+        return cookies, finished
+
+    def _fill(self, position: int) -> None:
+        """Start logins up to lookahead districts past position."""
+        with self._lock:
+            while self._next < len(self.districts) and self._next <= position + self.lookahead:
+                district = self.districts[self._next]
+                if district not in self._futures:
+                    self._futures[district] = self._executor.submit(self._timed_login, district)
+                self._next += 1
+
+    def get(self, district: str) -> Optional[Cookies]:
+        """
+        Cookies for a district, waiting for its login if it is still running.
+
+        Args:
+            district: District name
+
+        Returns:
+            Session cookies, or None if the login failed
+        """
+        district = district.upper()
+        position = self.districts.index(district) if district in self.districts else 0
+        self._fill(position)
+        with self._lock:
+            future = self._futures.get(district)
+            if future is None:
+                future = self._futures[district] = self._executor.submit(self._timed_login, district)
+
+        start = time.monotonic()
+        cookies, ready_at = future.result()
+        self.wait_seconds += time.monotonic() - start
+
+        if cookies and time.monotonic() - ready_at > REVALIDATE_AFTER:
+            if not self._validate(district, cookies):
+                logger.info("Session for %s expired while queued, logging in again", district)
+                self.renewed += 1
+                cookies, _ = self._timed_login(district)
+        with self._lock:
+            self._futures.pop(district, None)
+        return cookies
+
+    def summary(self) -> str:
+        """Login time overlapped with downloads."""
+        hidden = max(0.0, self.login_seconds - self.wait_seconds)
+        return (
+            f"Logins: {self.login_seconds:.0f}s total, waited {self.wait_seconds:.0f}s "
+            f"({hidden:.0f}s overlapped with downloads)"
+        )
+
+    def close(self) -> None:
+        """Drop logins that were not needed."""
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def __enter__(self) -> 'AuthPipeline':
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.close()
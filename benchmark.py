@@ -0,0 +1,237 @@
+"""
+================================================================================
+NIAGARA BENCHMARKS v2.0
+================================================================================
+Startup and hot-path benchmarks for the Niagara BAS suite. Nothing here
+opens a network connection.
+
+Suites:
+    imports  - `python -X importtime` digest for each entry point
+    startup  - wall-clock time of common offline commands
+    points   - point list parse vs snapshot vs in-process lookup
+
+USAGE:
+    python benchmark.py
+    python benchmark.py --suite imports --top 15
+    python benchmark.py --suite startup --repeat 7
+    python benchmark.py --suite points
+================================================================================
+"""
+
+import argparse
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+from utils import print_header, print_separator, safe_print
+
+SCRIPT_DIR = Path(__file__).parent
+
+# Modules a user-facing command imports before doing anything
+ENTRY_MODULES: List[str] = [
+    'download_niagara_fast',
+    'niagara_cli',
+    'niagara_gui',
+    'fetch_pointlist',
+    'niagara_url_generator',
+    'niagara_download_engine',
+]
+
+# Offline commands whose cold start we care about
+STARTUP_COMMANDS: List[Tuple[str, List[str]]] = [
+    ('list-districts', ['download_niagara_fast.py', '--list-districts']),
+    ('fast --help', ['download_niagara_fast.py', '--help']),
+    ('pointlist --check-all', ['fetch_pointlist.py', '--check-all']),
+    ('url_generator --list', ['niagara_url_generator.py', '--list']),
+]
+
+
+# ============================================================================
+# IMPORT-TIME DIGEST
+# ============================================================================
+class ImportEntry:
+    """One line of `-X importtime` output."""
+
+    __slots__ = ('name', 'self_us', 'cumulative_us', 'depth')
+
+    def __init__(self, name: str, self_us: int, cumulative_us: int, depth: int) -> None:
+        self.name = name
+        self.self_us = self_us
+        self.cumulative_us = cumulative_us
+        self.depth = depth
+
+
+def parse_importtime(stderr: str) -> List[ImportEntry]:
+    """Parse `python -X importtime` stderr into entries."""
+    entries: List[ImportEntry] = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        parts = line[len('import time:'):].split('|')
+        if len(parts) != 3:
+            continue
+        try:
+            self_us = int(parts[0])
+            cumulative_us = int(parts[1])
+        except ValueError:
+            continue  # header line
+        raw_name = parts[2].rstrip()
+        stripped = raw_name.lstrip()
+        depth = (len(raw_name) - len(stripped) - 1) // 2
+        entries.append(ImportEntry(stripped, self_us, cumulative_us, depth))
+    return entries
+
+
+def measure_imports(module: str) -> Tuple[List[ImportEntry], Optional[str]]:
+    """Import a module in a fresh interpreter with -X importtime."""
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        cwd=str(SCRIPT_DIR), capture_output=True, text=True
+    )
+    error = None
+    if result.returncode != 0:
+        last = [l for l in result.stderr.splitlines() if l and not l.startswith('import time:')]
+        error = last[-1] if last else f"exit code {result.returncode}"
+    return parse_importtime(result.stderr), error
+
+
+def run_import_suite(top: int = 10) -> None:
+    """Print an import-time digest for each entry module."""
+    print_header("IMPORT-TIME DIGEST (-X importtime)")
+
+    baseline, _ = measure_imports('sys')
+    site_us = sum(e.cumulative_us for e in baseline if e.depth == 0)
+    safe_print(f"Interpreter baseline (site etc.): {site_us / 1000:7.1f} ms")
+
+    for module in ENTRY_MODULES:
+        entries, error = measure_imports(module)
+        print_separator()
+        index = next(
+            (i for i, e in enumerate(entries) if e.name == module and e.depth == 0), None
+        )
+        if index is None:
+            safe_print(f"{module}: import failed ({error})")
+            continue
+        own = entries[index]
+
+        status = f"  [import failed: {error}]" if error else ""
+        safe_print(f"{module}: {own.cumulative_us / 1000:.1f} ms cumulative{status}")
+
+        # importtime prints children before their parent: walk back to the
+        # previous top-level import to get this module's subtree.
+        start = index
+        while start > 0 and entries[start - 1].depth > 0:
+            start -= 1
+
+        # Direct dependencies ranked by what they drag in
+        children = [e for e in entries[start:index] if e.depth == 1]
+        children.sort(key=lambda e: e.cumulative_us, reverse=True)
+        for e in children[:top]:
+            share = e.cumulative_us / own.cumulative_us * 100 if own.cumulative_us else 0
+            safe_print(f"    {e.name:40s} {e.cumulative_us / 1000:7.1f} ms  {share:5.1f}%")
+
+
+# ============================================================================
+# STARTUP TIMING
+# ============================================================================
+def time_command(args: List[str], repeat: int) -> List[float]:
+    """Run a script `repeat` times and return wall-clock seconds per run."""
+    times: List[float] = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run(
+            [sys.executable] + args, cwd=str(SCRIPT_DIR),
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+            stdin=subprocess.DEVNULL
+        )
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def run_startup_suite(repeat: int = 5) -> None:
+    """Print median/min wall-clock time for offline commands."""
+    print_header(f"STARTUP ({repeat} runs each)")
+    safe_print(f"{'command':28s} {'median':>10s} {'min':>10s}")
+    print_separator()
+    for label, args in STARTUP_COMMANDS:
+        times = time_command(args, repeat)
+        safe_print(
+            f"{label:28s} {statistics.median(times) * 1000:8.1f}ms "
+            f"{min(times) * 1000:8.1f}ms"
+        )
+
+
+# ============================================================================
+# POINT LIST CACHE
+# ============================================================================
+def time_call(func: Callable[[], object], repeat: int) -> float:
+    """Return median seconds per call over `repeat` calls."""
+    times: List[float] = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+def run_points_suite(repeat: int = 5) -> None:
+    """Compare a full parse, a snapshot load and a memoised lookup per point list."""
+    import point_list_cache
+    from niagara_url_generator import POINT_LISTS_DIR
+
+    print_header("POINT LIST CACHE")
+    files = sorted(POINT_LISTS_DIR.glob('*.txt'))
+    if not files:
+        safe_print(f"No point lists in {POINT_LISTS_DIR}")
+        return
+
+    safe_print(f"{'file':36s} {'points':>7s} {'parse':>10s} {'snapshot':>10s} {'memo':>10s}")
+    print_separator()
+    for fp in files:
+        path = str(fp)
+        raw = fp.read_bytes()
+        point_list_cache.get_point_list(path)  # make sure the snapshot exists
+
+        def snapshot_load() -> None:
+            point_list_cache.invalidate(path)
+            point_list_cache.get_point_list(path)
+
+        parse = time_call(lambda: point_list_cache.parse_point_list(path, raw), repeat)
+        snapshot = time_call(snapshot_load, repeat)
+        memo = time_call(lambda: point_list_cache.count_points(path), repeat * 20)
+        safe_print(
+            f"{fp.name[:36]:36s} {point_list_cache.count_points(path):7d} "
+            f"{parse * 1000:8.2f}ms {snapshot * 1000:8.2f}ms {memo * 1e6:8.1f}us"
+        )
+
+
+# ============================================================================
+# MAIN
+# ============================================================================
+SUITES: Dict[str, Callable[[argparse.Namespace], None]] = {
+    'imports': lambda args: run_import_suite(top=args.top),
+    'startup': lambda args: run_startup_suite(repeat=args.repeat),
+    'points': lambda args: run_points_suite(repeat=args.repeat),
+}
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description='Niagara BAS benchmarks')
+    parser.add_argument('--suite', choices=sorted(SUITES), action='append',
+                        help='Suite to run (repeatable, default: all)')
+    parser.add_argument('--repeat', type=int, default=5, help='Runs per timed command')
+    parser.add_argument('--top', type=int, default=8, help='Dependencies to list per module')
+
+    args = parser.parse_args()
+
+    for name in args.suite or list(SUITES):
+        SUITES[name](args)
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,353 @@
+"""
+================================================================================
+NIAGARA BROWSER POOL v2.0
+================================================================================
+Warm Firefox (Selenium) instances shared by everything that needs a browser:
+NiagaraAuth.login, fetch_pointlist_selenium and the page-toggle keep-alive.
+
+Starting Firefox and geckodriver costs several seconds per launch. The pool
+keeps browsers running between operations instead of quitting them:
+
+    checkout   - a browser for a district: its idle one if there is one
+                 (health-checked first), otherwise a new launch; when the
+                 pool is full the least recently used idle browser of
+                 another district is closed to make room, and if every
+                 browser is busy the caller waits (CHECKOUT_TIMEOUT)
+    checkin    - back to the pool, still logged in; a browser that failed
+                 is closed instead
+    idle evict - a reaper thread closes browsers unused for IDLE_SECONDS
+
+Each district has its own Firefox profile under .cache/browser_profiles/, so
+certificate exceptions and session cookies stay with the district, and at
+most one browser per district runs at a time (Firefox locks the profile).
+
+POOL_SIZE = 0 turns pooling off: every checkout launches a browser and
+checkin quits it, as before.
+
+USAGE:
+    from browser_pool import get_pool
+
+    with get_pool().browser('NASHUA', headless=True) as driver:
+        driver.get(url)
+================================================================================
+"""
+
+import atexit
+import shutil
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from utils import CACHE_DIR
+from logging_config import get_logger
+
+logger = get_logger("browser_pool")
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+SCRIPT_DIR = Path(__file__).parent
+DRIVERS_DIR = SCRIPT_DIR / "drivers"
+GECKODRIVER_PATH = DRIVERS_DIR / "geckodriver.exe"
+FIREFOX_BINARY = Path('C:/Program Files/Mozilla Firefox/firefox.exe')
+PROFILES_DIR = CACHE_DIR / "browser_profiles"
+
+POOL_SIZE = 3                # browsers kept running (0 = no pooling)
+IDLE_SECONDS = 10 * 60       # idle browsers are closed after this
+REAP_INTERVAL = 30           # seconds between idle checks
+CHECKOUT_TIMEOUT = 120       # seconds to wait when every browser is busy
+
+Driver = Any  # selenium.webdriver.Firefox (selenium is optional)
+
+
+class BrowserUnavailable(Exception):
+    """No browser could be launched or checked out."""
+
+
+def launch_firefox(profile_dir: Optional[Path], headless: bool) -> Driver:
+    """
+    Start Firefox through geckodriver.
+
+    Args:
+        profile_dir: Profile folder to use in place (None = temporary profile)
+        headless: Run without a window
+
+    Returns:
+        WebDriver
+
+    Raises:
+        BrowserUnavailable: If Selenium or geckodriver is missing
+    """
+    try:
+        from selenium import webdriver
+        from selenium.webdriver.firefox.service import Service
+        from selenium.webdriver.firefox.options import Options
+    except ImportError:
+        raise BrowserUnavailable("Selenium not installed. Run: pip install selenium")
+
+    if not GECKODRIVER_PATH.exists():
+        raise BrowserUnavailable(f"geckodriver not found at {GECKODRIVER_PATH}")
+
+    options = Options()
+    options.add_argument('--ignore-certificate-errors')
+    options.accept_insecure_certs = True
+    if headless:
+        options.add_argument('--headless')
+    if profile_dir is not None:
+        profile_dir.mkdir(parents=True, exist_ok=True)
+        options.add_argument('-profile')
+        options.add_argument(str(profile_dir))  # used in place, so it persists
+    if FIREFOX_BINARY.exists():
+        options.binary_location = str(FIREFOX_BINARY)
+
+    service = Service(executable_path=str(GECKODRIVER_PATH))
+    return webdriver.Firefox(service=service, options=options)
+
+
+def is_healthy(driver: Driver) -> bool:
+    """Check that a browser still responds."""
+    try:
+        driver.current_url
+        return True
+    except Exception:
+        return False
+
+
+def _quit(driver: Driver) -> None:
+    try:
+        driver.quit()
+    except Exception as e:
+        logger.debug("Browser quit failed: %s", e)
+
+
+# ============================================================================
+# POOL
+# ============================================================================
+@dataclass
+class PooledBrowser:
+    """A running browser and its bookkeeping."""
+    district: str
+    headless: bool
+    driver: Driver
+    busy: bool = False
+    last_used: float = field(default_factory=time.monotonic)
+    uses: int = 0
+
+
+class BrowserPool:
+    """Warm browsers by district, with checkout/checkin."""
+
+    def __init__(
+        self,
+        size: int = POOL_SIZE,
+        idle_seconds: float = IDLE_SECONDS,
+        factory: Callable[[Optional[Path], bool], Driver] = launch_firefox,
+        health_check: Callable[[Driver], bool] = is_healthy,
+        profiles_dir: Optional[Path] = PROFILES_DIR
+    ) -> None:
+        self.size = max(0, size)
+        self.idle_seconds = idle_seconds
+        self.factory = factory
+        self.health_check = health_check
+        self.profiles_dir = profiles_dir
+
+        self._browsers: Dict[str, PooledBrowser] = {}
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
+        self._stop = threading.Event()
+        self._reaper: Optional[threading.Thread] = None
+
+        self.launches = 0
+        self.reuses = 0
+        self.evictions = 0
+
+    def _profile(self, district: str) -> Optional[Path]:
+        return self.profiles_dir / district if self.profiles_dir is not None else None
+
+    def _launch(self, district: str, headless: bool) -> Driver:
+        start = time.monotonic()
+        driver = self.factory(self._profile(district), headless)
+        with self._lock:
+            self.launches += 1
+        logger.info("Started browser for %s in %.1fs", district, time.monotonic() - start)
+        return driver
+
+    def _start_reaper(self) -> None:
+        if self._reaper is None and self.size > 0:
+            self._reaper = threading.Thread(target=self._reap_loop, name='browser-reaper', daemon=True)
+            self._reaper.start()
+
+    def checkout(self, district: str, headless: bool = True, timeout: float = CHECKOUT_TIMEOUT) -> Driver:
+        """
+        Take a browser for a district.
+
+        Args:
+            district: District name (selects the profile)
+            headless: Window mode; an idle browser in the other mode is replaced
+            timeout: Seconds to wait when the pool is full and busy
+
+        Returns:
+            WebDriver, to be returned with checkin()
+
+        Raises:
+            BrowserUnavailable: If no browser became available in time
+        """
+        district = district.upper()
+        if self.size == 0:
+            return self._launch(district, headless)
+
+        deadline = time.monotonic() + timeout
+        stale: List[Driver] = []
+        with self._lock:
+            self._start_reaper()
+            while True:
+                entry = self._browsers.get(district)
+                if entry is not None and not entry.busy:
+                    if entry.headless == headless:
+                        entry.busy = True
+                        break
+                    del self._browsers[district]  # wrong window mode
+                    stale.append(entry.driver)
+                    entry = None
+                if entry is None:
+                    if len(self._browsers) < self.size:
+                        break
+                    idle = [e for e in self._browsers.values() if not e.busy]
+                    if idle:
+                        victim = min(idle, key=lambda e: e.last_used)
+                        del self._browsers[victim.district]
+                        stale.append(victim.driver)
+                        self.evictions += 1
+                        break
+                # This district's browser, or every browser, is in use
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise BrowserUnavailable(f"No browser free for {district} after {timeout:.0f}s")
+                self._changed.wait(remaining)
+            if entry is None:
+                # Reserve the slot while launching outside the lock
+                entry = self._browsers[district] = PooledBrowser(district, headless, None, busy=True)
+
+        for driver in stale:
+            _quit(driver)
+
+        if entry.driver is not None:
+            if self.health_check(entry.driver):
+                with self._lock:
+                    self.reuses += 1
+                    entry.uses += 1
+                return entry.driver
+            logger.info("Browser for %s stopped responding, restarting", district)
+            _quit(entry.driver)
+
+        try:
+            entry.driver = self._launch(district, headless)
+        except Exception:
+            with self._lock:
+                self._browsers.pop(district, None)
+                self._changed.notify_all()
+            raise
+        entry.uses += 1
+        return entry.driver
+
+    def checkin(self, district: str, driver: Driver, healthy: bool = True) -> None:
+        """
+        Return a browser; an unhealthy one is closed.
+
+        Args:
+            district: District it was checked out for
+            driver: The WebDriver from checkout()
+            healthy: False if the operation using it failed in the browser
+        """
+        district = district.upper()
+        with self._lock:
+            entry = self._browsers.get(district)
+            pooled = self.size > 0 and healthy and entry is not None and entry.driver is driver
+            if pooled:
+                entry.busy = False
+                entry.last_used = time.monotonic()
+            elif entry is not None and entry.driver is driver:
+                del self._browsers[district]
+            self._changed.notify_all()
+        if not pooled:
+            _quit(driver)
+
+    @contextmanager
+    def browser(self, district: str, headless: bool = True) -> Iterator[Driver]:
+        """Checkout/checkin as a with-block; a failure closes the browser."""
+        driver = self.checkout(district, headless)
+        healthy = True
+        try:
+            yield driver
+        except Exception:
+            healthy = False
+            raise
+        finally:
+            self.checkin(district, driver, healthy=healthy and self.health_check(driver))
+
+    def evict_idle(self, max_idle: Optional[float] = None) -> int:
+        """Close browsers idle longer than max_idle (default idle_seconds)."""
+        limit = self.idle_seconds if max_idle is None else max_idle
+        now = time.monotonic()
+        with self._lock:
+            idle = [
+                e for e in self._browsers.values()
+                if not e.busy and e.driver is not None and now - e.last_used >= limit
+            ]
+            for entry in idle:
+                del self._browsers[entry.district]
+            self.evictions += len(idle)
+            if idle:
+                self._changed.notify_all()
+        for entry in idle:
+            logger.info("Closing idle browser for %s", entry.district)
+            _quit(entry.driver)
+        return len(idle)
+
+    def _reap_loop(self) -> None:
+        while not self._stop.wait(REAP_INTERVAL):
+            self.evict_idle()
+
+    def status(self) -> List[Dict[str, Any]]:
+        """Pool contents for display."""
+        now = time.monotonic()
+        with self._lock:
+            return [
+                {'district': e.district, 'busy': e.busy, 'headless': e.headless,
+                 'idle_seconds': round(now - e.last_used), 'uses': e.uses}
+                for e in self._browsers.values()
+            ]
+
+    def close(self) -> None:
+        """Close every browser (busy ones when they are checked in)."""
+        self._stop.set()
+        with self._lock:
+            idle = [e for e in self._browsers.values() if not e.busy and e.driver is not None]
+            for entry in idle:
+                del self._browsers[entry.district]
+            self.size = 0  # later checkins quit their browser
+        for entry in idle:
+            _quit(entry.driver)
+
+    def reset_profile(self, district: str) -> None:
+        """Delete a district's profile (e.g. after a password change)."""
+        profile = self._profile(district.upper())
+        if profile is not None and profile.exists():
+            shutil.rmtree(profile, ignore_errors=True)
+
+
+_pool: Optional[BrowserPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> BrowserPool:
+    """Process-wide pool, created on first use and closed at exit."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = BrowserPool()
+            atexit.register(_pool.close)
+        return _pool
@@ -5,7 +5,7 @@ BUILD SCRIPT - Package Niagara BAS Downloader as Windows .exe v2.0
 Creates a standalone Windows executable using PyInstaller.
 
 PREREQUISITES:
-    pip install pyinstaller customtkinter requests python-dateutil
+    pip install pyinstaller customtkinter requests
     pip install python-dotenv selenium urllib3
 
 USAGE:
@@ -33,11 +33,33 @@ ICON_FILE = None  # Set to "app.ico" if you have an icon file
 # Files to include alongside the exe
 DATA_FILES = [
     "config_district_details.py",
+    "district_registry.py",
     "credentials.py",
     "niagara_auth.py",
     "niagara_cli.py",
     "niagara_download_engine.py",
     "niagara_url_generator.py",
+    "point_list_cache.py",
+    "point_list_changes.py",
+    "download_planner.py",
+    "point_selection.py",
+    "download_priority.py",
+    "retry_queue.py",
+    "circuit_breaker.py",
+    "hedging.py",
+    "writer_stage.py",
+    "niagara_scheduler.py",
+    "niagara_api.py",
+    "ftp_upload.py",
+    "connectivity.py",
+    "auth_pipeline.py",
+    "browser_pool.py",
+    "download_estimate.py",
+    "run_history.py",
+    "post_process.py",
+    "trend_store.py",
+    "coverage_index.py",
+    "gap_fill.py",
     "download_niagara_fast.py",
     "fetch_pointlist.py",
     "utils.py",
@@ -127,8 +149,6 @@ def build():
         '--hidden-import', 'customtkinter',
         '--hidden-import', 'requests',
         '--hidden-import', 'urllib3',
-        '--hidden-import', 'dateutil',
-        '--hidden-import', 'dateutil.relativedelta',
         '--hidden-import', 'dotenv',
         '--hidden-import', 'selenium',
         '--hidden-import', 'selenium.webdriver',
@@ -139,10 +159,32 @@ def build():
         '--hidden-import', 'selenium.webdriver.common.keys',
         '--collect-submodules', 'selenium',
         '--hidden-import', 'config_district_details',
+        '--hidden-import', 'district_registry',
         '--hidden-import', 'credentials',
         '--hidden-import', 'niagara_auth',
         '--hidden-import', 'niagara_download_engine',
         '--hidden-import', 'niagara_url_generator',
+        '--hidden-import', 'point_list_cache',
+        '--hidden-import', 'point_list_changes',
+        '--hidden-import', 'download_planner',
+        '--hidden-import', 'point_selection',
+        '--hidden-import', 'download_priority',
+        '--hidden-import', 'retry_queue',
+        '--hidden-import', 'circuit_breaker',
+        '--hidden-import', 'hedging',
+        '--hidden-import', 'writer_stage',
+        '--hidden-import', 'niagara_scheduler',
+        '--hidden-import', 'niagara_api',
+        '--hidden-import', 'ftp_upload',
+        '--hidden-import', 'connectivity',
+        '--hidden-import', 'auth_pipeline',
+        '--hidden-import', 'browser_pool',
+        '--hidden-import', 'download_estimate',
+        '--hidden-import', 'run_history',
+        '--hidden-import', 'post_process',
+        '--hidden-import', 'trend_store',
+        '--hidden-import', 'coverage_index',
+        '--hidden-import', 'gap_fill',
         '--hidden-import', 'niagara_cli',
         '--hidden-import', 'download_niagara_fast',
         '--hidden-import', 'fetch_pointlist',
@@ -0,0 +1,189 @@
+"""
+================================================================================
+NIAGARA CIRCUIT BREAKER v2.0
+================================================================================
+Per-host circuit breakers for the download engine.
+
+When a VPN tunnel drops mid-run every in-flight request waits out its
+timeout and the session's retries. Without a breaker the thousands of points
+still queued would each do the same. A breaker per station host:
+
+    closed  - requests go through; consecutive timeouts / connection
+              failures are counted, any HTTP response resets the count
+    open    - after FAILURE_THRESHOLD failures in a row, requests fail
+              immediately (the engine records them as class 'circuit')
+    probe   - once the open period has passed, the next request first makes
+              a quick TCP connection to the host. If it connects the breaker
+              closes and work resumes; if not it stays open for twice as
+              long (up to MAX_OPEN_SECONDS)
+
+Failed-fast points go through the engine's retry queue like other transient
+failures, so a host that comes back within the run is picked up again, and
+anything still failing lands in the resume state for the next run.
+
+USAGE:
+    from circuit_breaker import CircuitBreakers
+
+    breakers = CircuitBreakers()
+    breaker = breakers.get(url)
+    if not breaker.allow():
+        ...  # fail fast
+================================================================================
+"""
+
+import socket
+import threading
+import time
+from typing import Callable, Dict
+from urllib.parse import urlsplit
+
+from logging_config import get_logger
+
+logger = get_logger("circuit")
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+FAILURE_THRESHOLD = 5      # consecutive connection failures that open a breaker
+OPEN_SECONDS = 10.0        # first open period before probing
+MAX_OPEN_SECONDS = 120.0
+PROBE_TIMEOUT = 5.0
+
+CLOSED = 'closed'
+OPEN = 'open'
+
+
+def host_of(url: str) -> str:
+    """Breaker key for a URL: 'host:port'."""
+    parts = urlsplit(url)
+    port = parts.port or (443 if parts.scheme == 'https' else 80)
+    return f"{parts.hostname}:{port}"
+
+
+def tcp_probe(host: str, timeout: float = PROBE_TIMEOUT) -> bool:
+    """
+    Check that a host accepts TCP connections.
+
+    Args:
+        host: 'hostname:port'
+        timeout: Connect timeout in seconds
+
+    Returns:
+        True if a connection was established
+    """
+    hostname, _, port = host.rpartition(':')
+    try:
+        with socket.create_connection((hostname, int(port)), timeout=timeout):
+            return True
+    except (OSError, ValueError):
+        return False
+
+
+# ============================================================================
+# BREAKER
+# ============================================================================
+class CircuitBreaker:
+    """Circuit breaker for one host."""
+
+    def __init__(
+        self,
+        host: str,
+        threshold: int = FAILURE_THRESHOLD,
+        open_seconds: float = OPEN_SECONDS,
+        probe: Callable[[str], bool] = tcp_probe,
+        clock: Callable[[], float] = time.monotonic
+    ) -> None:
+        self.host = host
+        self.threshold = threshold
+        self.base_open_seconds = open_seconds
+        self._probe = probe
+        self._clock = clock
+        self._lock = threading.Lock()
+
+        self.state = CLOSED
+        self.failures = 0
+        self.opened = 0            # times the breaker has opened
+        self._open_seconds = open_seconds
+        self._retry_at = 0.0
+        self._probing = False
+
+    def allow(self) -> bool:
+        """
+        Check whether a request to the host may go ahead.
+
+        An open breaker lets one caller probe the host once the open period
+        has passed; every other caller is refused while it is open.
+        """
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            if self._probing or self._clock() < self._retry_at:
+                return False
+            self._probing = True
+
+        reachable = self._probe(self.host)
+
+        with self._lock:
+            self._probing = False
+            if reachable:
+                self.state = CLOSED
+                self.failures = 0
+                self._open_seconds = self.base_open_seconds
+                logger.info("%s reachable again, circuit closed", self.host)
+                return True
+            self._open_seconds = min(MAX_OPEN_SECONDS, self._open_seconds * 2)
+            self._retry_at = self._clock() + self._open_seconds
+            logger.info("%s still unreachable, next probe in %.0fs", self.host, self._open_seconds)
+            return False
+
+    def record_success(self) -> None:
+        """The host answered (any HTTP status)."""
+        if self.failures:
+            with self._lock:
+                self.failures = 0
+
+    def record_failure(self) -> None:
+        """A request timed out or could not connect."""
+        with self._lock:
+            if self.state == OPEN:
+                return  # in-flight requests from before the breaker opened
+            self.failures += 1
+            if self.failures >= self.threshold:
+                self.state = OPEN
+                self.opened += 1
+                self._retry_at = self._clock() + self._open_seconds
+                logger.warning(
+                    "%s: %d connection failures in a row, circuit open for %.0fs",
+                    self.host, self.failures, self._open_seconds
+                )
+
+
+class CircuitBreakers:
+    """Breakers by host, created on first use."""
+
+    def __init__(
+        self,
+        threshold: int = FAILURE_THRESHOLD,
+        open_seconds: float = OPEN_SECONDS,
+        probe: Callable[[str], bool] = tcp_probe
+    ) -> None:
+        self.threshold = threshold
+        self.open_seconds = open_seconds
+        self.probe = probe
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._lock = threading.Lock()
+
+    def get(self, url: str) -> CircuitBreaker:
+        """Breaker for a URL's host."""
+        host = host_of(url)
+        breaker = self._breakers.get(host)
+        if breaker is None:
+            with self._lock:
+                breaker = self._breakers.setdefault(
+                    host, CircuitBreaker(host, self.threshold, self.open_seconds, self.probe)
+                )
+        return breaker
+
+    def open_hosts(self) -> Dict[str, CircuitBreaker]:
+        """Breakers that are currently open."""
+        return {h: b for h, b in self._breakers.items() if b.state == OPEN}
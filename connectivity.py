@@ -0,0 +1,298 @@
+"""
+================================================================================
+NIAGARA CONNECTIVITY PROBE v2.0
+================================================================================
+Checks every selected district's station (BASE_IP) at once before a run.
+
+Each station gets a TCP connect and an HTTP HEAD /, both timed, in parallel
+across districts, with one overall deadline for the whole check. Districts
+sharing a BASE_IP are probed once. A station counts as reachable only when
+it answers the HEAD (any status): a VPN or firewall that accepts the TCP
+connection but never answers HTTP would still time out every download.
+
+    BASE_IP without a port: port 80 (http) / 443 (https) is tried first,
+    then the other one, like the old CLI VPN check.
+
+Results are cached for the process (PROBE_CACHE_SECONDS), so the CLI's VPN
+check, the download loop and the scheduler do not probe the same station
+again minutes later. Unreachable districts are skipped up front instead of
+each of their points timing out.
+
+USAGE:
+    from connectivity import probe_districts
+
+    results = probe_districts(['NASHUA', 'AUBURNME'])
+    for result in results.values():
+        print(result.describe())
+
+    python connectivity.py --district NASHUA AUBURNME
+    python connectivity.py --all
+================================================================================
+"""
+
+import http.client
+import socket
+import ssl
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+from urllib.parse import urlsplit
+
+from logging_config import get_logger
+
+logger = get_logger("connectivity")
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+PROBE_TIMEOUT = 3.0          # per connect / HEAD
+PROBE_DEADLINE = 8.0         # whole check, all districts
+PROBE_WORKERS = 32
+PROBE_CACHE_SECONDS = 300    # reuse results for this long
+
+
+# ============================================================================
+# RESULTS
+# ============================================================================
+@dataclass
+class ProbeResult:
+    """Reachability of one station."""
+    district: str
+    base_ip: str
+    host: str = ''
+    port: int = 0
+    reachable: bool = False
+    tcp_ms: Optional[float] = None
+    http_status: Optional[int] = None
+    http_ms: Optional[float] = None
+    error: str = ''
+    checked_at: float = 0.0
+
+    def describe(self) -> str:
+        """One-line status for console output."""
+        if not self.reachable:
+            return f"unreachable ({self.error or 'no response'})"
+        return f"TCP {self.tcp_ms:.0f} ms, HTTP {self.http_status} {self.http_ms:.0f} ms"
+
+
+def parse_base_ip(base_ip: str) -> Tuple[str, str, Optional[int]]:
+    """
+    Split a BASE_IP into (scheme, host, port).
+
+    Args:
+        base_ip: 'http://10.10.1.207', 'https://host:4422' or a bare '10.2.1.11'
+
+    Returns:
+        (scheme, host, port); port is None when not given
+    """
+    text = base_ip.strip()
+    if '://' not in text:
+        text = f'http://{text}'
+    parts = urlsplit(text)
+    try:
+        port = parts.port
+    except ValueError:
+        port = None
+    return parts.scheme or 'http', parts.hostname or '', port
+
+
+def _tcp(host: str, port: int, timeout: float) -> float:
+    """Connect time in ms (raises OSError)."""
+    start = time.perf_counter()
+    with socket.create_connection((host, port), timeout=timeout):
+        return (time.perf_counter() - start) * 1000
+
+
+def _head(scheme: str, host: str, port: int, timeout: float) -> Tuple[int, float]:
+    """HEAD / status and response time in ms (raises OSError / HTTPException)."""
+    if scheme == 'https':
+        context = ssl.create_default_context()
+        context.check_hostname = False
+        context.verify_mode = ssl.CERT_NONE  # stations use self-signed certificates
+        conn: http.client.HTTPConnection = http.client.HTTPSConnection(
+            host, port, timeout=timeout, context=context
+        )
+    else:
+        conn = http.client.HTTPConnection(host, port, timeout=timeout)
+    start = time.perf_counter()
+    try:
+        conn.request('HEAD', '/')
+        status = conn.getresponse().status
+    finally:
+        conn.close()
+    return status, (time.perf_counter() - start) * 1000
+
+
+def probe_station(district: str, base_ip: str, timeout: float = PROBE_TIMEOUT) -> ProbeResult:
+    """
+    Probe one station: TCP connect, then HTTP HEAD.
+
+    Args:
+        district: District name (for the result)
+        base_ip: District BASE_IP
+        timeout: Seconds per connect / request
+
+    Returns:
+        ProbeResult
+    """
+    result = ProbeResult(district, base_ip, checked_at=time.time())
+    scheme, host, port = parse_base_ip(base_ip)
+    if not host:
+        result.error = 'no BASE_IP'
+        return result
+    result.host = host
+
+    if port is not None:
+        candidates = [(scheme, port)]
+    elif scheme == 'https':
+        candidates = [('https', 443), ('http', 80)]
+    else:
+        candidates = [('http', 80), ('https', 443)]
+
+    for scheme, port in candidates:
+        result.port = port
+        try:
+            result.tcp_ms = _tcp(host, port, timeout)
+            result.http_status, result.http_ms = _head(scheme, host, port, timeout)
+        except (OSError, http.client.HTTPException) as e:
+            error = str(e) or type(e).__name__
+            result.error = f"{'HTTP' if result.tcp_ms is not None else 'TCP'} {error}"
+            continue
+        result.reachable = True
+        result.error = ''
+        break
+    return result
+
+
+# ============================================================================
+# PARALLEL PROBE + SESSION CACHE
+# ============================================================================
+_cache: Dict[str, ProbeResult] = {}  # BASE_IP -> latest result
+_cache_lock = threading.Lock()
+
+
+def clear_cache() -> None:
+    """Forget cached results (e.g. after connecting a VPN)."""
+    with _cache_lock:
+        _cache.clear()
+
+
+def _store(future: 'Future[ProbeResult]') -> None:
+    if future.cancelled() or future.exception() is not None:
+        return
+    result = future.result()
+    with _cache_lock:
+        _cache[result.base_ip] = result
+
+
+def _cached(base_ip: str, max_age: float) -> Optional[ProbeResult]:
+    with _cache_lock:
+        result = _cache.get(base_ip)
+    if result is not None and time.time() - result.checked_at <= max_age:
+        return result
+    return None
+
+
+def probe_districts(
+    districts: Sequence[str],
+    deadline: float = PROBE_DEADLINE,
+    timeout: float = PROBE_TIMEOUT,
+    max_age: float = PROBE_CACHE_SECONDS
+) -> Dict[str, ProbeResult]:
+    """
+    Probe every district's station in parallel.
+
+    Args:
+        districts: District names
+        deadline: Seconds for the whole check; stations still pending count
+            as unreachable
+        timeout: Seconds per connect / request
+        max_age: Reuse cached results up to this old (0 = always probe)
+
+    Returns:
+        District name -> ProbeResult, in the order given
+    """
+    from district_registry import get_district
+
+    base_ips: Dict[str, str] = {}
+    results: Dict[str, ProbeResult] = {}
+    for district in districts:
+        record = get_district(district)
+        base_ip = record.base_ip.strip() if record is not None and record.has_base_ip else ''
+        if not base_ip:
+            results[district] = ProbeResult(district, '', error='no BASE_IP', checked_at=time.time())
+        else:
+            base_ips[district] = base_ip
+
+    to_probe = sorted({ip for ip in base_ips.values() if _cached(ip, max_age) is None})
+    if to_probe:
+        per_request = min(timeout, deadline / 2)  # TCP then HEAD fit in the deadline
+        started = time.time()
+        executor = ThreadPoolExecutor(max_workers=min(PROBE_WORKERS, len(to_probe)))
+        futures = [executor.submit(probe_station, '', ip, per_request) for ip in to_probe]
+        for future in futures:
+            future.add_done_callback(_store)  # late answers still update the cache
+        _, pending = wait(futures, timeout=deadline)
+        executor.shutdown(wait=False, cancel_futures=True)
+        now = time.time()
+        with _cache_lock:
+            for ip in to_probe:
+                entry = _cache.get(ip)
+                if entry is None or entry.checked_at < started:
+                    _cache[ip] = ProbeResult('', ip, error=f'no answer within {deadline:.0f}s', checked_at=now)
+        logger.info("Probed %d stations (%d pending at deadline)", len(to_probe), len(pending))
+
+    for district, base_ip in base_ips.items():
+        cached = _cached(base_ip, float('inf'))
+        results[district] = ProbeResult(**{**cached.__dict__, 'district': district})
+    return {d: results[d] for d in districts}
+
+
+def split_reachable(
+    districts: Sequence[str],
+    deadline: float = PROBE_DEADLINE
+) -> Tuple[List[str], List[ProbeResult]]:
+    """
+    Probe districts and split them for a run.
+
+    Returns:
+        (reachable district names, results for the unreachable ones)
+    """
+    results = probe_districts(districts, deadline=deadline)
+    reachable = [d for d, r in results.items() if r.reachable]
+    unreachable = [r for r in results.values() if not r.reachable]
+    return reachable, unreachable
+
+
+# ============================================================================
+# CLI
+# ============================================================================
+if __name__ == '__main__':
+    import argparse
+
+    from utils import safe_print, print_header, setup_console_encoding, SYM_OK, SYM_FAIL
+
+    setup_console_encoding()
+
+    parser = argparse.ArgumentParser(description='Connectivity Probe v2.0')
+    group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument('--district', nargs='+', help='District name(s)')
+    group.add_argument('--all', action='store_true', help='Every district with a BASE_IP')
+    parser.add_argument('--deadline', type=float, default=PROBE_DEADLINE, help='Seconds for the whole check')
+
+    args = parser.parse_args()
+
+    if args.all:
+        from niagara_url_generator import get_available_districts
+        names = get_available_districts()
+    else:
+        names = [d.upper() for d in args.district]
+
+    start = time.perf_counter()
+    probe_results = probe_districts(names, deadline=args.deadline)
+    print_header(f"CONNECTIVITY ({time.perf_counter() - start:.1f}s)")
+    for name, probe in probe_results.items():
+        symbol = SYM_OK if probe.reachable else SYM_FAIL
+        safe_print(f"  {symbol} {name:25s} {probe.base_ip:32s} {probe.describe()}")
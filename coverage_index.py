@@ -0,0 +1,551 @@
+"""
+================================================================================
+NIAGARA COVERAGE INDEX v2.0
+================================================================================
+Which time ranges of which points are on disk, without opening the files.
+
+For every downloaded file the index stores the point's contiguous coverage
+intervals (runs of records with no hole longer than GAP_FACTOR collection
+intervals), their record counts, the collection interval and the last
+record's timestamp, merged with what earlier downloads covered. Queries for
+a whole district read a few rows per point:
+
+    coverage(district)                  - intervals per point
+    gaps(district, start, end)          - holes per point inside a window
+    points(district)                    - records, first/last ts, interval
+
+The index is updated as the engine writes files (CoverageUpdater on the
+on_file hook; the files are parsed in a worker process so the download
+threads are not slowed) and can be brought up to date from the date folders
+at any time (scan). Files already indexed are skipped by mtime and size.
+
+Record counts are exact per download; where two downloads overlap, the
+older one's count is prorated to the part the newer one does not cover.
+
+Database: .cache/coverage.db (SQLite)
+
+USAGE:
+    python coverage_index.py scan --district NASHUA
+    python coverage_index.py gaps --district NASHUA --start 2026-03-01 --end 2026-04-01
+    python coverage_index.py show --district NASHUA --point /NASHUA/AHU1_SAT
+================================================================================
+"""
+
+import os
+import sqlite3
+import statistics
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+from utils import CACHE_DIR, district_output_folder, download_files, point_key
+from logging_config import get_logger
+
+logger = get_logger("coverage")
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+COVERAGE_DB = CACHE_DIR / "coverage.db"
+GAP_FACTOR = 3.0             # a hole longer than this many intervals splits coverage
+MIN_GAP_SECONDS = 60.0       # never count holes shorter than this
+DEFAULT_STEP = 900.0         # assumed interval for single-record files (15 min)
+SCAN_WORKERS = 1             # processes parsing files during downloads
+COMMIT_EVERY = 200           # files per transaction
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    district TEXT NOT NULL,
+    relpath TEXT NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    PRIMARY KEY (district, relpath)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS coverage (
+    district TEXT NOT NULL,
+    point TEXT NOT NULL,
+    start REAL NOT NULL,
+    end REAL NOT NULL,
+    records INTEGER NOT NULL,
+    PRIMARY KEY (district, point, start)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS points (
+    district TEXT NOT NULL,
+    point TEXT NOT NULL,
+    records INTEGER NOT NULL,
+    first_ts REAL NOT NULL,
+    last_ts REAL NOT NULL,
+    step REAL NOT NULL,
+    updated REAL NOT NULL,
+    PRIMARY KEY (district, point)
+) WITHOUT ROWID;
+"""
+
+
+class Interval(NamedTuple):
+    """Contiguous coverage of one point."""
+    start: float
+    end: float
+    records: int
+
+
+class PointCoverage(NamedTuple):
+    """Per-point totals."""
+    point: str
+    records: int
+    first_ts: float
+    last_ts: float
+    step: float
+
+
+def _tolerance(step: float) -> float:
+    return max(GAP_FACTOR * step, MIN_GAP_SECONDS)
+
+
+# ============================================================================
+# FILE SCAN (worker process)
+# ============================================================================
+def file_intervals(timestamps: Sequence[float]) -> Tuple[List[Interval], float]:
+    """
+    Split a file's timestamps into contiguous intervals.
+
+    Args:
+        timestamps: Record timestamps (any order)
+
+    Returns:
+        (intervals, collection interval in seconds)
+    """
+    if not timestamps:
+        return [], DEFAULT_STEP
+    ordered = sorted(set(timestamps))
+    steps = [b - a for a, b in zip(ordered, ordered[1:])]
+    step = statistics.median(steps) if steps else DEFAULT_STEP
+    limit = _tolerance(step)
+    intervals: List[Interval] = []
+    start = previous = ordered[0]
+    count = 1
+    for ts in ordered[1:]:
+        if ts - previous > limit:
+            intervals.append(Interval(start, previous, count))
+            start, count = ts, 0
+        count += 1
+        previous = ts
+    intervals.append(Interval(start, previous, count))
+    return intervals, step
+
+
+def scan_file(path: str) -> Tuple[str, List[Interval], float, str]:
+    """
+    Coverage of one downloaded file (process pool entry point).
+
+    Returns:
+        (point key, intervals, collection interval, error)
+    """
+    from post_process import COLUMNAR_SUBFOLDER, COLUMNAR_SUFFIX, parse_trend_csv, read_columnar
+
+    stem = os.path.splitext(os.path.basename(path))[0]
+    try:
+        columnar = os.path.join(os.path.dirname(path), COLUMNAR_SUBFOLDER, stem + COLUMNAR_SUFFIX)
+        timestamps = None
+        try:
+            if os.stat(columnar).st_mtime_ns >= os.stat(path).st_mtime_ns:
+                timestamps = read_columnar(columnar)[0]
+        except (OSError, ValueError):
+            pass
+        if timestamps is None:
+            with open(path, 'rb') as f:
+                timestamps = parse_trend_csv(f.read())[0]
+        intervals, step = file_intervals(timestamps)
+        return stem, intervals, step, ''
+    except Exception as e:
+        return stem, [], DEFAULT_STEP, str(e)[:100]
+
+
+# ============================================================================
+# MERGING
+# ============================================================================
+def merge_intervals(old: List[Interval], new: List[Interval], step: float) -> List[Interval]:
+    """
+    Union of stored and newly downloaded coverage.
+
+    Old intervals keep only the parts the new ones do not cover (records
+    prorated by duration); pieces closer than the gap tolerance join.
+
+    Args:
+        old: Stored intervals
+        new: Intervals from a new download
+        step: Collection interval
+
+    Returns:
+        Sorted, non-overlapping intervals
+    """
+    pieces: List[Interval] = list(new)
+    covered = sorted((i.start, i.end) for i in new)
+    for interval in old:
+        parts = [(interval.start, interval.end)]
+        for c_start, c_end in covered:
+            next_parts = []
+            for p_start, p_end in parts:
+                if c_end < p_start or c_start > p_end:
+                    next_parts.append((p_start, p_end))
+                    continue
+                if p_start < c_start:
+                    next_parts.append((p_start, c_start - step))
+                if c_end < p_end:
+                    next_parts.append((c_end + step, p_end))
+            parts = [(s, e) for s, e in next_parts if e >= s]
+        span = interval.end - interval.start
+        for p_start, p_end in parts:
+            share = (p_end - p_start) / span if span > 0 else 1.0
+            pieces.append(Interval(p_start, p_end, max(1, round(interval.records * share))))
+
+    pieces.sort()
+    limit = _tolerance(step)
+    merged: List[Interval] = []
+    for piece in pieces:
+        if merged and piece.start - merged[-1].end <= limit:
+            last = merged[-1]
+            merged[-1] = Interval(last.start, max(last.end, piece.end), last.records + piece.records)
+        else:
+            merged.append(piece)
+    return merged
+
+
+def interval_gaps(intervals: List[Interval], start: float, end: float, step: float) -> List[Tuple[float, float]]:
+    """
+    Holes in coverage inside [start, end].
+
+    Args:
+        intervals: Sorted coverage intervals
+        start: Window start (epoch seconds)
+        end: Window end (epoch seconds)
+        step: Collection interval; holes up to the gap tolerance are ignored
+
+    Returns:
+        (gap start, gap end) pairs
+    """
+    limit = _tolerance(step)
+    gaps: List[Tuple[float, float]] = []
+    cursor = start
+    for interval in intervals:
+        if interval.end < start:
+            continue
+        if interval.start > end:
+            break
+        if interval.start - cursor > limit:
+            gaps.append((cursor, interval.start))
+        cursor = max(cursor, interval.end)
+    if end - cursor > limit:
+        gaps.append((cursor, end))
+    return gaps
+
+
+# ============================================================================
+# DATABASE
+# ============================================================================
+class CoverageIndex:
+    """SQLite coverage store shared by all districts."""
+
+    def __init__(self, path: Path = COVERAGE_DB) -> None:
+        self.path = path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(path), timeout=30, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(SCHEMA)
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        with self._lock, self._conn:
+            yield self._conn
+
+    def known_files(self, district: str) -> Dict[str, Tuple[int, int]]:
+        """relpath -> (mtime_ns, size) of files already indexed."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT relpath, mtime_ns, size FROM files WHERE district = ?", (district.upper(),)
+            ).fetchall()
+        return {relpath: (mtime, size) for relpath, mtime, size in rows}
+
+    def update(
+        self,
+        district: str,
+        results: Iterable[Tuple[str, List[Interval], float, Tuple[str, int, int]]]
+    ) -> int:
+        """
+        Merge scanned files into the index in one transaction.
+
+        Args:
+            district: District name
+            results: (point key, intervals, step, (relpath, mtime_ns, size))
+
+        Returns:
+            Files applied
+        """
+        district = district.upper()
+        applied = 0
+        now = time.time()
+        with self._transaction() as conn:
+            for point, intervals, step, (relpath, mtime_ns, size) in results:
+                conn.execute(
+                    "INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?)", (district, relpath, mtime_ns, size)
+                )
+                applied += 1
+                if not intervals:
+                    continue
+                old = [Interval(*row) for row in conn.execute(
+                    "SELECT start, end, records FROM coverage WHERE district = ? AND point = ? ORDER BY start",
+                    (district, point)
+                )]
+                row = conn.execute(
+                    "SELECT step FROM points WHERE district = ? AND point = ?", (district, point)
+                ).fetchone()
+                if row is not None:
+                    step = min(step, row[0])
+                merged = merge_intervals(old, intervals, step)
+                conn.execute("DELETE FROM coverage WHERE district = ? AND point = ?", (district, point))
+                conn.executemany(
+                    "INSERT INTO coverage VALUES (?, ?, ?, ?, ?)",
+                    [(district, point, i.start, i.end, i.records) for i in merged]
+                )
+                conn.execute(
+                    "INSERT OR REPLACE INTO points VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (district, point, sum(i.records for i in merged), merged[0].start, merged[-1].end, step, now)
+                )
+        return applied
+
+    def coverage(self, district: str, points: Optional[Iterable[str]] = None) -> Dict[str, List[Interval]]:
+        """Coverage intervals per point key (all indexed points by default)."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT point, start, end, records FROM coverage WHERE district = ? ORDER BY point, start",
+                (district.upper(),)
+            ).fetchall()
+        wanted = None if points is None else {point_key(p) for p in points}
+        result: Dict[str, List[Interval]] = {}
+        for point, start, end, records in rows:
+            if wanted is None or point in wanted:
+                result.setdefault(point, []).append(Interval(start, end, records))
+        return result
+
+    def points(self, district: str) -> Dict[str, PointCoverage]:
+        """Totals per point key."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT point, records, first_ts, last_ts, step FROM points WHERE district = ?",
+                (district.upper(),)
+            ).fetchall()
+        return {row[0]: PointCoverage(*row) for row in rows}
+
+    def gaps(
+        self,
+        district: str,
+        start: float,
+        end: float,
+        points: Optional[Iterable[str]] = None
+    ) -> Dict[str, List[Tuple[float, float]]]:
+        """
+        Holes per point inside [start, end] (points with none are left out).
+
+        Points given but never downloaded get the whole window as one gap.
+        """
+        coverage = self.coverage(district, points)
+        steps = {key: p.step for key, p in self.points(district).items()}
+        keys = list(coverage) if points is None else [point_key(p) for p in points]
+        result: Dict[str, List[Tuple[float, float]]] = {}
+        for key in keys:
+            holes = interval_gaps(coverage.get(key, []), start, end, steps.get(key, DEFAULT_STEP))
+            if holes:
+                result[key] = holes
+        return result
+
+    def forget(self, district: str) -> None:
+        """Drop a district's index (the next scan rebuilds it)."""
+        district = district.upper()
+        with self._transaction() as conn:
+            for table in ('files', 'coverage', 'points'):
+                conn.execute(f"DELETE FROM {table} WHERE district = ?", (district,))
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def __enter__(self) -> 'CoverageIndex':
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.close()
+
+
+# ============================================================================
+# UPDATER (engine on_file hook) AND SCAN
+# ============================================================================
+class CoverageUpdater:
+    """Indexes files as they are written; parsing runs in worker processes."""
+
+    def __init__(
+        self,
+        district: str,
+        district_folder: str,
+        index: Optional[CoverageIndex] = None,
+        workers: int = SCAN_WORKERS
+    ) -> None:
+        self.district = district.upper()
+        self.district_folder = os.path.abspath(district_folder)
+        self.index = index or CoverageIndex()
+        self._owns_index = index is None
+        self._executor = ProcessPoolExecutor(max_workers=max(1, workers))
+        self._lock = threading.Lock()
+        self._pending: List[Tuple[str, List[Interval], float, Tuple[str, int, int]]] = []
+        self.files = 0
+        self.errors: List[Tuple[str, str]] = []
+        self._closed = False
+
+    def submit(self, path: str) -> 'Future':
+        """Queue a finished file (returns at once)."""
+        if self._closed:
+            raise RuntimeError("Coverage updater is closed")
+        st = os.stat(path)
+        relpath = os.path.relpath(os.path.abspath(path), self.district_folder)
+        future = self._executor.submit(scan_file, path)
+        future.add_done_callback(lambda f, key=(relpath, st.st_mtime_ns, st.st_size): self._collect(key, f))
+        return future
+
+    def _collect(self, file_key: Tuple[str, int, int], future: 'Future') -> None:
+        if future.cancelled():
+            return
+        error = future.exception()
+        point, intervals, step, message = future.result() if error is None else ('', [], DEFAULT_STEP, str(error))
+        flush = False
+        with self._lock:
+            if message:
+                self.errors.append((file_key[0], message))
+                return
+            self._pending.append((point, intervals, step, file_key))
+            flush = len(self._pending) >= COMMIT_EVERY
+        if flush:
+            self.flush()
+
+    def flush(self) -> None:
+        """Write queued results to the index."""
+        with self._lock:
+            pending, self._pending = self._pending, []
+        if pending:
+            self.files += self.index.update(self.district, pending)
+
+    def close(self) -> int:
+        """Wait for queued files and write them; returns files indexed."""
+        if not self._closed:
+            self._closed = True
+            self._executor.shutdown(wait=True)
+            self.flush()
+            if self._owns_index:
+                self.index.close()
+        return self.files
+
+    def __enter__(self) -> 'CoverageUpdater':
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.close()
+
+
+def scan_district(
+    district: str,
+    district_folder: str,
+    index: Optional[CoverageIndex] = None,
+    workers: Optional[int] = None
+) -> int:
+    """
+    Index every date folder file not indexed yet (or changed since).
+
+    Args:
+        district: District name
+        district_folder: Folder with the district's date folders
+        index: Open index (default: COVERAGE_DB)
+        workers: Parsing processes (default: cores - 1)
+
+    Returns:
+        Files indexed
+    """
+    own = index is None
+    index = index or CoverageIndex()
+    try:
+        known = index.known_files(district)
+        folder = os.path.abspath(district_folder)
+        todo = []
+        for _, path in download_files(folder):
+            st = os.stat(path)
+            relpath = os.path.relpath(path, folder)
+            if tuple(known.get(relpath, ())) != (st.st_mtime_ns, st.st_size):
+                todo.append(path)
+        if not todo:
+            return 0
+        updater = CoverageUpdater(district, folder, index, workers or max(1, (os.cpu_count() or 2) - 1))
+        # Oldest folder first: results are applied in completion order, and
+        # the merge is a union, so order only affects prorated counts
+        for path in todo:
+            updater.submit(path)
+        count = updater.close()
+        for relpath, message in updater.errors[:10]:
+            logger.warning("Coverage scan of %s failed: %s", relpath, message)
+        return count
+    finally:
+        if own:
+            index.close()
+
+
+# ============================================================================
+# CLI
+# ============================================================================
+if __name__ == '__main__':
+    import argparse
+
+    from utils import safe_print, print_header, setup_console_encoding
+
+    setup_console_encoding()
+
+    def _fmt(ts: float) -> str:
+        return datetime.fromtimestamp(ts).strftime('%Y-%m-%d %H:%M')
+
+    parser = argparse.ArgumentParser(description='Coverage Index v2.0')
+    parser.add_argument('command', choices=['scan', 'gaps', 'show', 'forget'])
+    parser.add_argument('--district', required=True)
+    parser.add_argument('--output', type=str, help='Output root (as for download_niagara_fast --output)')
+    parser.add_argument('--point', action='append', default=[], help='Point path or file stem (repeatable)')
+    parser.add_argument('--start', type=str, help='Window start YYYY-MM-DD (gaps)')
+    parser.add_argument('--end', type=str, help='Window end YYYY-MM-DD (gaps, default: now)')
+    args = parser.parse_args()
+
+    with CoverageIndex() as coverage_index:
+        if args.command == 'scan':
+            began = time.perf_counter()
+            indexed = scan_district(args.district, str(district_output_folder(args.district, args.output)), coverage_index)
+            safe_print(f"Indexed {indexed} files ({time.perf_counter() - began:.1f}s)")
+        elif args.command == 'forget':
+            coverage_index.forget(args.district)
+            safe_print(f"Coverage for {args.district.upper()} dropped")
+        elif args.command == 'show':
+            totals = coverage_index.points(args.district)
+            for key, intervals in coverage_index.coverage(args.district, args.point or None).items():
+                info = totals[key]
+                safe_print(f"{key}  {info.records:,} records, every {info.step / 60:.0f} min, last {_fmt(info.last_ts)}")
+                for interval in intervals:
+                    safe_print(f"    {_fmt(interval.start)} -> {_fmt(interval.end)}  {interval.records:,}")
+        else:
+            if not args.start:
+                parser.error("gaps needs --start")
+            window_start = datetime.fromisoformat(args.start).timestamp()
+            window_end = datetime.fromisoformat(args.end).timestamp() if args.end else time.time()
+            began = time.perf_counter()
+            found = coverage_index.gaps(args.district, window_start, window_end, args.point or None)
+            elapsed_ms = (time.perf_counter() - began) * 1000
+            print_header(f"GAPS {args.start} -> {args.end or 'now'}: {len(found)} points ({elapsed_ms:.1f} ms)")
+            for key, holes in sorted(found.items()):
+                hours = sum(e - s for s, e in holes) / 3600
+                safe_print(f"{key:60s} {len(holes):3d} gaps, {hours:7.1f} h")
@@ -144,6 +144,36 @@ def get_vpn_credentials(district: str) -> Tuple[str, str]:
     return '', ''
 
 
+def get_ftp_credentials(district: str) -> Tuple[str, str]:
+    """
+    Get FTP upload credentials for a district.
+
+    Looks for {DISTRICT}_FTP_USER / {DISTRICT}_FTP_PASS, then the generic
+    FTP_USER / FTP_PASS.
+
+    Args:
+        district: District name
+
+    Returns:
+        Tuple of (username, password), ('', '') if not set
+    """
+    district = district.upper()
+
+    ftp_user = os.environ.get(f'{district}_FTP_USER')
+    ftp_pass = os.environ.get(f'{district}_FTP_PASS')
+
+    if ftp_user and ftp_pass:
+        return ftp_user, ftp_pass
+
+    ftp_user = os.environ.get('FTP_USER')
+    ftp_pass = os.environ.get('FTP_PASS')
+
+    if ftp_user and ftp_pass:
+        return ftp_user, ftp_pass
+
+    return '', ''
+
+
 def validate_credentials(district: str) -> bool:
     """
     Check if credentials are configured for a district.
@@ -201,8 +231,8 @@ def get_all_districts() -> List[str]:
         List of district names
     """
     try:
-        from config_district_details import district_config
-        return sorted(district_config.keys())
+        from district_registry import get_district_names
+        return get_district_names()
     except ImportError:
         return []
 
@@ -0,0 +1,356 @@
+"""
+================================================================================
+NIAGARA DISTRICT REGISTRY v2.0
+================================================================================
+Lazy, compiled access to the district configuration.
+
+config_district_details.py is a 2,000-line literal dict, most of which are
+smart_analytics paths the downloader never reads. The registry compiles the
+keys the downloader does use into a marshalled snapshot (keyed by the config
+file's mtime and size), validates them once at compile time, and only
+unpacks and builds a DistrictRecord for a district when it is first asked
+for.
+
+The full config module is imported only when the snapshot is missing or
+stale.
+
+USAGE:
+    from district_registry import get_district, get_district_names
+
+    record = get_district('WINDHAMSCHOOLSNH')
+    if record and record.has_base_ip:
+        print(record.base_ip, record.trend_folder)
+================================================================================
+"""
+
+import marshal
+import os
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from utils import CACHE_DIR
+from logging_config import get_logger
+
+logger = get_logger("registry")
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+CONFIG_MODULE = "config_district_details"
+CONFIG_PATH = Path(__file__).parent / f"{CONFIG_MODULE}.py"
+SNAPSHOT_PATH = CACHE_DIR / "district_config.snapshot"
+SNAPSHOT_VERSION = 1
+
+# Values that mean "not configured" in district_config
+EMPTY_MARKERS = ('na', 'n/a', '')
+
+# (record attribute, district_config key) in snapshot order
+FIELD_MAP: Tuple[Tuple[str, str], ...] = (
+    ('base_ip', 'BASE_IP'),
+    ('vpn_data', 'VPN_DATA'),
+    ('control_vendor', 'CONTROL_VENDOR'),
+    ('trend_folder', 'FOLDER_LOCATION_TREND_DATA'),
+    ('trend_point_list', 'TREND_POINT_LIST'),
+    ('page_toggle_one', 'PAGE_TOGGLE_ONE'),
+    ('page_toggle_two', 'PAGE_TOGGLE_TWO'),
+    ('ftp_host', 'FTP_HOST'),
+    ('ftp_user', 'FTP_USER'),
+    ('ftp_pass', 'FTP_PASS'),
+    ('ftp_source_dir', 'FTP_SOURCE_DIR'),
+    ('ftp_target_dir', 'FTP_TARGET_DIR'),
+    ('building_dictionary', 'BUILDING_DICTIONARY'),
+    ('rollup_url_template', 'ROLLUP_URL_TEMPLATE'),
+    ('priority_patterns', 'PRIORITY_PATTERNS'),
+    ('priority_weights', 'PRIORITY_WEIGHTS'),
+)
+
+# Dict-valued fields: str -> str, or str -> float for the priority settings
+DICT_FIELDS = {
+    'building_dictionary': str,
+    'priority_patterns': float,
+    'priority_weights': float,
+}
+
+
+def is_configured(value: Optional[str]) -> bool:
+    """Check that a config value is set (not blank, 'na' or 'n/a')."""
+    return bool(value) and value.strip().lower() not in EMPTY_MARKERS
+
+
+# ============================================================================
+# DISTRICT RECORD
+# ============================================================================
+class DistrictRecord:
+    """Typed, read-only view of the settings the downloader uses."""
+
+    __slots__ = ('name',) + tuple(attr for attr, _ in FIELD_MAP)
+
+    def __init__(
+        self,
+        name: str,
+        base_ip: str = '',
+        vpn_data: str = '',
+        control_vendor: str = '',
+        trend_folder: str = '',
+        trend_point_list: str = '',
+        page_toggle_one: str = '',
+        page_toggle_two: str = '',
+        ftp_host: str = '',
+        ftp_user: str = '',
+        ftp_pass: str = '',
+        ftp_source_dir: str = '',
+        ftp_target_dir: str = '',
+        building_dictionary: Optional[Dict[str, str]] = None,
+        rollup_url_template: str = '',
+        priority_patterns: Optional[Dict[str, float]] = None,
+        priority_weights: Optional[Dict[str, float]] = None
+    ) -> None:
+        self.name = name
+        self.base_ip = base_ip
+        self.vpn_data = vpn_data
+        self.control_vendor = control_vendor
+        self.trend_folder = trend_folder
+        self.trend_point_list = trend_point_list
+        self.page_toggle_one = page_toggle_one
+        self.page_toggle_two = page_toggle_two
+        self.ftp_host = ftp_host
+        self.ftp_user = ftp_user
+        self.ftp_pass = ftp_pass
+        self.ftp_source_dir = ftp_source_dir
+        self.ftp_target_dir = ftp_target_dir
+        self.building_dictionary = building_dictionary or {}
+        self.rollup_url_template = rollup_url_template
+        self.priority_patterns = priority_patterns or {}
+        self.priority_weights = priority_weights or {}
+
+    @property
+    def has_base_ip(self) -> bool:
+        """Check if BASE_IP is configured."""
+        return is_configured(self.base_ip)
+
+    @property
+    def vpn_type(self) -> str:
+        """VPN_DATA as a display string ('' when not configured)."""
+        return self.vpn_data if is_configured(self.vpn_data) else ''
+
+    def __repr__(self) -> str:
+        return f"DistrictRecord({self.name!r}, base_ip={self.base_ip!r})"
+
+
+# ============================================================================
+# COMPILATION
+# ============================================================================
+def _source_key() -> Optional[Tuple[int, int]]:
+    """Return (mtime_ns, size) of the config module without importing it."""
+    origin = str(CONFIG_PATH)
+    if not CONFIG_PATH.exists():
+        import importlib.util
+        try:
+            spec = importlib.util.find_spec(CONFIG_MODULE)
+        except (ImportError, ValueError):
+            return None
+        if spec is None or not spec.origin:
+            return None
+        origin = spec.origin
+    try:
+        st = os.stat(origin)
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+def _validate(name: Any, config: Any) -> Optional[List[Any]]:
+    """Validate one district_config entry and flatten it to snapshot order."""
+    if not isinstance(name, str) or not name.strip():
+        logger.warning("Skipping district with invalid name: %r", name)
+        return None
+    if not isinstance(config, dict):
+        logger.warning("Skipping %s: config is %s, not dict", name, type(config).__name__)
+        return None
+
+    values: List[Any] = []
+    for attr, key in FIELD_MAP:
+        value = config.get(key)
+        if attr in DICT_FIELDS:
+            if not isinstance(value, dict):
+                if value is not None:
+                    logger.warning("%s: %s is not a dict, ignored", name, key)
+                value = {}
+            value_type = DICT_FIELDS[attr]
+            converted = {}
+            for k, v in value.items():
+                try:
+                    converted[str(k)] = value_type(v)
+                except (TypeError, ValueError):
+                    logger.warning("%s: %s[%r] is not a valid %s, ignored", name, key, k, value_type.__name__)
+            value = converted
+        else:
+            value = '' if value is None else str(value).strip()
+        values.append(value)
+    return values
+
+
+def compile_config() -> Dict[str, List[Any]]:
+    """
+    Import district_config and compile it to validated rows.
+
+    Returns:
+        Dict mapping upper-case district name to field values in FIELD_MAP order
+    """
+    from config_district_details import district_config
+
+    compiled: Dict[str, List[Any]] = {}
+    for name, config in district_config.items():
+        values = _validate(name, config)
+        if values is None:
+            continue
+        key = name.strip().upper()
+        if key in compiled:
+            logger.warning("Duplicate district %s, keeping last definition", key)
+        compiled[key] = values
+
+    logger.debug("Compiled %d districts from %s", len(compiled), CONFIG_MODULE)
+    return compiled
+
+
+def _pack(rows: Dict[str, List[Any]]) -> Dict[str, bytes]:
+    """Marshal each district row separately so lookups only unpack one."""
+    return {name: marshal.dumps(tuple(values)) for name, values in rows.items()}
+
+
+def _load_snapshot(source_key: Optional[Tuple[int, int]]) -> Optional[Dict[str, bytes]]:
+    """Load the snapshot if it matches the current config file."""
+    if source_key is None:
+        return None
+    try:
+        with open(SNAPSHOT_PATH, 'rb') as f:
+            data = marshal.load(f)
+    except FileNotFoundError:
+        return None
+    except (OSError, EOFError, ValueError, TypeError):
+        logger.warning("Corrupt district snapshot: %s", SNAPSHOT_PATH)
+        return None
+
+    if (not isinstance(data, dict)
+            or data.get('version') != SNAPSHOT_VERSION
+            or data.get('fields') != tuple(attr for attr, _ in FIELD_MAP)
+            or data.get('source') != source_key):
+        return None
+    return data.get('districts')
+
+
+def _save_snapshot(source_key: Optional[Tuple[int, int]], packed: Dict[str, bytes]) -> None:
+    """Write the snapshot atomically; failures only cost the next startup."""
+    if source_key is None:
+        return
+    data = {
+        'version': SNAPSHOT_VERSION,
+        'source': source_key,
+        'fields': tuple(attr for attr, _ in FIELD_MAP),
+        'districts': packed,
+    }
+    try:
+        SNAPSHOT_PATH.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = SNAPSHOT_PATH.with_suffix(f'.{os.getpid()}.tmp')
+        with open(tmp_path, 'wb') as f:
+            marshal.dump(data, f)
+        os.replace(tmp_path, SNAPSHOT_PATH)
+    except OSError as e:
+        logger.debug("Could not write district snapshot: %s", e)
+
+
+# ============================================================================
+# REGISTRY
+# ============================================================================
+_lock = threading.Lock()
+_rows: Optional[Dict[str, bytes]] = None
+_records: Dict[str, DistrictRecord] = {}
+
+
+def _get_rows() -> Dict[str, bytes]:
+    """Return packed district rows, compiling the config on first use if needed."""
+    global _rows
+    if _rows is not None:
+        return _rows
+
+    with _lock:
+        if _rows is None:
+            source_key = _source_key()
+            rows = _load_snapshot(source_key)
+            if rows is None:
+                rows = _pack(compile_config())
+                _save_snapshot(source_key, rows)
+            _rows = rows
+    return _rows
+
+
+def get_district(district_name: str) -> Optional[DistrictRecord]:
+    """
+    Get the record for a district.
+
+    Args:
+        district_name: District name (case insensitive)
+
+    Returns:
+        DistrictRecord or None if the district is not configured
+    """
+    district = district_name.upper()
+    record = _records.get(district)
+    if record is not None:
+        return record
+
+    packed = _get_rows().get(district)
+    if packed is None:
+        return None
+
+    record = DistrictRecord(district, *marshal.loads(packed))
+    _records[district] = record
+    return record
+
+
+def get_district_names() -> List[str]:
+    """Get sorted list of all configured district names."""
+    return sorted(_get_rows())
+
+
+def district_exists(district_name: str) -> bool:
+    """Check if a district is configured."""
+    return district_name.upper() in _get_rows()
+
+
+def reload() -> None:
+    """Drop cached records so the next lookup re-checks the config file."""
+    global _rows
+    with _lock:
+        _rows = None
+        _records.clear()
+
+
+# ============================================================================
+# CLI
+# ============================================================================
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='District Registry v2.0')
+    parser.add_argument('--district', type=str, help='Show compiled record for district')
+    parser.add_argument('--rebuild', action='store_true', help='Recompile the snapshot')
+
+    args = parser.parse_args()
+
+    if args.rebuild:
+        _save_snapshot(_source_key(), _pack(compile_config()))
+        reload()
+        print(f"Snapshot rebuilt: {SNAPSHOT_PATH}")
+
+    if args.district:
+        record = get_district(args.district)
+        if record is None:
+            print(f"District '{args.district.upper()}' not found")
+        else:
+            for attr in DistrictRecord.__slots__:
+                print(f"  {attr:20s} {getattr(record, attr)}")
+    else:
+        names = get_district_names()
+        print(f"{len(names)} districts ({SNAPSHOT_PATH})")
@@ -0,0 +1,406 @@
+"""
+================================================================================
+NIAGARA DOWNLOAD ESTIMATE v2.0
+================================================================================
+Sizes a run before it starts: requests, bytes, duration and a suggested
+worker count per district, without opening any connections.
+
+The URL list is built exactly as download_niagara_fast builds it (point
+list, selection, backfill split, idle skip from point list metadata,
+already-downloaded files from the resume state) and is then priced with
+what past runs measured against the same station:
+
+    request_seconds   - mean time one request takes a worker
+    bytes_per_record  - CSV bytes per history record (metadata lists)
+    bytes_per_request - CSV bytes per file (id-only lists, rollups)
+    rate_by_workers   - requests/s reached at each worker count tried
+
+Each finished district updates its host's figures as an exponentially
+weighted moving average (EWMA_ALPHA), so a station that got slower or
+faster is reflected after a few runs. Hosts without history are priced
+with the DEFAULT_* figures and marked as such.
+
+The duration assumes workers stay busy at the measured request time; if a
+run already reached a higher request rate with fewer workers, the estimate
+uses that rate instead (the station, not the worker count, is the limit).
+The suggested worker count is the one with the best measured rate.
+
+Throughput history: .cache/throughput.json
+
+USAGE:
+    python download_niagara_fast.py --all-districts --days 365 --plan
+    python download_estimate.py                 # throughput history
+================================================================================
+"""
+
+import json
+import os
+import threading
+from dataclasses import dataclass, field, asdict
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+
+from utils import CACHE_DIR, atomic_write
+from logging_config import get_logger
+
+if TYPE_CHECKING:
+    from niagara_download_engine import DownloadStats
+    from niagara_url_generator import RollupSpec
+    from point_selection import PointSelector
+
+logger = get_logger("estimate")
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+THROUGHPUT_FILE = CACHE_DIR / "throughput.json"
+EWMA_ALPHA = 0.3             # weight of the newest run
+MIN_REQUESTS = 20            # smaller runs are too noisy to record
+
+# Used for hosts that have not been downloaded from yet
+DEFAULT_REQUEST_SECONDS = 1.5
+DEFAULT_BYTES_PER_RECORD = 40.0
+DEFAULT_BYTES_PER_REQUEST = 60_000.0
+LOGIN_SECONDS = 15.0         # browser login per district
+
+_history_lock = threading.Lock()  # districts finishing together (scheduler, API)
+
+
+def _ewma(old: float, new: float) -> float:
+    return new if old <= 0 else old + EWMA_ALPHA * (new - old)
+
+
+# ============================================================================
+# THROUGHPUT HISTORY
+# ============================================================================
+@dataclass
+class HostThroughput:
+    """Measured download figures for one station host."""
+    host: str = ""
+    request_seconds: float = 0.0
+    bytes_per_record: float = 0.0
+    bytes_per_request: float = 0.0
+    rate_by_workers: Dict[str, float] = field(default_factory=dict)  # workers -> requests/s
+    runs: int = 0
+    updated: str = ""
+
+    def update(self, stats: 'DownloadStats', workers: int, records: float = 0.0) -> bool:
+        """
+        Fold a finished batch into the averages.
+
+        Args:
+            stats: The batch's DownloadStats
+            workers: Fetch workers the batch ran with
+            records: Estimated records downloaded (0 = unknown)
+
+        Returns:
+            False if the batch was too small to count
+        """
+        requests = stats.success + stats.failed + stats.empty
+        if requests < MIN_REQUESTS or stats.elapsed <= 0:
+            return False
+        busy = stats.fetch_seconds or stats.elapsed * workers
+        self.request_seconds = _ewma(self.request_seconds, busy / requests)
+        if stats.success:
+            self.bytes_per_request = _ewma(self.bytes_per_request, stats.bytes_downloaded / stats.success)
+        if records > 0:
+            self.bytes_per_record = _ewma(self.bytes_per_record, stats.bytes_downloaded / records)
+        key = str(workers)
+        self.rate_by_workers[key] = _ewma(self.rate_by_workers.get(key, 0.0), requests / stats.elapsed)
+        self.runs += 1
+        self.updated = datetime.now().strftime('%Y-%m-%d %H:%M')
+        return True
+
+    def best_workers(self) -> Optional[int]:
+        """Worker count with the highest measured request rate."""
+        if not self.rate_by_workers:
+            return None
+        return int(max(self.rate_by_workers.items(), key=lambda kv: kv[1])[0])
+
+    def rate(self, workers: int) -> float:
+        """
+        Expected requests/s at a worker count.
+
+        Measured if that count was used before; otherwise workers divided
+        by the request time, but no more than the best rate measured with
+        fewer workers.
+        """
+        key = str(workers)
+        if key in self.rate_by_workers:
+            return self.rate_by_workers[key]
+        rate = workers / (self.request_seconds or DEFAULT_REQUEST_SECONDS)
+        below = [r for w, r in self.rate_by_workers.items() if int(w) < workers]
+        if below:
+            rate = min(rate, max(below))
+        return rate
+
+
+@dataclass
+class ThroughputHistory:
+    """Throughput figures for every station host downloaded from."""
+    hosts: Dict[str, HostThroughput] = field(default_factory=dict)
+
+    def save(self, path: Path = THROUGHPUT_FILE) -> None:
+        """Save history to JSON file (atomically)."""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        atomic_write(path, json.dumps(asdict(self), indent=2).encode('utf-8'))
+
+    @classmethod
+    def load(cls, path: Path = THROUGHPUT_FILE) -> 'ThroughputHistory':
+        """Load history from JSON file (empty if missing or corrupt)."""
+        if not path.exists():
+            return cls()
+        try:
+            with open(path) as f:
+                data = json.load(f)
+            return cls(hosts={h: HostThroughput(**v) for h, v in data.get('hosts', {}).items()})
+        except (json.JSONDecodeError, TypeError, AttributeError):
+            logger.warning("Corrupt throughput history: %s", path)
+            return cls()
+
+    def get(self, host: str) -> Optional[HostThroughput]:
+        return self.hosts.get(host)
+
+
+def host_of(base_ip: str) -> str:
+    """History key for a BASE_IP: host[:port]."""
+    from connectivity import parse_base_ip
+
+    _, host, port = parse_base_ip(base_ip)
+    return f"{host}:{port}" if port else host
+
+
+def record_throughput(
+    base_ip: str,
+    stats: 'DownloadStats',
+    workers: int,
+    records: float = 0.0,
+    path: Path = THROUGHPUT_FILE
+) -> None:
+    """
+    Add a finished district batch to the throughput history.
+
+    Args:
+        base_ip: District BASE_IP
+        stats: The batch's DownloadStats
+        workers: Fetch workers the batch ran with
+        records: Estimated records downloaded (0 = unknown, e.g. rollups)
+        path: History file
+    """
+    host = host_of(base_ip)
+    if not host:
+        return
+    with _history_lock:
+        history = ThroughputHistory.load(path)
+        entry = history.hosts.setdefault(host, HostThroughput(host=host))
+        if not entry.update(stats, workers, records):
+            return
+        history.save(path)
+    logger.info(
+        "Throughput for %s: %.2fs/request, %.1f req/s at %d workers",
+        host, entry.request_seconds, entry.rate(workers), workers
+    )
+
+
+# ============================================================================
+# ESTIMATE
+# ============================================================================
+@dataclass
+class DistrictEstimate:
+    """Planned work for one district."""
+    district: str
+    host: str = ""
+    points: int = 0
+    requests: int = 0
+    skipped: int = 0             # already downloaded today
+    idle: int = 0                # no records in the window (metadata)
+    backfill: int = 0            # of requests, long-window backfill
+    records: float = 0.0
+    bytes: float = 0.0
+    seconds: float = 0.0
+    workers: int = 0
+    suggested_workers: Optional[int] = None
+    measured: bool = False       # priced from this host's history
+    error: str = ""
+
+    def describe(self) -> str:
+        """One table row for console output."""
+        if self.error:
+            return f"{self.district:25s} | {self.error}"
+        workers = str(self.workers)
+        if self.suggested_workers and self.suggested_workers != self.workers:
+            workers += f" (try {self.suggested_workers})"
+        basis = '' if self.measured else ' *'
+        return (
+            f"{self.district:25s} | {self.requests:6d} | {self.skipped:5d} | {self.idle:5d} | "
+            f"{self.bytes / 1024 / 1024:8.1f} | {format_duration(self.seconds):>8s}{basis:2s} | {workers}"
+        )
+
+
+def format_duration(seconds: float) -> str:
+    """Compact duration, e.g. '45s', '12m', '3h05m'."""
+    if seconds < 60:
+        return f"{seconds:.0f}s"
+    if seconds < 3600:
+        return f"{seconds / 60:.0f}m"
+    hours, rest = divmod(int(seconds), 3600)
+    return f"{hours}h{rest // 60:02d}m"
+
+
+def estimate_district(
+    district_name: str,
+    days: int = 90,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    workers: int = 10,
+    output_dir: Optional[str] = None,
+    force: bool = False,
+    backfill_days: int = 365,
+    skip_idle: bool = True,
+    rollup: Optional['RollupSpec'] = None,
+    selector: Optional['PointSelector'] = None,
+    history: Optional[ThroughputHistory] = None,
+    login: bool = True
+) -> DistrictEstimate:
+    """
+    Plan one district's download the way process_district would run it.
+
+    Args:
+        district_name: District name
+        days, start_date, end_date, workers, output_dir, force,
+        backfill_days, skip_idle, rollup, selector: As for process_district
+        history: Throughput history (loaded if not given)
+        login: Add a browser login to the duration
+
+    Returns:
+        DistrictEstimate (error set if the district cannot be planned)
+    """
+    from niagara_url_generator import URLGenerator
+    from point_list_changes import get_pending_backfill
+    from download_planner import plan_downloads
+    from niagara_download_engine import filter_existing_files
+
+    estimate = DistrictEstimate(district_name.upper(), workers=workers)
+    try:
+        url_gen = URLGenerator(district_name)
+    except ValueError as e:
+        estimate.error = str(e)
+        return estimate
+    if not url_gen.has_point_list:
+        estimate.error = "no point list"
+        return estimate
+    estimate.host = host_of(url_gen.base_ip)
+    estimate.points = url_gen.point_count
+
+    output_folder = os.path.join(output_dir, url_gen.district) if output_dir else url_gen.output_folder
+    if rollup is not None:
+        output_folder = url_gen.rollup_folder(rollup, output_folder)
+
+    points: Optional[List[str]] = None
+    if selector is not None and selector.is_active:
+        points = url_gen.select_points(selector)
+
+    if start_date and end_date:
+        url_list = url_gen.generate(start_date=start_date, end_date=end_date, points=points, rollup=rollup)
+        window_start = datetime.strptime(start_date, '%Y-%m-%d')
+    else:
+        url_list = url_gen.generate(days=days, points=points, rollup=rollup)
+        window_start = datetime.today() - timedelta(days=days)
+
+    backfill_list: List[Tuple[str, str]] = []
+    if backfill_days > 0 and rollup is None and not (start_date and end_date):
+        pending = get_pending_backfill(url_gen.district)
+        backfill_points = [p for p in (url_gen.points if points is None else points) if p in pending]
+        if backfill_points:
+            backfill_list = url_gen.generate(days=max(backfill_days, days), points=backfill_points)
+            pending_set = set(backfill_points)
+            url_list = [(p, u) for p, u in url_list if p not in pending_set]
+
+    metadata = url_gen.metadata
+    records: Dict[str, float] = {}
+    if metadata:
+        fetched_at = os.path.getmtime(url_gen.point_list_path)
+        plan = plan_downloads(url_list, metadata, window_start, fetched_at, skip_idle=skip_idle)
+        url_list = plan.url_list
+        estimate.idle = len(plan.idle)
+        records = plan.estimates
+        if backfill_list:
+            backfill_start = datetime.today() - timedelta(days=max(backfill_days, days))
+            records.update(plan_downloads(backfill_list, metadata, backfill_start, fetched_at,
+                                          skip_idle=False).estimates)
+
+    filtered, skipped = filter_existing_files(url_list, output_folder, force)
+    filtered_backfill, skipped_backfill = filter_existing_files(
+        backfill_list, os.path.join(output_folder, 'backfill'), force
+    )
+    estimate.skipped = skipped + skipped_backfill
+    estimate.backfill = len(filtered_backfill)
+    estimate.requests = len(filtered) + len(filtered_backfill)
+
+    entry = (history or ThroughputHistory.load()).get(estimate.host)
+    estimate.measured = entry is not None and entry.runs > 0
+    if entry is None:
+        entry = HostThroughput(host=estimate.host)
+
+    if records and rollup is None:
+        estimate.records = sum(records.get(p, 0.0) for p, _ in filtered + filtered_backfill)
+        estimate.bytes = estimate.records * (entry.bytes_per_record or DEFAULT_BYTES_PER_RECORD)
+    else:
+        estimate.bytes = estimate.requests * (entry.bytes_per_request or DEFAULT_BYTES_PER_REQUEST)
+
+    if estimate.requests:
+        estimate.seconds = estimate.requests / entry.rate(workers) + (LOGIN_SECONDS if login else 0.0)
+    estimate.suggested_workers = entry.best_workers()
+    return estimate
+
+
+def print_plan(estimates: List[DistrictEstimate]) -> None:
+    """Print the plan table and totals."""
+    from utils import safe_print, print_header
+
+    print_header("DOWNLOAD PLAN (no connections made)")
+    safe_print(f"{'District':25s} | {'Reqs':>6s} | {'Skip':>5s} | {'Idle':>5s} | {'MB':>8s} | {'Time':>10s} | Workers")
+    safe_print("-" * 90)
+    for estimate in estimates:
+        safe_print(estimate.describe())
+    planned = [e for e in estimates if not e.error]
+    safe_print("-" * 90)
+    safe_print(
+        f"{'TOTAL':25s} | {sum(e.requests for e in planned):6d} | "
+        f"{sum(e.skipped for e in planned):5d} | {sum(e.idle for e in planned):5d} | "
+        f"{sum(e.bytes for e in planned) / 1024 / 1024:8.1f} | "
+        f"{format_duration(sum(e.seconds for e in planned)):>8s}"
+    )
+    if any(not e.measured for e in planned):
+        safe_print("* no throughput history for this station yet; default figures used")
+
+
+# ============================================================================
+# CLI
+# ============================================================================
+if __name__ == '__main__':
+    import argparse
+
+    from utils import safe_print, print_header, setup_console_encoding
+
+    setup_console_encoding()
+
+    parser = argparse.ArgumentParser(description='Download Estimate v2.0 (throughput history)')
+    parser.add_argument('--clear', action='store_true', help='Forget all throughput history')
+    args = parser.parse_args()
+
+    if args.clear:
+        THROUGHPUT_FILE.unlink(missing_ok=True)
+        safe_print("Throughput history cleared")
+    else:
+        loaded = ThroughputHistory.load()
+        print_header("THROUGHPUT HISTORY")
+        if not loaded.hosts:
+            safe_print("No runs recorded yet")
+        for host, item in sorted(loaded.hosts.items()):
+            rates = ', '.join(f"{w}w {r:.1f}/s" for w, r in sorted(item.rate_by_workers.items(), key=lambda kv: int(kv[0])))
+            safe_print(
+                f"{host:28s} {item.request_seconds:5.2f}s/req  {item.bytes_per_record:5.0f} B/rec  "
+                f"{item.bytes_per_request / 1024:6.1f} KB/file  runs {item.runs:3d}  [{rates}]"
+            )
@@ -12,36 +12,60 @@ USAGE:
 """
 
 import argparse
+import json
 import os
 import sys
+import threading
 import time
-from datetime import datetime
-from typing import List, Optional, Tuple
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional, Set, Tuple
 
-from utils import safe_print, print_header, setup_console_encoding, APP_VERSION
+from utils import (
+    safe_print, print_header, setup_console_encoding, atomic_write, APP_VERSION,
+    BACKFILL_SUBFOLDER, GAP_FILL_SUBFOLDER
+)
 from logging_config import get_logger
 
 setup_console_encoding()
 
 logger = get_logger("download_fast")
 
-from config_district_details import district_config
-from niagara_download_engine import (
-    DownloadEngine, DownloadStats, ProgressPrinter, filter_existing_files
-)
-from niagara_url_generator import URLGenerator, get_available_districts
-from niagara_auth import NiagaraAuth
-
-try:
-    from fetch_pointlist import fetch_pointlist_selenium
-    FETCH_POINTLIST_AVAILABLE: bool = True
-except ImportError:
-    FETCH_POINTLIST_AVAILABLE = False
+from district_registry import get_district
+from credentials import get_district_credentials
+from niagara_url_generator import RollupSpec, URLGenerator, get_available_districts, get_point_list_path
+from point_list_changes import get_pending_backfill, mark_backfilled
+from download_planner import plan_downloads
+from download_priority import PriorityScorer, build_scorer, prioritize, record_run
+from download_estimate import ThroughputHistory, estimate_district, host_of, print_plan, record_throughput
+from point_selection import PointSelector
+
+# The download engine (requests/urllib3), auth, fetch_pointlist and the run
+# history (sqlite3) are imported on first use so --list-districts and --help
+# start fast.
+if TYPE_CHECKING:
+    from niagara_download_engine import DownloadStats
 
 DEFAULT_DAYS: int = 90
 DEFAULT_WORKERS: int = 10
 DEFAULT_THROTTLE: float = 0.0
 DEFAULT_TOGGLE_INTERVAL: int = 100
+DEFAULT_BACKFILL_DAYS: int = 365
+DEFAULT_AUTH_WORKERS: int = 3
+RESOLUTION_MARKER: str = "resolution.json"
+
+
+def get_fetch_pointlist() -> Optional[Callable[..., bool]]:
+    """Import fetch_pointlist_selenium on first use.
+
+    Returns:
+        The fetch function, or None if its dependencies are not installed.
+    """
+    try:
+        from fetch_pointlist import fetch_pointlist_selenium
+    except ImportError:
+        return None
+    return fetch_pointlist_selenium
 
 
 def list_districts() -> None:
@@ -49,12 +73,9 @@ def list_districts() -> None:
     print_header("AVAILABLE DISTRICTS")
     districts: List[str] = get_available_districts()
     for i, district in enumerate(districts, 1):
-        config = district_config.get(district, {})
-        base_ip: str = config.get('BASE_IP', 'N/A')
-        from niagara_auth import get_credentials
-        user, passwd = get_credentials(district)
+        base_ip: str = get_district(district).base_ip or 'N/A'
+        user, passwd = get_district_credentials(district)
         cred_status: str = "Y" if (user and passwd) else "N"
-        from niagara_url_generator import get_point_list_path
         path, source = get_point_list_path(district)
         pl_status: str = "Y" if path else "N"
         safe_print(f"{i:2d}. [{cred_status}][{pl_status}] {district:25s} | {base_ip[:40]}")
@@ -93,6 +114,52 @@ def select_district_interactive() -> Optional[List[str]]:
             return None
 
 
+def _write_resolution_marker(folder: str, rollup: RollupSpec) -> None:
+    """Record the rollup resolution of a folder for downstream consumers."""
+    os.makedirs(folder, exist_ok=True)
+    marker = {'interval': rollup.interval, 'seconds': rollup.seconds, 'aggregate': rollup.aggregate}
+    atomic_write(os.path.join(folder, RESOLUTION_MARKER), json.dumps(marker, indent=2).encode('utf-8'))
+
+
+def _close_stages(*stages: object) -> None:
+    """Close pipeline stages a failed run left open (errors are logged, not raised)."""
+    for stage in stages:
+        if stage is None:
+            continue
+        try:
+            stage.close()
+        except Exception:
+            logger.exception("Could not close %s", type(stage).__name__)
+
+
+def _completed_today(folder: str) -> Set[str]:
+    """Points the resume state of today's date folder under folder lists as completed."""
+    from niagara_download_engine import DownloadState
+
+    state_path = os.path.join(folder, datetime.now().strftime('%Y-%m-%d'), '.download_state.json')
+    state = DownloadState.load(Path(state_path))
+    return state.completed_set if state is not None else set()
+
+
+def _mark_backfill_done(
+    district_name: str,
+    backfill_list: List[Tuple[str, str]],
+    backfill_folder: str
+) -> None:
+    """Dequeue backfill points that today's backfill run completed.
+
+    Args:
+        district_name: Name of the district.
+        backfill_list: (point_path, url) tuples queued for backfill.
+        backfill_folder: Base folder the backfill batch wrote to.
+    """
+    done = _completed_today(backfill_folder)
+    count: int = mark_backfilled(district_name, [p for p, _ in backfill_list if p in done])
+    if count:
+        safe_print(f"Backfilled:  {count} new points")
+        logger.info("Backfilled %d new points for %s", count, district_name)
+
+
 def process_district(
     district_name: str,
     days: int = DEFAULT_DAYS,
@@ -105,8 +172,24 @@ def process_district(
     cookie: Optional[str] = None,
     headless: bool = False,
     toggle_interval: int = DEFAULT_TOGGLE_INTERVAL,
-    auto_fetch: bool = False
-) -> Optional[DownloadStats]:
+    auto_fetch: bool = False,
+    backfill_days: int = DEFAULT_BACKFILL_DAYS,
+    skip_idle: bool = True,
+    rollup: Optional[RollupSpec] = None,
+    selector: Optional[PointSelector] = None,
+    hedge: bool = False,
+    writers: Optional[int] = None,
+    session_cookies: Optional[Dict[str, str]] = None,
+    cancel_event: Optional[threading.Event] = None,
+    progress_callback: Optional[Callable[[int, int, str, str], None]] = None,
+    upload: bool = False,
+    postprocess: bool = False,
+    post_workers: Optional[int] = None,
+    store: bool = False,
+    coverage: bool = True,
+    gap_fill: bool = False,
+    source: str = 'cli'
+) -> Optional['DownloadStats']:
     """Process a single district: authenticate, generate URLs, and download.
 
     Args:
@@ -122,6 +205,38 @@ def process_district(
         headless: Run browser authentication in headless mode.
         toggle_interval: Interval for session toggle refresh.
         auto_fetch: Automatically fetch point list if missing.
+        backfill_days: History window for points added since the previous
+            point list fetch (0 disables backfill).
+        skip_idle: Skip histories whose metadata shows no records in the
+            window (only for point lists fetched with metadata).
+        rollup: Download station-side rollups into a separate folder
+            instead of raw records (no backfill in this mode).
+        selector: Building/pattern filter; only matching points are downloaded.
+        hedge: Send a duplicate request for points slower than the p95
+            latency (capped at 5% extra requests).
+        writers: Disk writer threads (default: workers // 2, 0 = workers
+            write their own files).
+        session_cookies: Cookies of an already authenticated session
+            (skips the login, e.g. from niagara_scheduler).
+        cancel_event: Set to stop the download early; points not started
+            stay in the resume state for the next run.
+        progress_callback: Called as (completed, total, point_path, status)
+            instead of printing progress (e.g. from niagara_api).
+        upload: Upload each file to the district's FTP target as soon as
+            it is downloaded (ftp_upload).
+        postprocess: Parse, validate, hash and convert each file to
+            columnar form in worker processes as it is downloaded
+            (post_process).
+        post_workers: Worker processes for postprocess (default: cores - 1).
+        store: Merge the new files into the district's trend store
+            (trend_store) after downloading; raw downloads only.
+        coverage: Index each written file's coverage intervals
+            (coverage_index) as it lands; raw downloads only.
+        gap_fill: Instead of the whole window, download only the coverage
+            gaps inside it (gap_fill), one time-range request per point,
+            into backfill/gaps/.
+        source: What started the run, for the run history ('cli',
+            'scheduler', 'api').
 
     Returns:
         DownloadStats on success, or None on failure.
@@ -142,7 +257,8 @@ def process_district(
     safe_print(f"Points:      {info['point_count']}")
 
     if not url_gen.has_point_list:
-        if auto_fetch and FETCH_POINTLIST_AVAILABLE:
+        fetch_pointlist_selenium = get_fetch_pointlist()
+        if auto_fetch and fetch_pointlist_selenium:
             safe_print("\nAttempting to auto-fetch point list...")
             logger.info("Auto-fetching point list for %s", district_name)
             success: bool = fetch_pointlist_selenium(district_name, headless=False)
@@ -164,7 +280,7 @@ def process_district(
         else:
             safe_print(f"\nERROR: No point list found for {district_name}")
             logger.error("No point list found for %s", district_name)
-            if FETCH_POINTLIST_AVAILABLE:
+            if fetch_pointlist_selenium:
                 safe_print(f"Use --auto-fetch flag to fetch automatically")
             else:
                 safe_print(f"Run: python fetch_pointlist.py --district {district_name}")
@@ -174,74 +290,296 @@ def process_district(
         output_folder: str = os.path.join(output_dir, district_name)
     else:
         output_folder = info['output_folder']
+    district_folder: str = output_folder
+    if gap_fill and rollup is not None:
+        safe_print("ERROR: Gap fill works on raw downloads only")
+        return None
+    if gap_fill:
+        output_folder = os.path.join(district_folder, BACKFILL_SUBFOLDER, GAP_FILL_SUBFOLDER)
+    if rollup is not None:
+        output_folder = url_gen.rollup_folder(rollup, output_folder)
+        safe_print(f"Rollup:      {rollup.interval} {rollup.aggregate}")
     safe_print(f"Output:      {output_folder}")
 
+    points: Optional[List[str]] = None
+    if selector is not None and selector.is_active:
+        points = url_gen.select_points(selector)
+        safe_print(f"Selection:   {len(points)} of {url_gen.point_count} points ({selector.describe()})")
+        if not points:
+            safe_print("ERROR: Selection matched no points")
+            logger.error("Selection matched no points for %s: %s", district_name, selector.describe())
+            return None
+
     safe_print("\nGenerating URLs...")
+    gap_plan = None
     try:
-        if start_date and end_date:
-            url_list: List[str] = url_gen.generate(start_date=start_date, end_date=end_date)
+        if gap_fill:
+            from gap_fill import plan_gap_fill
+
+            if start_date and end_date:
+                gap_start: datetime = datetime.strptime(start_date, '%Y-%m-%d')
+                gap_end: datetime = datetime.strptime(end_date, '%Y-%m-%d')
+            else:
+                gap_end = datetime.combine(datetime.today().date(), datetime.min.time())
+                gap_start = gap_end - timedelta(days=days)
+            gap_plan = plan_gap_fill(url_gen, district_folder, gap_start, gap_end, points)
+            url_list = gap_plan.url_list(url_gen)
+            safe_print(f"Gaps:        {gap_start:%Y-%m-%d} to {gap_end:%Y-%m-%d}, {gap_plan.summary()}")
+        elif start_date and end_date:
+            url_list: List[str] = url_gen.generate(
+                start_date=start_date, end_date=end_date, points=points, rollup=rollup
+            )
             safe_print(f"Date range:  {start_date} to {end_date}")
         else:
-            url_list = url_gen.generate(days=days)
+            url_list = url_gen.generate(days=days, points=points, rollup=rollup)
             safe_print(f"Date range:  Last {days} days")
     except ValueError as e:
         safe_print(f"ERROR: {e}")
         logger.error("URL generation failed for %s: %s", district_name, e)
         return None
 
-    safe_print(f"URLs:        {len(url_list)}")
-    logger.info("Generated %d URLs for %s", len(url_list), district_name)
+    # Points added since the previous point list fetch get one long-window
+    # download into the backfill folder instead of the incremental window.
+    backfill_list: List[Tuple[str, str]] = []
+    backfill_folder: Optional[str] = None if gap_fill else os.path.join(output_folder, BACKFILL_SUBFOLDER)
+    if backfill_folder is not None and backfill_days > 0 and rollup is None and not (start_date and end_date):
+        pending = get_pending_backfill(district_name)
+        backfill_points: List[str] = [
+            p for p in (url_gen.points if points is None else points) if p in pending
+        ]
+        if backfill_points:
+            backfill_list = url_gen.generate(days=max(backfill_days, days), points=backfill_points)
+            pending_set = set(backfill_points)
+            url_list = [(p, u) for p, u in url_list if p not in pending_set]
+            safe_print(f"Backfill:    {len(backfill_list)} new points, last {max(backfill_days, days)} days")
+
+    # History metadata (enriched point lists): skip idle, heaviest first
+    metadata = url_gen.metadata
+    estimates: Dict[str, float] = {}
+    if metadata:
+        fetched_at: float = os.path.getmtime(info['point_list_path'])
+        if start_date and end_date:
+            window_start: datetime = datetime.strptime(start_date, '%Y-%m-%d')
+        else:
+            window_start = datetime.today() - timedelta(days=days)
+        plan = plan_downloads(url_list, metadata, window_start, fetched_at, skip_idle=skip_idle)
+        url_list = plan.url_list
+        estimates = plan.estimates
+        safe_print(f"Plan:        {plan.summary()}")
+
+    # Most valuable first, so an interrupted run has already fetched it
+    scorer: PriorityScorer = build_scorer(url_gen.record, output_folder, estimates)
+    url_list = prioritize(url_list, scorer)
+    if backfill_list:
+        backfill_list = prioritize(backfill_list, scorer)
+
+    safe_print(f"URLs:        {len(url_list) + len(backfill_list)}")
+    logger.info("Generated %d URLs for %s", len(url_list) + len(backfill_list), district_name)
+
+    from niagara_download_engine import (
+        DownloadEngine, DownloadStats, ProgressPrinter, filter_existing_files
+    )
+    from niagara_auth import NiagaraAuth
 
     filtered_list: List[str]
     skipped: int
     filtered_list, skipped = filter_existing_files(url_list, output_folder, force)
+    filtered_backfill: List[Tuple[str, str]] = []
+    skipped_backfill: int = 0
+    if backfill_list:
+        filtered_backfill, skipped_backfill = filter_existing_files(backfill_list, backfill_folder, force)
+    skipped += skipped_backfill
     if skipped > 0:
         safe_print(f"Skipping:    {skipped} already downloaded")
-        safe_print(f"Remaining:   {len(filtered_list)}")
-
-    if not filtered_list:
-        safe_print("\nAll files already downloaded!")
-        logger.info("All files already downloaded for %s", district_name)
-        stats: DownloadStats = DownloadStats(total=0, skipped=skipped)
-        return stats
-
-    safe_print("\nAuthenticating...")
-    auth: NiagaraAuth = NiagaraAuth(district_name)
-    if cookie:
-        cookies = auth.login_with_cookie(cookie)
-        safe_print(f"Using provided cookie")
-        logger.info("Authenticated with provided cookie for %s", district_name)
-    else:
-        cookies = auth.login(headless=headless, keep_driver=(toggle_interval > 0))
-        if not cookies:
-            safe_print("ERROR: Authentication failed")
-            logger.error("Authentication failed for %s", district_name)
-            return None
-        logger.info("Authenticated successfully for %s", district_name)
-
-    safe_print(f"\nStarting parallel download ({workers} workers)...")
-    safe_print(f"Throttle: {throttle}s between requests" if throttle > 0 else "Max speed (no throttle)")
-    safe_print("-" * 70)
+        safe_print(f"Remaining:   {len(filtered_list) + len(filtered_backfill)}")
+
+    # Stages own worker processes, threads and FTP connections, and auth may
+    # hold a pooled browser: a run that raises must still shut down whatever
+    # it started (each stage is set to None once closed normally)
+    auth: Optional[NiagaraAuth] = None
+    uploader = None
+    post_stage = None
+    coverage_updater = None
+    try:
+        if upload:
+            from ftp_upload import UploadStage, ftp_target_for
 
-    progress: ProgressPrinter = ProgressPrinter(show_every=max(1, len(filtered_list) // 100))
-    start_time: float = time.time()
+            target = ftp_target_for(district_name)
+            if target is None:
+                safe_print("WARNING: No usable FTP_HOST, upload skipped")
+                logger.warning("Upload requested but %s has no usable FTP target", district_name)
+            else:
+                uploader = UploadStage(target, district_folder)
+                today: str = datetime.now().strftime('%Y-%m-%d')
+                for folder in (f for f in (output_folder, backfill_folder) if f is not None):
+                    uploader.submit_pending(os.path.join(folder, today))  # resumed day folders
+                safe_print(f"Upload:      ftp://{target.host}{target.remote_path('')}")
+
+        if not filtered_list and not filtered_backfill:
+            safe_print("\nAll files already downloaded!")
+            logger.info("All files already downloaded for %s", district_name)
+            if backfill_list:
+                _mark_backfill_done(district_name, backfill_list, backfill_folder)
+            if uploader is not None:
+                safe_print(f"FTP: {uploader.close().summary()}")
+                uploader = None
+            stats: DownloadStats = DownloadStats(total=0, skipped=skipped)
+            return stats
+
+        safe_print("\nAuthenticating...")
+        auth = NiagaraAuth(district_name)
+        if session_cookies:
+            cookies = dict(session_cookies)
+            if toggle_interval > 0:
+                auth.hold_browser(headless=headless)  # as login(keep_driver=True) would
+            safe_print("Using existing session")
+            logger.info("Reusing authenticated session for %s", district_name)
+        elif cookie:
+            cookies = auth.login_with_cookie(cookie)
+            safe_print(f"Using provided cookie")
+            logger.info("Authenticated with provided cookie for %s", district_name)
+        else:
+            cookies = auth.login(headless=headless, keep_driver=(toggle_interval > 0))
+            if not cookies:
+                safe_print("ERROR: Authentication failed")
+                logger.error("Authentication failed for %s", district_name)
+                if uploader is not None:
+                    uploader.close()  # still sends the resumed files
+                    uploader = None
+                return None
+            logger.info("Authenticated successfully for %s", district_name)
 
-    with DownloadEngine(
-        cookies=cookies,
-        max_workers=workers,
-        throttle_delay=throttle,
-        progress_callback=progress
-    ) as engine:
-        stats = engine.download_batch_with_resume(filtered_list, output_folder, district=district_name)
+        safe_print(f"\nStarting parallel download ({workers} workers)...")
+        safe_print(f"Throttle: {throttle}s between requests" if throttle > 0 else "Max speed (no throttle)")
+        safe_print("-" * 70)
 
-    auth.close()
+        total_urls: int = len(filtered_list) + len(filtered_backfill)
+        progress = progress_callback or ProgressPrinter(show_every=max(1, total_urls // 100))
+        start_time: float = time.time()
+
+        if postprocess:
+            from post_process import PostProcessStage
+            post_stage = PostProcessStage(workers=post_workers)
+            safe_print(f"Post-processing in {post_stage.workers} worker processes")
+
+        gap_done_before: Set[str] = _completed_today(output_folder) if gap_plan is not None else set()
+
+        if coverage and rollup is None:
+            from coverage_index import CoverageUpdater
+            coverage_updater = CoverageUpdater(district_name, district_folder)
+
+        on_file_hooks: List[Callable[[str], object]] = [
+            stage.submit for stage in (uploader, post_stage, coverage_updater) if stage is not None
+        ]
+
+        def on_file(path: str) -> None:
+            for hook in on_file_hooks:
+                hook(path)
+
+        with DownloadEngine(
+            cookies=cookies,
+            max_workers=workers,
+            throttle_delay=throttle,
+            progress_callback=progress,
+            hedge=hedge,
+            writer_threads=writers,
+            cancel_event=cancel_event,
+            on_file=on_file if on_file_hooks else None,
+            validate=rollup.check_spacing if rollup is not None else None
+        ) as engine:
+            stats = engine.download_batch_with_resume(filtered_list, output_folder, district=district_name)
+            if filtered_backfill and not engine.cancelled:
+                safe_print(f"Backfilling {len(filtered_backfill)} new points...")
+                stats.merge(engine.download_batch_with_resume(
+                    filtered_backfill, backfill_folder, district=district_name
+                ))
+        if backfill_list:
+            _mark_backfill_done(district_name, backfill_list, backfill_folder)
+        if rollup is not None:
+            from retry_queue import INVALID
+
+            if stats.errors_by_class.get(INVALID):
+                # Possibly raw rows from a station ignoring the rollup query
+                safe_print("WARNING: Invalid rollup responses, resolution.json not written (see errors)")
+                logger.warning("%s: %d invalid rollup responses, resolution marker not written",
+                               district_name, stats.errors_by_class[INVALID])
+            else:
+                _write_resolution_marker(output_folder, rollup)
+        if gap_plan is not None:
+            # Only requests that were sent and answered count as attempts (not
+            # those skipped, dropped as idle or left over by a cancel)
+            gap_plan.record_attempts(_completed_today(output_folder) - gap_done_before)
+        else:
+            record_run(output_folder, district_name)
+        if throttle <= 0:
+            # Throughput history for --plan (records only known for metadata lists)
+            records: float = 0.0
+            if estimates and rollup is None and not gap_fill and not filtered_backfill:
+                records = sum(estimates.get(p, 0.0) for p, _ in filtered_list)
+            record_throughput(info['base_ip'], stats, workers, records)
+        upload_stats = None
+        if uploader is not None:
+            safe_print("Finishing uploads...")
+            upload_stats = uploader.close()
+            uploader = None
+        post_stats = None
+        if post_stage is not None:
+            safe_print("Finishing post-processing...")
+            post_stats = post_stage.close()
+            post_stage = None
+        if coverage_updater is not None:
+            indexed: int = coverage_updater.close()
+            safe_print(f"Coverage index: {indexed} files indexed"
+                       + (f", {len(coverage_updater.errors)} unreadable" if coverage_updater.errors else ""))
+            coverage_updater = None
+        if store and rollup is None:
+            from trend_store import TrendStore
+            with TrendStore(output_dir) as trend_store:
+                ingested: Dict[str, int] = trend_store.ingest(district_name)
+            safe_print(f"Trend store: {ingested['points']} points updated, {ingested['records']:,} records")
+    finally:
+        _close_stages(uploader, post_stage, coverage_updater)
+        if auth is not None:
+            auth.close()  # checks the kept browser back into the pool
     stats.skipped = skipped
+    if start_date and end_date:
+        window: Tuple[str, str] = (start_date, end_date)
+    else:
+        today_dt: datetime = datetime.today()
+        window = ((today_dt - timedelta(days=days)).strftime('%Y-%m-%d'), today_dt.strftime('%Y-%m-%d'))
+    from run_history import save_run
+
+    save_run(
+        district_name, stats, host=host_of(info['base_ip']), source=source, workers=workers,
+        window_start=window[0], window_end=window[1],
+        rollup=rollup.resolution if rollup is not None else None
+    )
     elapsed: float = time.time() - start_time
 
     safe_print("-" * 70)
     safe_print(f"\nCOMPLETED: {district_name}")
     safe_print(f"  {stats.summary()}")
     safe_print(f"  Throughput: {stats.bytes_downloaded / 1024 / 1024:.1f} MB")
+    latency: Dict[str, float] = stats.latency_percentiles()
+    if latency:
+        safe_print(
+            f"  Latency: p50 {latency['p50'] * 1000:.0f} ms | p95 {latency['p95'] * 1000:.0f} ms | "
+            f"max {latency['max'] * 1000:.0f} ms"
+        )
+    if stats.errors_by_class:
+        safe_print(f"  Failures: {stats.failure_breakdown()}")
+    if stats.pipeline_summary():
+        safe_print(f"  Stages: {stats.pipeline_summary()}")
+        logger.info("Stage utilisation for %s: %s", district_name, stats.pipeline_summary())
+    if upload_stats is not None:
+        safe_print(f"  FTP: {upload_stats.summary()}")
+        logger.info("Upload for %s: %s", district_name, upload_stats.summary())
+        for path, err in upload_stats.errors[:10]:
+            logger.error("Upload error for %s: %s", path, err)
+    if post_stats is not None:
+        safe_print(f"  Post: {post_stats.summary()}")
+        for name, err in post_stats.errors[:10]:
+            logger.error("Post-processing error for %s: %s", name, err)
     logger.info(
         "Completed %s: %s (%.1f MB in %.1fs)",
         district_name, stats.summary(),
@@ -275,6 +613,9 @@ Examples:
   %(prog)s --district WINDHAMSCHOOLSNH
   %(prog)s --district WINDHAMSCHOOLSNH --days 30 --workers 20
   %(prog)s --all-districts
+  %(prog)s --all-districts --days 365 --plan
+  %(prog)s --district WINDHAMSCHOOLSNH --days 90 --gap-fill
+  %(prog)s --district WINDHAMSCHOOLSNH --building GOLDENBROOK --exclude '*Alarm*' --force
         """
     )
 
@@ -294,6 +635,40 @@ Examples:
     parser.add_argument('--headless', action='store_true')
     parser.add_argument('--toggle-interval', type=int, default=DEFAULT_TOGGLE_INTERVAL)
     parser.add_argument('--auto-fetch', action='store_true')
+    parser.add_argument('--backfill-days', type=int, default=DEFAULT_BACKFILL_DAYS,
+                        help='History window for newly added points (0 = off)')
+    parser.add_argument('--keep-idle', action='store_true',
+                        help='Download histories with no records in the window')
+    parser.add_argument('--rollup', type=str, metavar='INTERVAL[:AGG]',
+                        help='Station-side rollup, e.g. 15m:avg, 1h:max (avg/min/max/last)')
+    parser.add_argument('--building', nargs='+', default=[],
+                        help='Only points in these buildings (BUILDING_DICTIONARY)')
+    parser.add_argument('--include', action='append', default=[], metavar='PATTERN',
+                        help="Only points matching a glob or 're:' regex (repeatable)")
+    parser.add_argument('--exclude', action='append', default=[], metavar='PATTERN',
+                        help="Skip points matching a glob or 're:' regex (repeatable)")
+    parser.add_argument('--hedge', action='store_true',
+                        help='Re-request slow stragglers in parallel (first response wins)')
+    parser.add_argument('--writers', type=int, metavar='N',
+                        help='Disk writer threads (default: workers / 2, 0 = write in workers)')
+    parser.add_argument('--upload', action='store_true',
+                        help="Upload files to the district's FTP target while downloading")
+    parser.add_argument('--postprocess', action='store_true',
+                        help='Parse, validate and convert files to columnar form in worker processes')
+    parser.add_argument('--post-workers', type=int, metavar='N',
+                        help='Post-processing processes (default: cores - 1)')
+    parser.add_argument('--store', action='store_true',
+                        help='Merge downloads into the memory-mapped trend store afterwards')
+    parser.add_argument('--no-coverage', dest='coverage', action='store_false',
+                        help='Do not update the coverage index while downloading')
+    parser.add_argument('--gap-fill', action='store_true',
+                        help='Download only the coverage gaps in the window (one range request per point)')
+    parser.add_argument('--auth-workers', type=int, default=DEFAULT_AUTH_WORKERS, metavar='N',
+                        help='Concurrent look-ahead logins for multi-district runs (0 = log in inline)')
+    parser.add_argument('--no-probe', dest='probe', action='store_false',
+                        help='Do not check station reachability before downloading')
+    parser.add_argument('--plan', action='store_true',
+                        help='Show requests, size and time per district without downloading')
 
     args: argparse.Namespace = parser.parse_args()
 
@@ -301,6 +676,17 @@ Examples:
         list_districts()
         return 0
 
+    rollup: Optional[RollupSpec] = None
+    try:
+        if args.rollup:
+            rollup = RollupSpec.parse(args.rollup)
+        if rollup is not None and args.gap_fill:
+            raise ValueError("--gap-fill works on raw downloads only (no --rollup)")
+        selector: PointSelector = PointSelector(args.building, args.include, args.exclude)
+    except ValueError as e:
+        safe_print(f"ERROR: {e}")
+        return 1
+
     districts: List[str]
 
     if args.all_districts:
@@ -322,6 +708,21 @@ Examples:
             return 0
         districts = result
 
+    if args.plan:
+        history = ThroughputHistory.load()
+        print_plan([
+            estimate_district(
+                district,
+                days=args.days, start_date=args.start, end_date=args.end,
+                workers=args.workers, output_dir=args.output, force=args.force,
+                backfill_days=args.backfill_days, skip_idle=not args.keep_idle,
+                rollup=rollup, selector=selector, history=history,
+                login=not args.cookie
+            )
+            for district in districts
+        ])
+        return 0
+
     print_header(f"NIAGARA FAST DOWNLOAD v{APP_VERSION}")
     safe_print(f"Districts:   {len(districts)}")
     safe_print(f"Workers:     {args.workers}")
@@ -331,22 +732,59 @@ Examples:
         len(districts), args.workers, args.days
     )
 
-    all_stats: List[Tuple[str, DownloadStats]] = []
+    unreachable: List[str] = []
+    if args.probe:
+        from connectivity import probe_districts
+
+        safe_print(f"\nProbing {len(districts)} station(s)...")
+        for district, result in probe_districts(districts).items():
+            if not result.reachable:
+                unreachable.append(district)
+                safe_print(f"  SKIP {district}: {result.describe()}")
+                logger.warning("Skipping %s: %s", district, result.describe())
+        districts = [d for d in districts if d not in unreachable]
+
+    # Log in to the next districts while the current one downloads
+    pipeline = None
+    if len(districts) > 1 and not args.cookie and args.auth_workers > 0:
+        from auth_pipeline import AuthPipeline
+        pipeline = AuthPipeline(districts, headless=args.headless, workers=args.auth_workers)
+
+    all_stats: List[Tuple[str, 'DownloadStats']] = []
     for i, district in enumerate(districts, 1):
         if len(districts) > 1:
             safe_print(f"\n[{i}/{len(districts)}] ", end='')
 
-        stats: Optional[DownloadStats] = process_district(
+        session_cookies: Optional[Dict[str, str]] = None
+        if pipeline is not None:
+            session_cookies = pipeline.get(district)
+            if not session_cookies:
+                safe_print(f"{district}: ERROR: Authentication failed")
+                logger.error("Authentication failed for %s", district)
+                continue
+
+        stats: Optional['DownloadStats'] = process_district(
             district,
             days=args.days, start_date=args.start, end_date=args.end,
             workers=args.workers, throttle=args.throttle,
             output_dir=args.output, force=args.force,
             cookie=args.cookie, headless=args.headless,
-            toggle_interval=args.toggle_interval, auto_fetch=args.auto_fetch
+            toggle_interval=args.toggle_interval, auto_fetch=args.auto_fetch,
+            backfill_days=args.backfill_days, skip_idle=not args.keep_idle,
+            rollup=rollup, selector=selector, hedge=args.hedge,
+            writers=args.writers, upload=args.upload,
+            postprocess=args.postprocess, post_workers=args.post_workers, store=args.store,
+            coverage=args.coverage, gap_fill=args.gap_fill,
+            session_cookies=session_cookies
         )
         if stats:
             all_stats.append((district, stats))
 
+    if pipeline is not None:
+        pipeline.close()
+        safe_print(f"\n{pipeline.summary()}")
+        logger.info(pipeline.summary())
+
     if len(all_stats) > 1:
         print_header("OVERALL SUMMARY")
         total_success: int = sum(s.success for _, s in all_stats)
@@ -364,10 +802,14 @@ Examples:
         )
 
     safe_print("\nDone!")
-    return 0 if all(s.failed == 0 for _, s in all_stats) else 1
+    if unreachable:
+        safe_print(f"Unreachable: {', '.join(unreachable)}")
+    return 0 if not unreachable and all(s.failed == 0 for _, s in all_stats) else 1
 
 
 if __name__ == '__main__':
+    import multiprocessing
+    multiprocessing.freeze_support()  # post-processing workers in the frozen exe
     try:
         sys.exit(main())
     except KeyboardInterrupt:
@@ -0,0 +1,139 @@
+"""
+================================================================================
+NIAGARA DOWNLOAD PLANNER v2.0
+================================================================================
+Trims a district's URL list and sizes the work using history metadata from
+the point list (record count, first/last timestamp).
+
+    - Idle histories are skipped: the last record predates the download
+      window AND the history was already idle when the list was fetched,
+      so it cannot have collected since.
+    - Each remaining history gets an estimated record count for the
+      window, which download_priority uses to start heavy points early.
+
+Points without metadata (id-only point lists) are never skipped and are
+estimated as a typical point.
+
+USAGE:
+    from download_planner import plan_downloads
+
+    plan = plan_downloads(url_list, url_gen.metadata, window_start, fetched_at)
+    url_list = plan.url_list
+================================================================================
+"""
+
+import statistics
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from point_list_cache import HistoryMeta
+from logging_config import get_logger
+
+logger = get_logger("planner")
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+# A history counts as idle if its last record was this old when the point
+# list was fetched. Live histories may have collected since the fetch, so
+# they are never skipped.
+IDLE_AFTER_DAYS = 7
+
+
+# ============================================================================
+# PLAN
+# ============================================================================
+@dataclass
+class DownloadPlan:
+    """URL list to download plus what the planner left out."""
+    url_list: List[Tuple[str, str]] = field(default_factory=list)
+    idle: List[str] = field(default_factory=list)
+    estimates: Dict[str, float] = field(default_factory=dict)
+    estimated_records: int = 0
+    with_metadata: int = 0
+
+    def summary(self) -> str:
+        return (
+            f"{len(self.url_list)} to download, {len(self.idle)} idle skipped, "
+            f"~{self.estimated_records:,} records ({self.with_metadata} with metadata)"
+        )
+
+
+def is_idle(meta: HistoryMeta, window_start_ts: float, fetched_at: float) -> bool:
+    """
+    Check that a history cannot have records in the download window.
+
+    Args:
+        meta: History metadata
+        window_start_ts: Window start (epoch seconds)
+        fetched_at: When the point list was fetched (epoch seconds)
+
+    Returns:
+        True if the history is empty, or its last record predates the
+        window and it was already idle at fetch time
+    """
+    if meta.record_count == 0:
+        return True
+    if not meta.last_ts:
+        return False
+    return (meta.last_ts < window_start_ts
+            and fetched_at - meta.last_ts > IDLE_AFTER_DAYS * 86400)
+
+
+def plan_downloads(
+    url_list: List[Tuple[str, str]],
+    metadata: Dict[str, HistoryMeta],
+    window_start: datetime,
+    fetched_at: float,
+    skip_idle: bool = True
+) -> DownloadPlan:
+    """
+    Skip idle histories and estimate records for the rest.
+
+    Args:
+        url_list: List of (point_path, url) tuples
+        metadata: HistoryMeta per point (may be empty)
+        window_start: Start of the download window
+        fetched_at: Point list fetch time (epoch seconds, e.g. file mtime)
+        skip_idle: Drop idle histories (False only estimates)
+
+    Returns:
+        DownloadPlan
+    """
+    plan = DownloadPlan()
+    if not metadata:
+        plan.url_list = list(url_list)
+        return plan
+
+    start_ts = window_start.timestamp()
+    end_ts = datetime.now().timestamp()
+
+    kept: List[Tuple[str, str]] = []
+    estimates: List[Optional[float]] = []
+    for point_path, url in url_list:
+        meta = metadata.get(point_path)
+        if meta is None:
+            kept.append((point_path, url))
+            estimates.append(None)
+            continue
+        plan.with_metadata += 1
+        if skip_idle and is_idle(meta, start_ts, fetched_at):
+            plan.idle.append(point_path)
+            continue
+        kept.append((point_path, url))
+        # A history that was live at fetch time has kept collecting since
+        live = bool(meta.last_ts) and fetched_at - meta.last_ts <= IDLE_AFTER_DAYS * 86400
+        estimates.append(meta.estimate_records(start_ts, end_ts, live=live))
+
+    known = [e for e in estimates if e is not None]
+    typical = statistics.median(known) if known else 0.0
+    weights = [typical if e is None else e for e in estimates]
+
+    plan.url_list = kept
+    plan.estimates = {point: weight for (point, _), weight in zip(kept, weights)}
+    plan.estimated_records = int(sum(weights))
+
+    if plan.idle:
+        logger.info("Skipping %d idle histories", len(plan.idle))
+    return plan
@@ -0,0 +1,287 @@
+"""
+================================================================================
+NIAGARA DOWNLOAD PRIORITY v2.0
+================================================================================
+Orders a district's download queue so an interrupted run has already
+fetched the most valuable points.
+
+Each point gets a score from three factors, each scaled to 0..1:
+
+    critical  - weight of the highest PRIORITY_PATTERNS entry it matches
+    stale     - days since its last successful download (capped), 1.0 if
+                it has never been downloaded
+    heavy     - estimated records in the window (from point list metadata),
+                so long downloads start early instead of holding the run open
+
+combined with per-district PRIORITY_WEIGHTS (defaults below). The engine's
+thread pool takes work in list order, so sorting the URL list is enough.
+
+Per-district config (config_district_details):
+    'PRIORITY_PATTERNS': {'*ZoneTemp*': 1.0, 're:AHU\\d+.*SAT': 0.8},
+    'PRIORITY_WEIGHTS': {'critical': 3.0, 'stale': 2.0, 'heavy': 1.0},
+
+Freshness lives next to the downloads: <output>/.point_freshness.json
+
+USAGE:
+    from download_priority import build_scorer, prioritize
+
+    scorer = build_scorer(url_gen.record, output_folder, plan.estimates)
+    url_list = prioritize(url_list, scorer)
+================================================================================
+"""
+
+import json
+import os
+import re
+from dataclasses import dataclass, field, asdict
+from datetime import date, datetime
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, List, Optional, Pattern, Sequence, Tuple
+
+from point_selection import compile_patterns
+from logging_config import get_logger
+
+if TYPE_CHECKING:
+    from district_registry import DistrictRecord
+
+logger = get_logger("priority")
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+DEFAULT_WEIGHTS: Dict[str, float] = {'critical': 3.0, 'stale': 2.0, 'heavy': 1.0}
+STALE_CAP_DAYS = 30
+FRESHNESS_FILE = ".point_freshness.json"
+STATE_FILE = ".download_state.json"
+DATE_FOLDER_RE = re.compile(r'^\d{4}-\d{2}-\d{2}$')
+
+
+# ============================================================================
+# FRESHNESS STORE
+# ============================================================================
+@dataclass
+class FreshnessStore:
+    """Last successful download date per point."""
+    district: str = ""
+    last_success: Dict[str, str] = field(default_factory=dict)  # point -> YYYY-MM-DD
+
+    def save(self, path: Path) -> None:
+        """Save store to JSON file."""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix('.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump(asdict(self), f)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: Path) -> Optional['FreshnessStore']:
+        """Load store from JSON file."""
+        if not path.exists():
+            return None
+        try:
+            with open(path) as f:
+                data = json.load(f)
+            return cls(**data)
+        except (json.JSONDecodeError, TypeError, KeyError):
+            logger.warning("Corrupt freshness store: %s", path)
+            return None
+
+    def update(self, points: Sequence[str], day: str) -> None:
+        """Record a successful download of points on a day (YYYY-MM-DD)."""
+        for point in points:
+            if self.last_success.get(point, '') < day:
+                self.last_success[point] = day
+
+    def age_days(self, point: str, today: date) -> Optional[int]:
+        """Days since the point was last downloaded (None if never)."""
+        day = self.last_success.get(point)
+        if not day:
+            return None
+        try:
+            return (today - datetime.strptime(day, '%Y-%m-%d').date()).days
+        except ValueError:
+            return None
+
+
+def _completed_in(date_folder: Path) -> List[str]:
+    """Points a date folder's resume state lists as completed."""
+    try:
+        with open(date_folder / STATE_FILE) as f:
+            return list(json.load(f).get('completed', []))
+    except (OSError, ValueError, AttributeError):
+        return []
+
+
+def load_freshness(output_folder: str, district: str = "") -> FreshnessStore:
+    """
+    Load the freshness store for an output folder.
+
+    Built from the resume state of recent date folders the first time.
+
+    Args:
+        output_folder: District output folder (contains YYYY-MM-DD folders)
+        district: District name (recorded in a new store)
+
+    Returns:
+        FreshnessStore
+    """
+    path = Path(output_folder) / FRESHNESS_FILE
+    store = FreshnessStore.load(path)
+    if store is not None:
+        return store
+
+    store = FreshnessStore(district=district)
+    base = Path(output_folder)
+    if base.is_dir():
+        days = sorted((d for d in os.listdir(base) if DATE_FOLDER_RE.match(d)), reverse=True)
+        for day in days[:STALE_CAP_DAYS]:
+            store.update(_completed_in(base / day), day)
+        if store.last_success:
+            store.save(path)
+            logger.info("Built freshness store from %d date folders", min(len(days), STALE_CAP_DAYS))
+    return store
+
+
+def record_run(output_folder: str, district: str = "", day: Optional[str] = None) -> int:
+    """
+    Add a day's completed points to the freshness store.
+
+    Args:
+        output_folder: District output folder
+        district: District name
+        day: Date folder (default: today)
+
+    Returns:
+        Number of points recorded
+    """
+    day = day or datetime.now().strftime('%Y-%m-%d')
+    completed = _completed_in(Path(output_folder) / day)
+    if not completed:
+        return 0
+    store = load_freshness(output_folder, district)
+    store.update(completed, day)
+    store.save(Path(output_folder) / FRESHNESS_FILE)
+    return len(completed)
+
+
+# ============================================================================
+# SCORING
+# ============================================================================
+class PriorityScorer:
+    """Scores points from critical patterns, staleness and expected size."""
+
+    def __init__(
+        self,
+        patterns: Optional[Dict[str, float]] = None,
+        weights: Optional[Dict[str, float]] = None,
+        freshness: Optional[FreshnessStore] = None,
+        estimates: Optional[Dict[str, float]] = None
+    ) -> None:
+        self.weights = dict(DEFAULT_WEIGHTS)
+        self.weights.update(weights or {})
+
+        # One compiled pattern per configured weight, highest weight first
+        top = max((w for w in (patterns or {}).values() if w > 0), default=0.0)
+        self.patterns: List[Tuple[float, Pattern[str]]] = []
+        for pattern, weight in sorted((patterns or {}).items(), key=lambda kv: -kv[1]):
+            try:
+                compiled = compile_patterns([pattern])
+            except ValueError as e:
+                logger.warning("PRIORITY_PATTERNS: %s, ignored", e)
+                continue
+            if compiled is not None and weight > 0:
+                self.patterns.append((weight / top, compiled))
+
+        self.freshness = freshness
+        self.estimates = estimates or {}
+        self.max_estimate = max(self.estimates.values(), default=0.0)
+        self.today = date.today()
+
+    def critical(self, point: str) -> float:
+        for weight, pattern in self.patterns:
+            if pattern.search(point):
+                return weight
+        return 0.0
+
+    def stale(self, point: str) -> float:
+        if self.freshness is None:
+            return 0.0
+        age = self.freshness.age_days(point, self.today)
+        if age is None:
+            return 1.0
+        return min(age, STALE_CAP_DAYS) / STALE_CAP_DAYS
+
+    def heavy(self, point: str) -> float:
+        if not self.max_estimate:
+            return 0.0
+        return self.estimates.get(point, 0.0) / self.max_estimate
+
+    def score(self, point: str) -> float:
+        """Weighted priority of a point (higher downloads first)."""
+        w = self.weights
+        total = 0.0
+        if w.get('critical') and self.patterns:
+            total += w['critical'] * self.critical(point)
+        if w.get('stale') and self.freshness is not None:
+            total += w['stale'] * self.stale(point)
+        if w.get('heavy') and self.max_estimate:
+            total += w['heavy'] * self.heavy(point)
+        return total
+
+
+def prioritize(url_list: List[Tuple[str, str]], scorer: PriorityScorer) -> List[Tuple[str, str]]:
+    """
+    Order (point_path, url) tuples by descending priority.
+
+    Ties keep their original order.
+    """
+    scores = [scorer.score(point) for point, _ in url_list]
+    order = sorted(range(len(url_list)), key=lambda i: -scores[i])
+    return [url_list[i] for i in order]
+
+
+def build_scorer(
+    record: 'DistrictRecord',
+    output_folder: str,
+    estimates: Optional[Dict[str, float]] = None
+) -> PriorityScorer:
+    """
+    Build the scorer for a district.
+
+    Args:
+        record: District record (PRIORITY_PATTERNS / PRIORITY_WEIGHTS)
+        output_folder: District output folder (freshness store)
+        estimates: Estimated records per point (download_planner)
+
+    Returns:
+        PriorityScorer
+    """
+    return PriorityScorer(
+        patterns=record.priority_patterns,
+        weights=record.priority_weights,
+        freshness=load_freshness(output_folder, record.name),
+        estimates=estimates
+    )
+
+
+# ============================================================================
+# CLI
+# ============================================================================
+if __name__ == '__main__':
+    import argparse
+    from niagara_url_generator import URLGenerator
+
+    parser = argparse.ArgumentParser(description='Download Priority v2.0')
+    parser.add_argument('--district', type=str, required=True, help='District name')
+    parser.add_argument('--output', type=str, help='Output folder (default: configured)')
+    parser.add_argument('--top', type=int, default=20, help='Points to show')
+
+    args = parser.parse_args()
+
+    gen = URLGenerator(args.district)
+    folder = os.path.join(args.output, gen.district) if args.output else gen.output_folder
+    scorer = build_scorer(gen.record, folder)
+    ranked = prioritize([(p, '') for p in gen.points], scorer)
+    print(f"{gen.district}: weights {scorer.weights}, {len(scorer.patterns)} patterns")
+    for point, _ in ranked[:args.top]:
+        print(f"  {scorer.score(point):6.2f}  {point}")
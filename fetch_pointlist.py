@@ -19,23 +19,20 @@ import os
 import sys
 import argparse
 import platform
-import webbrowser
 import time
 import shutil
-import requests
 from datetime import datetime
 from pathlib import Path
 from typing import Dict, List, Optional, Tuple
 
-import urllib3
-urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
-
 from utils import safe_print
 from logging_config import get_logger
-from config_district_details import district_config
+from district_registry import get_district, get_district_names
 from credentials import get_district_credentials
 from niagara_auth import NiagaraAuth
-from niagara_url_generator import get_point_list_path, load_point_list
+from niagara_url_generator import POINT_LIST_URL_SUFFIX, get_point_list_path, load_point_list
+from point_list_cache import count_points, get_point_list
+from point_list_changes import record_changes
 
 logger = get_logger("fetch_pointlist")
 
@@ -45,7 +42,6 @@ logger = get_logger("fetch_pointlist")
 SCRIPT_DIR = Path(__file__).parent
 POINT_LISTS_DIR = SCRIPT_DIR / "point_lists"
 POINT_LIST_PREFIX = "pointlist_"
-POINT_LIST_URL_SUFFIX = "/ord?history:|bql:select%20id|view:file:ITableToCsv"
 CUSTOM_URLS_FILE = SCRIPT_DIR / "get_new_pointlist.txt"
 DOWNLOAD_WAIT_TIMEOUT = 120
 DOWNLOAD_CHECK_INTERVAL = 2
@@ -84,6 +80,17 @@ def get_point_list_url(base_ip: str) -> str:
     return f"{base_ip.rstrip('/')}{POINT_LIST_URL_SUFFIX}"
 
 
+def http_get_content(url: str, cookies: Dict[str, str], timeout: int = 60) -> bytes:
+    """GET a URL with session cookies (requests is imported on first use)."""
+    import requests
+    import urllib3
+    urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+
+    response = requests.get(url, cookies=cookies, timeout=timeout, verify=False)
+    response.raise_for_status()
+    return response.content
+
+
 def load_custom_urls() -> Dict[str, str]:
     """Load custom URLs from get_new_pointlist.txt.
 
@@ -174,13 +181,8 @@ def check_point_list_exists(district_name: str) -> Tuple[bool, str, str]:
 
 
 def count_points_in_file(filepath: str) -> int:
-    """Count points in file."""
-    try:
-        with open(filepath, 'r', encoding='utf-8-sig') as f:
-            lines = [l.strip() for l in f if l.strip() and not l.startswith('#')]
-        return len(lines)
-    except Exception:
-        return 0
+    """Count valid points in file."""
+    return count_points(filepath)
 
 
 # ============================================================================
@@ -228,9 +230,35 @@ def wait_for_download(downloads_folder: Path, start_time: float, timeout: int =
     return None
 
 
+def _existing_points(path: str) -> Tuple[str, ...]:
+    """Points in the list about to be replaced (empty if none or invalid)."""
+    if not os.path.exists(path):
+        return ()
+    try:
+        return get_point_list(path).points
+    except OSError:
+        return ()
+
+
+def _track_changes(district_name: str, old_points: Tuple[str, ...], dest_path: str) -> None:
+    """Record what changed between the replaced and the new point list."""
+    new_points = get_point_list(dest_path).points
+    if not old_points or not new_points:
+        # First fetch, or one side is not a valid list: nothing to compare
+        return
+    diff = record_changes(district_name, old_points, new_points)
+    if diff.is_empty:
+        safe_print("  Changes: none")
+    else:
+        safe_print(f"  Changes: {diff.summary()}")
+        if diff.needs_backfill:
+            safe_print(f"  Queued for backfill: {len(diff.needs_backfill)}")
+
+
 def save_content_to_pointlist(content: bytes | str, district_name: str, backup: bool = True) -> str:
     """Save content to point list file."""
     dest_path = get_output_path(district_name)
+    old_points = _existing_points(dest_path)
 
     if backup and os.path.exists(dest_path):
         backup_path = dest_path.replace('.txt', f'_backup_{datetime.now():%Y%m%d_%H%M%S}.txt')
@@ -243,6 +271,7 @@ def save_content_to_pointlist(content: bytes | str, district_name: str, backup:
 
     safe_print(f"[OK] Saved: {dest_path}")
     safe_print(f"  Points: {count_points_in_file(dest_path)}")
+    _track_changes(district_name, old_points, dest_path)
 
     return dest_path
 
@@ -250,6 +279,7 @@ def save_content_to_pointlist(content: bytes | str, district_name: str, backup:
 def move_download_to_pointlist(source_path: Path, district_name: str, backup: bool = True) -> str:
     """Move downloaded file to point_lists folder."""
     dest_path = get_output_path(district_name)
+    old_points = _existing_points(dest_path)
 
     if backup and os.path.exists(dest_path):
         backup_path = dest_path.replace('.txt', f'_backup_{datetime.now():%Y%m%d_%H%M%S}.txt')
@@ -259,6 +289,7 @@ def move_download_to_pointlist(source_path: Path, district_name: str, backup: bo
     shutil.move(str(source_path), dest_path)
     safe_print(f"[OK] Saved: {dest_path}")
     safe_print(f"  Points: {count_points_in_file(dest_path)}")
+    _track_changes(district_name, old_points, dest_path)
 
     return dest_path
 
@@ -269,14 +300,14 @@ def move_download_to_pointlist(source_path: Path, district_name: str, backup: bo
 def fetch_pointlist_selenium(district_name: str, headless: bool = False) -> bool:
     """Fetch using Selenium with automated login via NiagaraAuth."""
     district = district_name.upper()
-    config = district_config.get(district)
+    record = get_district(district)
 
-    if not config:
+    if not record:
         safe_print(f"ERROR: District '{district}' not found")
         return False
 
-    base_ip = config.get('BASE_IP', '')
-    if not base_ip or base_ip.lower() in ('na', 'n/a', ''):
+    base_ip = record.base_ip
+    if not record.has_base_ip:
         safe_print(f"ERROR: No BASE_IP for {district}")
         return False
 
@@ -309,10 +340,7 @@ def fetch_pointlist_selenium(district_name: str, headless: bool = False) -> bool
     safe_print("Fetching point list...")
 
     try:
-        response = requests.get(url, cookies=cookies, timeout=60, verify=False)
-        response.raise_for_status()
-
-        content = response.content
+        content = http_get_content(url, cookies)
 
         if len(content) < 50:
             safe_print("WARNING: Response too short")
@@ -332,13 +360,13 @@ def fetch_pointlist_selenium(district_name: str, headless: bool = False) -> bool
 def fetch_pointlist_with_cookie(district_name: str, cookie_value: str) -> bool:
     """Fetch using existing session cookie."""
     district = district_name.upper()
-    config = district_config.get(district)
+    record = get_district(district)
 
-    if not config:
+    if not record:
         safe_print(f"ERROR: District '{district}' not found")
         return False
 
-    base_ip = config.get('BASE_IP', '')
+    base_ip = record.base_ip
     if not base_ip:
         safe_print(f"ERROR: No BASE_IP for {district}")
         return False
@@ -363,10 +391,7 @@ def fetch_pointlist_with_cookie(district_name: str, cookie_value: str) -> bool:
         cookies = {'JSESSIONID': cookie_value}
 
     try:
-        response = requests.get(url, cookies=cookies, timeout=60, verify=False)
-        response.raise_for_status()
-
-        content = response.content
+        content = http_get_content(url, cookies)
 
         if len(content) < 50:
             if b'login' in content.lower():
@@ -385,13 +410,13 @@ def fetch_pointlist_with_cookie(district_name: str, cookie_value: str) -> bool:
 def fetch_pointlist_browser(district_name: str, auto_save: bool = True) -> bool:
     """Open URL in browser for manual download."""
     district = district_name.upper()
-    config = district_config.get(district)
+    record = get_district(district)
 
-    if not config:
+    if not record:
         safe_print(f"ERROR: District '{district}' not found")
         return False
 
-    base_ip = config.get('BASE_IP', '')
+    base_ip = record.base_ip
     if not base_ip:
         safe_print(f"ERROR: No BASE_IP for {district}")
         return False
@@ -419,6 +444,7 @@ def fetch_pointlist_browser(district_name: str, auto_save: bool = True) -> bool:
     start_time = time.time()
     downloads_folder = get_downloads_folder()
 
+    import webbrowser
     safe_print("\nOpening browser...")
     webbrowser.open(url)
 
@@ -448,11 +474,11 @@ def list_available_districts() -> List[str]:
     safe_print("AVAILABLE DISTRICTS")
     safe_print(f"{'='*70}")
 
-    districts = sorted(district_config.keys())
+    districts = get_district_names()
 
     for i, district in enumerate(districts, 1):
-        config = district_config[district]
-        base_ip = config.get('BASE_IP', '')
+        record = get_district(district)
+        base_ip = record.base_ip
 
         user, passwd = get_district_credentials(district)
         cred = "Y" if (user and passwd) else "N"
@@ -460,7 +486,7 @@ def list_available_districts() -> List[str]:
         exists, _, source = check_point_list_exists(district)
         pl = "Y" if exists else "N"
 
-        has_ip = "Y" if (base_ip and base_ip.lower() not in ('na', 'n/a', '')) else "N"
+        has_ip = "Y" if record.has_base_ip else "N"
 
         safe_print(f"{i:2d}. [{cred}][{pl}][{has_ip}] {district:25s} | {base_ip[:35]}")
 
@@ -478,16 +504,19 @@ def check_all_districts() -> None:
     found = missing = 0
     missing_list: List[Tuple[str, bool]] = []
 
-    for district in sorted(district_config.keys()):
+    for district in get_district_names():
         exists, path, source = check_point_list_exists(district)
-        config = district_config.get(district, {})
-        base_ip = config.get('BASE_IP', '')
-        has_ip = bool(base_ip and base_ip.lower() not in ('na', 'n/a', ''))
+        has_ip = get_district(district).has_base_ip
 
-        if exists:
+        count = count_points_in_file(path) if exists else 0
+        if exists and count:
             found += 1
-            count = count_points_in_file(path)
             safe_print(f"  [OK] {district:30s} {count:5d} pts ({source})")
+        elif exists:
+            # File is there but nothing in it validated (e.g. a saved login page)
+            missing += 1
+            missing_list.append((district, has_ip))
+            safe_print(f"  [!!] {district:30s} INVALID   ({source}, no valid points)")
         else:
             missing += 1
             ip_note = "has IP" if has_ip else "NO IP"
@@ -506,12 +535,10 @@ def check_all_districts() -> None:
 def get_missing_districts() -> List[str]:
     """Get districts missing point lists with valid IPs."""
     missing: List[str] = []
-    for district in sorted(district_config.keys()):
+    for district in get_district_names():
         exists, _, _ = check_point_list_exists(district)
         if not exists:
-            config = district_config.get(district, {})
-            base_ip = config.get('BASE_IP', '')
-            if base_ip and base_ip.lower() not in ('na', 'n/a', ''):
+            if get_district(district).has_base_ip:
                 missing.append(district)
     return missing
 
@@ -529,8 +556,7 @@ def fetch_missing_pointlists(use_selenium: bool = False, cookie: Optional[str] =
     safe_print(f"{'='*60}")
 
     for i, d in enumerate(missing, 1):
-        config = district_config.get(d, {})
-        safe_print(f"  {i}. {d}: {config.get('BASE_IP', '')}")
+        safe_print(f"  {i}. {d}: {get_district(d).base_ip}")
 
     if cookie:
         safe_print("\nUsing provided cookie...")
@@ -642,7 +668,7 @@ Examples:
     # Single district
     if args.district:
         district = args.district.upper()
-        if district not in district_config:
+        if get_district(district) is None:
             safe_print(f"ERROR: '{district}' not found")
             return 1
     else:
@@ -650,10 +676,10 @@ Examples:
         if not district:
             return 0
 
-    config = district_config.get(district, {})
-    base_ip = config.get('BASE_IP', '')
+    record = get_district(district)
+    base_ip = record.base_ip
 
-    if not base_ip or base_ip.lower() in ('na', 'n/a', ''):
+    if not record.has_base_ip:
         safe_print(f"ERROR: No BASE_IP for {district}")
         return 1
 
@@ -0,0 +1,508 @@
+"""
+================================================================================
+NIAGARA FTP UPLOAD v2.0
+================================================================================
+Uploads downloaded CSVs to the district's FTP target (FTP_HOST /
+FTP_TARGET_DIR in district_config) while the download is still running.
+
+The engine reports each file once it is on disk under its final name; the
+file is queued here and sent by a small pool of workers, each keeping one
+FTP connection open for the whole run. Uploads overlap the downloads, so a
+run finishes roughly when its last file is downloaded instead of after a
+second full pass over the folder.
+
+Each file is stored as <name>.part and renamed once the server reports the
+full size (SIZE), so the target never holds a truncated CSV under its real
+name:
+
+    resume   - an interrupted .part is continued from its current size
+               (REST + STOR); a remote file that already has the local size
+               is not sent again
+    verify   - after STOR the .part must have the local size, else it is
+               deleted and the upload retried (UPLOAD_ATTEMPTS in total)
+    manifest - sizes of uploaded files are kept in .upload_state.json in
+               each folder, so a later run (or this module's CLI) only sends
+               files that are new or changed
+
+Remote paths mirror the local layout below the district folder:
+<output>/<DISTRICT>/2026-10-18/x.csv -> <FTP_TARGET_DIR>/2026-10-18/x.csv
+
+FTP credentials come from {DISTRICT}_FTP_USER / _FTP_PASS in .env (or
+FTP_USER / FTP_PASS), falling back to the district_config values.
+
+USAGE:
+    python download_niagara_fast.py --district NASHUA --upload
+
+    python ftp_upload.py --district NASHUA                  # upload what is missing
+    python ftp_upload.py --district NASHUA --folder D:\\data\\NASHUA\\2026-10-18
+
+    stage = UploadStage(target, local_root)        # factory= for a stand-in server
+    stage.submit(filepath)
+    stats = stage.close()
+================================================================================
+"""
+
+import ftplib
+import json
+import os
+import posixpath
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+from utils import PART_SUFFIX, atomic_write
+from logging_config import get_logger
+
+logger = get_logger("ftp")
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+FTP_CONNECTIONS = 2          # persistent connections (upload workers)
+FTP_PORT = 21
+FTP_TIMEOUT = 30
+UPLOAD_ATTEMPTS = 3          # per file, reconnecting between attempts
+RETRY_DELAY = 2.0            # seconds, doubled per attempt
+BLOCK_SIZE = 64 * 1024
+MANIFEST_FILE = ".upload_state.json"
+MANIFEST_SAVE_EVERY = 100    # uploads between manifest saves
+
+UPLOADED = 'uploaded'
+PRESENT = 'present'          # remote already had the same size
+
+
+class UploadError(Exception):
+    """An upload could not be completed or verified."""
+
+
+# ============================================================================
+# TARGET
+# ============================================================================
+@dataclass(frozen=True)
+class FtpTarget:
+    """Where and as whom a district's files are uploaded."""
+    host: str
+    user: str
+    password: str
+    target_dir: str = '/'
+    port: int = FTP_PORT
+
+    def remote_path(self, relative: str) -> str:
+        """Remote path for a path relative to the district folder."""
+        base = self.target_dir.replace('\\', '/').strip() or '/'
+        if not base.startswith('/'):
+            base = '/' + base
+        return posixpath.normpath(posixpath.join(base, relative.replace('\\', '/')))
+
+
+def ftp_target_for(district: str) -> Optional[FtpTarget]:
+    """
+    Build the FTP target from a district's config and credentials.
+
+    Args:
+        district: District name
+
+    Returns:
+        FtpTarget, or None if FTP_HOST is not set to a usable host
+    """
+    from district_registry import get_district, is_configured
+    from credentials import get_ftp_credentials
+
+    record = get_district(district)
+    if record is None or not is_configured(record.ftp_host):
+        return None
+    host = record.ftp_host.strip()
+    if any(ch.isspace() for ch in host):
+        logger.warning("%s: FTP_HOST is not a host name, upload disabled", district)
+        return None
+
+    port = FTP_PORT
+    if host.count(':') == 1:
+        host, _, port_text = host.partition(':')
+        try:
+            port = int(port_text)
+        except ValueError:
+            logger.warning("%s: invalid FTP port in %r", district, record.ftp_host)
+            return None
+
+    user, password = get_ftp_credentials(district)
+    if not user:
+        user, password = record.ftp_user, record.ftp_pass
+    return FtpTarget(host, user or 'anonymous', password, record.ftp_target_dir or '/', port)
+
+
+def connect_ftp(target: FtpTarget) -> ftplib.FTP:
+    """Open and log in a passive-mode binary FTP connection."""
+    ftp = ftplib.FTP(timeout=FTP_TIMEOUT)
+    ftp.connect(target.host, target.port)
+    ftp.login(target.user, target.password)
+    ftp.set_pasv(True)
+    ftp.voidcmd('TYPE I')  # SIZE is only reliable in binary mode
+    return ftp
+
+
+# ============================================================================
+# MANIFEST
+# ============================================================================
+class UploadManifest:
+    """Sizes of uploaded files, one .upload_state.json per folder."""
+
+    def __init__(self) -> None:
+        self._folders: Dict[str, Dict[str, int]] = {}
+        self._dirty: Set[str] = set()
+        self._lock = threading.Lock()
+
+    def _folder(self, folder: str) -> Dict[str, int]:
+        entries = self._folders.get(folder)
+        if entries is None:
+            entries = {}
+            path = os.path.join(folder, MANIFEST_FILE)
+            try:
+                with open(path) as f:
+                    entries = {str(k): int(v) for k, v in json.load(f).items()}
+            except FileNotFoundError:
+                pass
+            except (json.JSONDecodeError, AttributeError, TypeError, ValueError):
+                logger.warning("Corrupt upload manifest: %s", path)
+            self._folders[folder] = entries
+        return entries
+
+    def is_uploaded(self, path: str, size: int) -> bool:
+        with self._lock:
+            return self._folder(os.path.dirname(path)).get(os.path.basename(path)) == size
+
+    def mark(self, path: str, size: int) -> None:
+        folder = os.path.dirname(path)
+        with self._lock:
+            self._folder(folder)[os.path.basename(path)] = size
+            self._dirty.add(folder)
+
+    def save(self) -> None:
+        """Write the manifests that changed."""
+        with self._lock:
+            dirty = [(folder, dict(self._folders[folder])) for folder in self._dirty]
+            self._dirty.clear()
+        for folder, entries in dirty:
+            try:
+                atomic_write(
+                    os.path.join(folder, MANIFEST_FILE),
+                    json.dumps(entries, indent=1, sort_keys=True).encode('utf-8'),
+                    fsync=False
+                )
+            except OSError as e:
+                logger.warning("Could not save upload manifest in %s: %s", folder, e)
+
+
+# ============================================================================
+# UPLOAD STAGE
+# ============================================================================
+@dataclass
+class UploadStats:
+    """Upload results for a run."""
+    uploaded: int = 0
+    present: int = 0
+    failed: int = 0
+    resumed: int = 0
+    bytes_uploaded: int = 0
+    busy_seconds: float = 0.0
+    errors: List[Tuple[str, str]] = field(default_factory=list)
+
+    def summary(self) -> str:
+        resumed = f" ({self.resumed} resumed)" if self.resumed else ""
+        return (
+            f"Uploaded: {self.uploaded}{resumed} | Already there: {self.present} | "
+            f"Failed: {self.failed} | {self.bytes_uploaded / 1024 / 1024:.1f} MB"
+        )
+
+
+class UploadStage:
+    """Pool of FTP workers fed by a queue of local files."""
+
+    def __init__(
+        self,
+        target: FtpTarget,
+        local_root: str,
+        connections: int = FTP_CONNECTIONS,
+        factory: Callable[[FtpTarget], ftplib.FTP] = connect_ftp,
+        attempts: int = UPLOAD_ATTEMPTS,
+        retry_delay: float = RETRY_DELAY
+    ) -> None:
+        self.target = target
+        self.local_root = os.path.abspath(local_root)
+        self.connections = max(1, connections)
+        self.factory = factory
+        self.attempts = max(1, attempts)
+        self.retry_delay = retry_delay
+        self.manifest = UploadManifest()
+        self.stats = UploadStats()
+
+        self._queue: 'queue.Queue[Optional[Tuple[str, Future]]]' = queue.Queue()
+        self._lock = threading.Lock()
+        self._made_dirs: Set[str] = set()
+        self._queued: Set[str] = set()
+        self._since_save = 0
+        self._closed = False
+        self._workers: List[threading.Thread] = [
+            threading.Thread(target=self._run, name=f'ftp-{i}', daemon=True)
+            for i in range(self.connections)
+        ]
+        for worker in self._workers:
+            worker.start()
+
+    def relative_path(self, path: str) -> str:
+        """Path below the district folder (the file name if outside it)."""
+        path = os.path.abspath(path)
+        try:
+            relative = os.path.relpath(path, self.local_root)
+        except ValueError:  # different drive on Windows
+            return os.path.basename(path)
+        return os.path.basename(path) if relative.startswith('..') else relative
+
+    def submit(self, path: str) -> 'Future[str]':
+        """
+        Queue a file for upload.
+
+        Args:
+            path: Local file, complete and under its final name
+
+        Returns:
+            Future resolving to UPLOADED or PRESENT (or raising UploadError)
+        """
+        future: 'Future[str]' = Future()
+        if self._closed:
+            raise RuntimeError("Upload stage is closed")
+        with self._lock:
+            if path in self._queued:
+                future.set_result(PRESENT)  # already queued this run
+                return future
+            self._queued.add(path)
+        self._queue.put((path, future))
+        return future
+
+    def submit_pending(self, folder: str) -> int:
+        """
+        Queue files in a folder that are not in its upload manifest.
+
+        Args:
+            folder: Local folder (e.g. a day folder being resumed)
+
+        Returns:
+            Number of files queued
+        """
+        queued = 0
+        try:
+            entries = list(os.scandir(folder))
+        except FileNotFoundError:
+            return 0
+        for entry in entries:
+            if not entry.is_file() or not entry.name.endswith('.csv'):
+                continue
+            if not self.manifest.is_uploaded(entry.path, entry.stat().st_size):
+                self.submit(entry.path)
+                queued += 1
+        if queued:
+            logger.info("Queued %d files not yet uploaded from %s", queued, folder)
+        return queued
+
+    def close(self) -> UploadStats:
+        """Finish queued uploads, close the connections and save manifests."""
+        self._closed = True
+        for _ in self._workers:
+            self._queue.put(None)
+        for worker in self._workers:
+            worker.join()
+        self.manifest.save()
+        return self.stats
+
+    def __enter__(self) -> 'UploadStage':
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.close()
+
+    # ------------------------------------------------------------------
+    # Workers
+    # ------------------------------------------------------------------
+    def _run(self) -> None:
+        ftp: Optional[ftplib.FTP] = None
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            path, future = item
+            try:
+                ftp = self._process(ftp, path, future)
+            except Exception as e:
+                # Anything unexpected (factory, manifest, bookkeeping) fails
+                # this file only; the worker keeps serving the queue
+                logger.exception("Upload worker error for %s", path)
+                try:
+                    ftp = self._drop(ftp)
+                except Exception:
+                    ftp = None
+                if not future.done():
+                    with self._lock:
+                        self.stats.failed += 1
+                        self.stats.errors.append((path, str(e)[:80]))
+                    future.set_exception(UploadError(str(e)))
+        self._drop(ftp)
+
+    def _process(self, ftp: Optional[ftplib.FTP], path: str, future: Future) -> Optional[ftplib.FTP]:
+        """Upload one queued file with retries; returns the connection to reuse."""
+        start = time.monotonic()
+        error: Optional[BaseException] = None
+        for attempt in range(1, self.attempts + 1):
+            try:
+                if ftp is None:
+                    ftp = self.factory(self.target)
+                result, sent, resumed = self._upload(ftp, path)
+                error = None
+                break
+            except (UploadError, OSError, EOFError, *ftplib.all_errors) as e:
+                error = e
+                logger.debug("Upload attempt %d for %s failed: %s", attempt, path, e)
+                ftp = self._drop(ftp)
+                if attempt < self.attempts:
+                    time.sleep(self.retry_delay * 2 ** (attempt - 1))
+
+        with self._lock:
+            self.stats.busy_seconds += time.monotonic() - start
+            if error is None:
+                if result == UPLOADED:
+                    self.stats.uploaded += 1
+                    self.stats.bytes_uploaded += sent
+                    self.stats.resumed += resumed
+                else:
+                    self.stats.present += 1
+                self._since_save += 1
+                save = self._since_save >= MANIFEST_SAVE_EVERY
+                if save:
+                    self._since_save = 0
+            else:
+                self.stats.failed += 1
+                self.stats.errors.append((path, str(error)[:80]))
+                save = False
+
+        if error is None:
+            future.set_result(result)
+        else:
+            logger.warning("Upload failed for %s: %s", path, error)
+            future.set_exception(UploadError(str(error)))
+        if save:
+            self.manifest.save()  # after the future: the file is on the server either way
+        return ftp
+
+    @staticmethod
+    def _drop(ftp: Optional[ftplib.FTP]) -> None:
+        if ftp is None:
+            return None
+        try:
+            ftp.quit()
+        except (OSError, EOFError, *ftplib.all_errors):
+            ftp.close()
+        return None
+
+    @staticmethod
+    def _remote_size(ftp: ftplib.FTP, remote: str) -> Optional[int]:
+        try:
+            size = ftp.size(remote)
+        except ftplib.error_perm:
+            return None  # 550: no such file
+        return int(size) if size is not None else None
+
+    def _make_dirs(self, ftp: ftplib.FTP, remote_dir: str) -> None:
+        """Create remote_dir and its parents once per stage."""
+        if remote_dir in self._made_dirs or remote_dir in ('', '/'):
+            return
+        self._make_dirs(ftp, posixpath.dirname(remote_dir))
+        try:
+            ftp.mkd(remote_dir)
+        except ftplib.error_perm:
+            pass  # exists (or created by another worker)
+        with self._lock:
+            self._made_dirs.add(remote_dir)
+
+    def _upload(self, ftp: ftplib.FTP, path: str) -> Tuple[str, int, int]:
+        """
+        Upload one file through a .part name, resuming and verifying.
+
+        Returns:
+            (UPLOADED or PRESENT, bytes sent, 1 if a .part was resumed)
+        """
+        size = os.path.getsize(path)
+        remote = self.target.remote_path(self.relative_path(path))
+        self._make_dirs(ftp, posixpath.dirname(remote))
+
+        remote_size = self._remote_size(ftp, remote)
+        if remote_size == size:
+            self.manifest.mark(path, size)
+            return PRESENT, 0, 0
+
+        part = remote + PART_SUFFIX
+        offset = self._remote_size(ftp, part) or 0
+        if offset > size:
+            ftp.delete(part)  # left by an older, larger version
+            offset = 0
+
+        with open(path, 'rb') as f:
+            f.seek(offset)
+            ftp.storbinary(f'STOR {part}', f, BLOCK_SIZE, rest=offset or None)
+
+        stored = self._remote_size(ftp, part)
+        if stored != size:
+            try:
+                ftp.delete(part)
+            except ftplib.error_perm:
+                pass
+            raise UploadError(f"size mismatch after upload ({stored} != {size})")
+
+        if remote_size is not None:
+            ftp.delete(remote)  # not every server replaces on rename
+        ftp.rename(part, remote)
+        self.manifest.mark(path, size)
+        return UPLOADED, size - offset, 1 if offset else 0
+
+
+# ============================================================================
+# CLI
+# ============================================================================
+if __name__ == '__main__':
+    import argparse
+    import sys
+
+    from utils import safe_print, setup_console_encoding
+
+    setup_console_encoding()
+
+    parser = argparse.ArgumentParser(description='FTP Upload v2.0')
+    parser.add_argument('--district', type=str, required=True, help='District name')
+    parser.add_argument('--folder', type=str, action='append', default=[],
+                        help='Folder to upload (default: every folder below the district output)')
+    parser.add_argument('--output', type=str, help='Override output directory')
+    parser.add_argument('--connections', type=int, default=FTP_CONNECTIONS)
+
+    args = parser.parse_args()
+
+    district = args.district.upper()
+    target = ftp_target_for(district)
+    if target is None:
+        safe_print(f"ERROR: {district} has no usable FTP_HOST")
+        sys.exit(1)
+
+    from niagara_url_generator import URLGenerator
+
+    info = URLGenerator(district).info()
+    root = os.path.join(args.output, district) if args.output else info['output_folder']
+    folders = args.folder or [dirpath for dirpath, _, _ in os.walk(root)]
+
+    safe_print(f"Uploading {district} to ftp://{target.host}:{target.port}{target.remote_path('')}")
+    with UploadStage(target, root, connections=args.connections) as stage:
+        queued = sum(stage.submit_pending(folder) for folder in folders)
+        safe_print(f"Queued: {queued} files")
+    safe_print(stage.stats.summary())
+    for path, err in stage.stats.errors[:10]:
+        safe_print(f"  {path}: {err}")
+    sys.exit(1 if stage.stats.failed else 0)
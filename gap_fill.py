@@ -0,0 +1,319 @@
+"""
+================================================================================
+NIAGARA GAP FILL v2.0
+================================================================================
+Heals holes in the archive by downloading only what is missing.
+
+A run that failed partway, or a station that was offline for days, leaves
+gaps in the downloaded data that the regular pulls never revisit. The gap
+planner reads the coverage index (coverage_index) for a window, and per
+point:
+
+  1. takes the holes longer than the gap tolerance,
+  2. joins holes separated by less than MERGE_RECORDS covered records
+     (re-fetching a short covered stretch is cheaper than a second request),
+  3. requests the largest remaining span, padded by PAD_SECONDS on both
+     sides, as a time-range URL from URLGenerator.generate_ranges().
+
+Files land in backfill/gaps/<date>/ (apart from the new-point backfill, so
+neither run's files or resume state hide the other's), where the coverage
+index and the trend store pick them up like any other download. One request
+per point per day: further gaps of the same point are planned on the next
+run, so a folder never holds two files for one point.
+
+Every range that was requested and answered is logged
+(.cache/gap_fill.json). A range is not
+requested again within RETRY_HOURS, and not at all after MAX_ATTEMPTS,
+so stretches the station itself never recorded stop being asked for.
+
+Runs through download_niagara_fast.py --gap-fill, or from the scheduler as a
+low-priority 'gap_fill' job next to the regular pull.
+
+USAGE:
+    python gap_fill.py --district NASHUA --days 90       # show the plan
+    python gap_fill.py --district NASHUA --clear         # forget attempts
+================================================================================
+"""
+
+import json
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+from coverage_index import DEFAULT_STEP, CoverageIndex, scan_district
+from utils import CACHE_DIR, atomic_write, district_output_folder, point_key
+from logging_config import get_logger
+
+if TYPE_CHECKING:
+    from niagara_url_generator import URLGenerator
+
+logger = get_logger("gap_fill")
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+GAP_LOG_FILE = CACHE_DIR / "gap_fill.json"
+MERGE_RECORDS = 96           # join gaps separated by fewer covered records (1 day at 15 min)
+PAD_SECONDS = 3600           # overlap with the covered data on both sides
+MAX_ATTEMPTS = 3             # give up on a range after this many requests
+RETRY_HOURS = 20             # do not re-request a range sooner than this
+LOG_RETENTION_DAYS = 400     # forget attempts for ranges older than this
+
+_log_lock = threading.Lock()
+
+
+class GapRequest(NamedTuple):
+    """One time-range download for one point."""
+    point: str
+    start: float
+    end: float
+    missing: float           # seconds of the range not covered
+
+
+def join_gaps(gaps: Sequence[Tuple[float, float]], step: float) -> List[Tuple[float, float, float]]:
+    """
+    Join gaps whose covered stretch in between is short.
+
+    Args:
+        gaps: Sorted (start, end) holes of one point
+        step: Collection interval in seconds
+
+    Returns:
+        (start, end, missing seconds) spans
+    """
+    limit = MERGE_RECORDS * step
+    spans: List[Tuple[float, float, float]] = []
+    for start, end in gaps:
+        if spans and start - spans[-1][1] <= limit:
+            first, _, missing = spans[-1]
+            spans[-1] = (first, end, missing + end - start)
+        else:
+            spans.append((start, end, end - start))
+    return spans
+
+
+# ============================================================================
+# ATTEMPT LOG
+# ============================================================================
+class GapFillLog:
+    """Requested ranges per point: {district: {point key: [[start, end, attempts, last], ...]}}."""
+
+    def __init__(self, path: Path = GAP_LOG_FILE) -> None:
+        self.path = path
+        self.districts: Dict[str, Dict[str, List[List[float]]]] = {}
+        if path.exists():
+            try:
+                with open(path) as f:
+                    self.districts = json.load(f)
+            except (OSError, json.JSONDecodeError):
+                logger.warning("Corrupt gap fill log: %s", path)
+
+    def _attempts(self, district: str, key: str) -> List[List[float]]:
+        return self.districts.get(district.upper(), {}).get(key, [])
+
+    def blocked(self, district: str, key: str, start: float, end: float, now: float) -> Optional[str]:
+        """
+        Why a range must not be requested now ('exhausted', 'recent'), or None.
+
+        Only attempts that covered the whole range count.
+        """
+        for a_start, a_end, attempts, last in self._attempts(district, key):
+            if a_start <= start and end <= a_end:
+                if attempts >= MAX_ATTEMPTS:
+                    return 'exhausted'
+                if now - last < RETRY_HOURS * 3600:
+                    return 'recent'
+        return None
+
+    def record(self, district: str, requests: Sequence[GapRequest], now: float) -> None:
+        """Log requested ranges (a repeat of a logged range counts as another attempt)."""
+        points = self.districts.setdefault(district.upper(), {})
+        cutoff = now - LOG_RETENTION_DAYS * 86400
+        for request in requests:
+            key = point_key(request.point)
+            entries = [e for e in points.get(key, []) if e[1] >= cutoff]
+            attempts = 1 + max(
+                (e[2] for e in entries if e[0] <= request.start and request.end <= e[1]), default=0
+            )
+            entries = [e for e in entries if not (request.start <= e[0] and e[1] <= request.end)]
+            entries.append([request.start, request.end, attempts, now])
+            points[key] = entries
+
+    def clear(self, district: str) -> None:
+        self.districts.pop(district.upper(), None)
+
+    def save(self) -> None:
+        atomic_write(self.path, json.dumps(self.districts, separators=(',', ':')).encode('utf-8'))
+
+
+# ============================================================================
+# PLANNING
+# ============================================================================
+@dataclass
+class GapPlan:
+    """Gap requests for one district and window."""
+    district: str
+    requests: List[GapRequest] = field(default_factory=list)
+    points_with_gaps: int = 0
+    deferred: int = 0        # further spans left for later runs
+    exhausted: int = 0       # spans given up after MAX_ATTEMPTS
+    recent: int = 0          # spans requested within RETRY_HOURS
+    seconds: float = 0.0
+
+    @property
+    def missing_hours(self) -> float:
+        return sum(r.missing for r in self.requests) / 3600
+
+    def url_list(self, url_gen: 'URLGenerator') -> List[Tuple[str, str]]:
+        """Time-range URLs for the requests."""
+        return url_gen.generate_ranges([
+            (r.point, datetime.fromtimestamp(r.start), datetime.fromtimestamp(r.end))
+            for r in self.requests
+        ])
+
+    def record_attempts(self, completed: Iterable[str], log_path: Path = GAP_LOG_FILE) -> int:
+        """
+        Log requests as attempted after the download ran.
+
+        Args:
+            completed: Points whose request was sent and answered (data or
+                empty); requests never sent are not attempts
+            log_path: Attempt log
+
+        Returns:
+            Requests logged
+        """
+        done = set(completed)
+        attempted = [r for r in self.requests if r.point in done]
+        if attempted:
+            with _log_lock:
+                log = GapFillLog(log_path)
+                log.record(self.district, attempted, time.time())
+                log.save()
+        return len(attempted)
+
+    def summary(self) -> str:
+        text = (
+            f"{len(self.requests)} gap requests ({self.missing_hours:,.0f} h missing) "
+            f"for {self.points_with_gaps} points with gaps"
+        )
+        extra = [
+            f"{count} {label}" for count, label in (
+                (self.deferred, 'deferred'), (self.recent, 'tried recently'), (self.exhausted, 'given up')
+            ) if count
+        ]
+        return text + (f"; {', '.join(extra)}" if extra else '') + f" ({self.seconds * 1000:.0f} ms)"
+
+
+def plan_gap_fill(
+    url_gen: 'URLGenerator',
+    district_folder: str,
+    start: datetime,
+    end: datetime,
+    points: Optional[Sequence[str]] = None,
+    index: Optional[CoverageIndex] = None,
+    log_path: Path = GAP_LOG_FILE
+) -> GapPlan:
+    """
+    Plan the downloads that fill a district's coverage gaps.
+
+    The coverage index is brought up to date from the date folders first.
+
+    Args:
+        url_gen: District's URL generator (point list)
+        district_folder: Folder with the district's date folders
+        start: Window start
+        end: Window end
+        points: Subset of points (default: whole point list)
+        index: Open coverage index (default: COVERAGE_DB)
+        log_path: Attempt log
+
+    Returns:
+        GapPlan with at most one request per point
+    """
+    own = index is None
+    index = index or CoverageIndex()
+    began = time.perf_counter()
+    try:
+        scan_district(url_gen.district, district_folder, index)
+        plan = GapPlan(url_gen.district)
+        wanted = list(url_gen.points if points is None else points)
+        gaps = index.gaps(url_gen.district, start.timestamp(), end.timestamp(), wanted)
+        steps = {key: p.step for key, p in index.points(url_gen.district).items()}
+    finally:
+        if own:
+            index.close()
+
+    with _log_lock:
+        log = GapFillLog(log_path)
+    now = time.time()
+    window_start, window_end = start.timestamp(), end.timestamp()
+    for point in wanted:
+        key = point_key(point)
+        if key not in gaps:
+            continue
+        plan.points_with_gaps += 1
+        candidates: List[Tuple[float, float, float]] = []
+        for span_start, span_end, missing in join_gaps(gaps[key], steps.get(key, DEFAULT_STEP)):
+            padded = (max(window_start, span_start - PAD_SECONDS), min(window_end, span_end + PAD_SECONDS))
+            reason = log.blocked(url_gen.district, key, padded[0], padded[1], now)
+            if reason == 'exhausted':
+                plan.exhausted += 1
+            elif reason == 'recent':
+                plan.recent += 1
+            else:
+                candidates.append((padded[0], padded[1], missing))
+        if not candidates:
+            continue
+        best = max(candidates, key=lambda c: c[2])
+        plan.requests.append(GapRequest(point, best[0], best[1], best[2]))
+        plan.deferred += len(candidates) - 1
+
+    plan.seconds = time.perf_counter() - began
+    logger.info("Gap plan for %s: %s", url_gen.district, plan.summary())
+    return plan
+
+
+# ============================================================================
+# CLI
+# ============================================================================
+if __name__ == '__main__':
+    import argparse
+    from datetime import timedelta
+
+    from niagara_url_generator import URLGenerator
+    from utils import safe_print, print_header, setup_console_encoding
+
+    setup_console_encoding()
+
+    parser = argparse.ArgumentParser(description='Gap Fill Planner v2.0')
+    parser.add_argument('--district', required=True)
+    parser.add_argument('--days', type=int, default=90, help='Look for gaps this far back')
+    parser.add_argument('--output', type=str, help='Output root (as for download_niagara_fast --output)')
+    parser.add_argument('--clear', action='store_true', help='Forget logged attempts for the district')
+    args = parser.parse_args()
+
+    if args.clear:
+        with _log_lock:
+            gap_log = GapFillLog()
+            gap_log.clear(args.district)
+            gap_log.save()
+        safe_print(f"Gap fill attempts for {args.district.upper()} cleared")
+    else:
+        generator = URLGenerator(args.district.upper())
+        today = datetime.combine(datetime.today().date(), datetime.min.time())
+        gap_plan = plan_gap_fill(
+            generator, str(district_output_folder(args.district, args.output)),
+            today - timedelta(days=args.days), today
+        )
+        print_header(f"GAP FILL PLAN: {generator.district}")
+        safe_print(gap_plan.summary())
+        for request in sorted(gap_plan.requests, key=lambda r: -r.missing)[:25]:
+            safe_print(
+                f"  {request.point[:60]:60s} "
+                f"{datetime.fromtimestamp(request.start):%Y-%m-%d %H:%M} -> "
+                f"{datetime.fromtimestamp(request.end):%Y-%m-%d %H:%M}  {request.missing / 3600:6.1f} h"
+            )
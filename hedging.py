@@ -0,0 +1,120 @@
+"""
+================================================================================
+NIAGARA HEDGED REQUESTS v2.0
+================================================================================
+Latency tracking and load cap for hedged downloads.
+
+On large districts the last few slow requests hold a run open long after
+the bulk is done. With hedging on, the engine watches each request: once it
+has taken longer than the observed p95 latency, a duplicate request is sent
+and whichever completes first is used. The other one is abandoned: if it is
+still reading the body it stops at the next chunk and closes its connection;
+a request still waiting for the response headers cannot be interrupted and
+is discarded when it returns.
+
+Two limits keep hedging from adding load to a struggling station:
+
+    - at most HEDGE_MAX_FRACTION of requests started may be hedged
+    - at most max_workers // HEDGE_SLOT_DIVISOR hedged points are undecided
+      at once
+
+No hedges are sent until HEDGE_MIN_SAMPLES latencies have been seen.
+
+USAGE:
+    engine = DownloadEngine(cookies, max_workers=10, hedge=True)
+    stats = engine.download_batch(url_list, output_folder)
+    print(stats.hedged, stats.hedge_wins)
+================================================================================
+"""
+
+import threading
+from collections import deque
+from typing import Deque, Optional
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+HEDGE_MAX_FRACTION = 0.05   # hedges per request started
+HEDGE_SLOT_DIVISOR = 4      # undecided hedges = max_workers // divisor (min 1)
+HEDGE_MIN_SAMPLES = 50      # latencies needed before hedging starts
+HEDGE_MIN_DELAY = 0.5       # never hedge sooner than this (seconds)
+LATENCY_WINDOW = 500        # recent latencies kept
+PERCENTILE = 0.95
+RECOMPUTE_EVERY = 25        # samples between percentile recomputes
+
+
+class HedgeCancelled(Exception):
+    """Raised inside a request that lost the race to its duplicate."""
+
+
+# ============================================================================
+# LATENCY TRACKER
+# ============================================================================
+class LatencyTracker:
+    """Rolling p95 of successful request latencies."""
+
+    def __init__(
+        self,
+        window: int = LATENCY_WINDOW,
+        min_samples: int = HEDGE_MIN_SAMPLES
+    ) -> None:
+        self.min_samples = min_samples
+        self._samples: Deque[float] = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self._since_recompute = 0
+        self._p95: Optional[float] = None
+
+    def record(self, seconds: float) -> None:
+        """Add a successful request's latency."""
+        with self._lock:
+            self._samples.append(seconds)
+            self._since_recompute += 1
+            if len(self._samples) >= self.min_samples and (
+                self._p95 is None or self._since_recompute >= RECOMPUTE_EVERY
+            ):
+                ordered = sorted(self._samples)
+                self._p95 = ordered[min(len(ordered) - 1, int(len(ordered) * PERCENTILE))]
+                self._since_recompute = 0
+
+    def hedge_delay(self) -> Optional[float]:
+        """Seconds after which a request is hedged (None until enough samples)."""
+        p95 = self._p95
+        return None if p95 is None else max(HEDGE_MIN_DELAY, p95)
+
+
+# ============================================================================
+# HEDGE BUDGET
+# ============================================================================
+class HedgeBudget:
+    """Caps hedges to a fraction of requests and a number in flight."""
+
+    def __init__(self, slots: int, max_fraction: float = HEDGE_MAX_FRACTION) -> None:
+        self.max_fraction = max_fraction
+        self._slots = threading.BoundedSemaphore(max(1, slots))
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.hedged = 0
+        self.wins = 0
+
+    def started(self) -> None:
+        """Count a request."""
+        with self._lock:
+            self.requests += 1
+
+    def acquire(self) -> bool:
+        """Take a hedge slot if the cap allows it."""
+        with self._lock:
+            if self.hedged + 1 > self.max_fraction * self.requests:
+                return False
+        if not self._slots.acquire(blocking=False):
+            return False
+        with self._lock:
+            self.hedged += 1
+        return True
+
+    def release(self, won: bool) -> None:
+        """Return a hedge slot; won is True if the hedge beat the original."""
+        if won:
+            with self._lock:
+                self.wins += 1
+        self._slots.release()
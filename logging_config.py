@@ -17,7 +17,6 @@ USAGE:
 import logging
 import sys
 from pathlib import Path
-from logging.handlers import RotatingFileHandler
 from typing import Optional
 
 
@@ -72,6 +71,7 @@ def setup_logging(
 
     # File handler (optional)
     if log_file:
+        from logging.handlers import RotatingFileHandler
         log_file = Path(log_file)
         log_file.parent.mkdir(parents=True, exist_ok=True)
         file_handler = RotatingFileHandler(
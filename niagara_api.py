@@ -0,0 +1,581 @@
+"""
+================================================================================
+NIAGARA CONTROL API v2.0
+================================================================================
+Local HTTP/JSON API for starting and watching downloads from other tools
+(a dashboard, a script, Task Scheduler) without the GUI or CLI.
+
+Runs are queued and processed one at a time by a worker thread through the
+same process_district() path as the CLI. Each run takes the district lock
+used by niagara_scheduler, so an API run and a scheduled run never pull the
+same district at once, and reuses cached sessions between runs.
+
+ENDPOINTS:
+    GET    /health              - service status and queue length
+    GET    /districts           - configured districts
+    GET    /runs                - run history, newest first (?limit=N)
+    GET    /runs/<id>           - one run, with live progress while running
+    POST   /runs                - queue a run (202 + run), JSON body:
+               {"district": "NASHUA", "days": 7,
+                "start": "2026-01-01", "end": "2026-01-31",
+                "points": ["/Station/History"], "buildings": [...],
+                "include": [...], "exclude": [...],
+                "workers": 10, "throttle": 0.0, "hedge": false, "force": false,
+                "upload": false, "postprocess": false, "gap_fill": false}
+    POST   /runs/<id>/cancel    - cancel a queued or running run
+    DELETE /runs/<id>           - same as cancel
+
+A cancelled run stops starting new points; points already in flight finish
+and everything else stays in the resume state for the next run.
+
+The server binds to 127.0.0.1 by default. With --token (or NIAGARA_API_TOKEN)
+every request must send the token in the X-API-Token header.
+
+Run history persists in .cache/api_runs.json (last MAX_HISTORY runs).
+
+USAGE:
+    python niagara_api.py                       # http://127.0.0.1:8765
+    python niagara_api.py --port 9000 --token secret
+
+    curl -X POST localhost:8765/runs -d '{"district": "NASHUA", "days": 3}'
+    curl localhost:8765/runs/1
+================================================================================
+"""
+
+import hmac
+import itertools
+import json
+import os
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field, asdict
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Deque, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+from utils import CACHE_DIR, APP_VERSION, atomic_write, safe_print, setup_console_encoding
+from logging_config import get_logger
+
+logger = get_logger("api")
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+TOKEN_ENV = "NIAGARA_API_TOKEN"
+TOKEN_HEADER = "X-API-Token"
+RUNS_FILE = CACHE_DIR / "api_runs.json"
+MAX_HISTORY = 200
+MAX_BODY_BYTES = 1024 * 1024
+MAX_DAYS = 3650
+
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'          # finished with no failures
+PARTIAL = 'partial'    # finished, some points failed
+FAILED = 'failed'      # setup, login or unexpected error
+CANCELLED = 'cancelled'
+INTERRUPTED = 'interrupted'  # service stopped while queued or running
+ACTIVE = (QUEUED, RUNNING)
+
+
+class ApiError(Exception):
+    """Request error returned to the client with an HTTP status."""
+
+    def __init__(self, status: int, message: str) -> None:
+        super().__init__(message)
+        self.status = status
+
+
+# ============================================================================
+# RUNS
+# ============================================================================
+@dataclass
+class RunRecord:
+    """One queued, running or finished run."""
+    id: int
+    district: str
+    params: Dict[str, Any]
+    status: str = QUEUED
+    created: str = ''
+    started: str = ''
+    finished: str = ''
+    total: int = 0
+    completed: int = 0
+    success: int = 0
+    failed: int = 0
+    empty: int = 0
+    skipped: int = 0
+    cancelled: int = 0
+    bytes_downloaded: int = 0
+    failures: Dict[str, int] = field(default_factory=dict)
+    summary: str = ''
+    error: str = ''
+
+    def __post_init__(self) -> None:
+        # The engine counts each batch (regular, then backfill) from zero
+        self._batch_completed = 0
+        self._batch_total = 0
+        self._earlier_total = 0
+
+    def on_progress(self, completed: int, total: int, point_path: str, status: str) -> None:
+        """Engine progress callback: keeps the live counters current."""
+        if completed <= self._batch_completed:
+            self._earlier_total += self._batch_total  # next batch started
+        self._batch_completed = completed
+        self._batch_total = total
+        self.total = max(self.total, self._earlier_total + total)
+        if status == 'success':
+            self.success += 1
+        elif status == 'empty':
+            self.empty += 1
+        elif status == 'failed':
+            self.failed += 1
+        self.completed = self.success + self.empty + self.failed
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = asdict(self)
+        if self.status == RUNNING and self.started:
+            elapsed = time.time() - datetime.fromisoformat(self.started).timestamp()
+            data['elapsed_seconds'] = round(elapsed, 1)
+            data['percent'] = round(100.0 * self.completed / self.total, 1) if self.total else 0.0
+        return data
+
+
+def _as_list(value: Any, name: str) -> List[str]:
+    if value is None:
+        return []
+    if isinstance(value, str):
+        value = [value]
+    if not isinstance(value, list) or not all(isinstance(v, str) for v in value):
+        raise ApiError(400, f"'{name}' must be a string or a list of strings")
+    return value
+
+
+def _as_date(value: Any, name: str) -> str:
+    try:
+        return datetime.strptime(str(value), '%Y-%m-%d').strftime('%Y-%m-%d')
+    except ValueError:
+        raise ApiError(400, f"'{name}' must be a date (YYYY-MM-DD)")
+
+
+def parse_run_request(body: Dict[str, Any], districts: List[str]) -> Tuple[str, Dict[str, Any]]:
+    """
+    Validate a POST /runs body.
+
+    Args:
+        body: Decoded JSON body
+        districts: Configured district names
+
+    Returns:
+        (district, process_district keyword params)
+
+    Raises:
+        ApiError: If the body is invalid
+    """
+    from download_niagara_fast import DEFAULT_DAYS, DEFAULT_THROTTLE, DEFAULT_WORKERS
+
+    district = str(body.get('district', '')).strip().upper()
+    if not district:
+        raise ApiError(400, "'district' is required")
+    if district not in districts:
+        raise ApiError(404, f"Unknown district: {district}")
+
+    params: Dict[str, Any] = {}
+    if 'start' in body or 'end' in body:
+        if 'start' not in body or 'end' not in body:
+            raise ApiError(400, "'start' and 'end' must be given together")
+        params['start_date'] = _as_date(body['start'], 'start')
+        params['end_date'] = _as_date(body['end'], 'end')
+        if params['start_date'] > params['end_date']:
+            raise ApiError(400, "'start' is after 'end'")
+    try:
+        params['days'] = int(body.get('days', DEFAULT_DAYS))
+        params['workers'] = int(body.get('workers', DEFAULT_WORKERS))
+        params['throttle'] = float(body.get('throttle', DEFAULT_THROTTLE))
+    except (TypeError, ValueError):
+        raise ApiError(400, "'days', 'workers' and 'throttle' must be numbers")
+    if not 1 <= params['days'] <= MAX_DAYS:
+        raise ApiError(400, f"'days' must be between 1 and {MAX_DAYS}")
+    if not 1 <= params['workers'] <= 50:
+        raise ApiError(400, "'workers' must be between 1 and 50")
+    if params['throttle'] < 0:
+        raise ApiError(400, "'throttle' must not be negative")
+    params['hedge'] = bool(body.get('hedge', False))
+    params['force'] = bool(body.get('force', False))
+    params['upload'] = bool(body.get('upload', False))
+    params['postprocess'] = bool(body.get('postprocess', False))
+    params['gap_fill'] = bool(body.get('gap_fill', False))
+
+    for name in ('points', 'buildings', 'include', 'exclude'):
+        values = _as_list(body.get(name), name)
+        if values:
+            params[name] = values
+    return district, params
+
+
+class RunManager:
+    """Queue, history and worker thread for API runs."""
+
+    def __init__(
+        self,
+        output_dir: Optional[str] = None,
+        headless: bool = True,
+        runs_file: Path = RUNS_FILE
+    ) -> None:
+        from niagara_scheduler import SessionCache
+
+        self.output_dir = output_dir
+        self.headless = headless
+        self.runs_file = runs_file
+        self.sessions = SessionCache()
+
+        self._lock = threading.Lock()
+        self._wake = threading.Condition(self._lock)
+        self._runs: Dict[int, RunRecord] = {}
+        self._queue: Deque[int] = deque()
+        self._cancel: Dict[int, threading.Event] = {}
+        self._stopping = False
+
+        self._load()
+        self._ids = itertools.count(max(self._runs, default=0) + 1)
+        self._worker = threading.Thread(target=self._run_loop, name='api-runs', daemon=True)
+        self._worker.start()
+
+    # ------------------------------------------------------------------
+    # History
+    # ------------------------------------------------------------------
+    def _load(self) -> None:
+        if not self.runs_file.exists():
+            return
+        try:
+            with open(self.runs_file) as f:
+                records = [RunRecord(**r) for r in json.load(f)]
+        except (json.JSONDecodeError, TypeError):
+            logger.warning("Corrupt run history: %s", self.runs_file)
+            return
+        for record in records:
+            if record.status in ACTIVE:
+                record.status = INTERRUPTED
+                record.error = 'service stopped before the run finished'
+            self._runs[record.id] = record
+
+    def _save(self) -> None:
+        """Persist history (caller holds the lock)."""
+        finished = [r for r in self._runs.values() if r.status not in ACTIVE]
+        for record in sorted(finished, key=lambda r: r.id)[:-MAX_HISTORY or None]:
+            del self._runs[record.id]
+        data = [asdict(r) for r in sorted(self._runs.values(), key=lambda r: r.id)]
+        try:
+            atomic_write(self.runs_file, json.dumps(data, indent=2).encode('utf-8'))
+        except OSError as e:
+            logger.warning("Could not save run history: %s", e)
+
+    # ------------------------------------------------------------------
+    # Public
+    # ------------------------------------------------------------------
+    def submit(self, district: str, params: Dict[str, Any]) -> RunRecord:
+        """Queue a run."""
+        with self._lock:
+            record = RunRecord(
+                id=next(self._ids), district=district, params=params,
+                created=datetime.now().isoformat(timespec='seconds')
+            )
+            self._runs[record.id] = record
+            self._queue.append(record.id)
+            self._save()
+            self._wake.notify()
+        logger.info("Queued run %d: %s %s", record.id, district, params)
+        return record
+
+    def get(self, run_id: int) -> Optional[RunRecord]:
+        return self._runs.get(run_id)
+
+    def history(self, limit: int = 50) -> List[RunRecord]:
+        """Runs, newest first."""
+        with self._lock:
+            records = sorted(self._runs.values(), key=lambda r: -r.id)
+        return records[:limit]
+
+    def queued(self) -> int:
+        return len(self._queue)
+
+    def cancel(self, run_id: int) -> RunRecord:
+        """
+        Cancel a run: a queued run is dropped, a running one is told to stop.
+
+        Raises:
+            ApiError: If the run does not exist or has already finished
+        """
+        with self._lock:
+            record = self._runs.get(run_id)
+            if record is None:
+                raise ApiError(404, f"No run {run_id}")
+            if record.status not in ACTIVE:
+                raise ApiError(409, f"Run {run_id} is already {record.status}")
+            if record.status == QUEUED:
+                self._queue.remove(run_id)
+                record.status = CANCELLED
+                record.finished = datetime.now().isoformat(timespec='seconds')
+                self._save()
+            else:
+                self._cancel[run_id].set()
+        logger.info("Cancel requested for run %d", run_id)
+        return record
+
+    def stop(self) -> None:
+        """Cancel the running run and stop the worker."""
+        with self._lock:
+            self._stopping = True
+            for event in self._cancel.values():
+                event.set()
+            self._wake.notify_all()
+        self._worker.join()
+        with self._lock:
+            self._save()
+
+    # ------------------------------------------------------------------
+    # Worker
+    # ------------------------------------------------------------------
+    def _run_loop(self) -> None:
+        while True:
+            with self._lock:
+                while not self._queue and not self._stopping:
+                    self._wake.wait()
+                if self._stopping:
+                    return
+                record = self._runs[self._queue.popleft()]
+                record.status = RUNNING
+                record.started = datetime.now().isoformat(timespec='seconds')
+                cancel = self._cancel[record.id] = threading.Event()
+                self._save()
+            try:
+                self._execute(record, cancel)
+            except Exception as e:
+                logger.exception("Run %d failed", record.id)
+                record.status = FAILED
+                record.error = str(e)[:200]
+            with self._lock:
+                del self._cancel[record.id]
+                record.finished = datetime.now().isoformat(timespec='seconds')
+                self._save()
+            logger.info("Run %d (%s) %s: %s", record.id, record.district, record.status, record.summary)
+
+    def _execute(self, record: RunRecord, cancel: threading.Event) -> None:
+        from connectivity import probe_districts
+        from download_niagara_fast import process_district
+        from niagara_scheduler import district_lock
+        from point_selection import PointSelector
+
+        params = dict(record.params)
+        selector = PointSelector(
+            buildings=params.pop('buildings', None), include=params.pop('include', None),
+            exclude=params.pop('exclude', None), points=params.pop('points', None)
+        )
+
+        with district_lock(record.district) as locked:
+            if not locked:
+                record.status = FAILED
+                record.error = 'district is already being downloaded'
+                return
+
+            probe = probe_districts([record.district])[record.district]
+            if not probe.reachable:
+                record.status = FAILED
+                record.error = f'station {probe.describe()}'
+                return
+
+            cookies = self.sessions.get(record.district, headless=self.headless)
+            if not cookies:
+                record.status = FAILED
+                record.error = 'login failed'
+                return
+            if cancel.is_set():
+                record.status = CANCELLED
+                return
+
+            stats = process_district(
+                record.district, output_dir=self.output_dir, headless=self.headless,
+                selector=selector if selector.is_active else None,
+                session_cookies=cookies, cancel_event=cancel,
+                progress_callback=record.on_progress, source='api', **params
+            )
+
+        if stats is None:
+            record.status = FAILED
+            record.error = record.error or 'setup failed (see log)'
+            return
+        if stats.errors_by_class.get('auth') or stats.errors_by_class.get('invalid'):
+            self.sessions.drop(record.district)
+
+        record.total = stats.total
+        record.success = stats.success
+        record.failed = stats.failed
+        record.empty = stats.empty
+        record.skipped = stats.skipped
+        record.cancelled = stats.cancelled
+        record.bytes_downloaded = stats.bytes_downloaded
+        record.failures = dict(stats.errors_by_class)
+        record.summary = stats.summary()
+        if cancel.is_set():
+            record.status = CANCELLED
+        else:
+            record.status = DONE if stats.failed == 0 else PARTIAL
+
+
+# ============================================================================
+# HTTP
+# ============================================================================
+class ApiHandler(BaseHTTPRequestHandler):
+    """JSON request handler; the server carries the manager and token."""
+
+    server: 'ApiServer'
+    server_version = f"NiagaraAPI/{APP_VERSION}"
+
+    def log_message(self, format: str, *args: Any) -> None:
+        logger.debug("%s %s", self.address_string(), format % args)
+
+    def _send(self, status: int, payload: Any) -> None:
+        body = json.dumps(payload, indent=2).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _body(self) -> Dict[str, Any]:
+        try:
+            length = int(self.headers.get('Content-Length') or 0)
+        except ValueError:
+            raise ApiError(400, "Invalid Content-Length")
+        if length > MAX_BODY_BYTES:
+            raise ApiError(413, "Request body too large")
+        raw = self.rfile.read(length) if length else b'{}'
+        try:
+            body = json.loads(raw.decode('utf-8'))
+        except (UnicodeDecodeError, json.JSONDecodeError):
+            raise ApiError(400, "Body must be JSON")
+        if not isinstance(body, dict):
+            raise ApiError(400, "Body must be a JSON object")
+        return body
+
+    def _run_id(self, text: str) -> int:
+        try:
+            return int(text)
+        except ValueError:
+            raise ApiError(404, f"No run {text}")
+
+    def _dispatch(self, method: str) -> None:
+        try:
+            token = self.server.token
+            if token and not hmac.compare_digest(self.headers.get(TOKEN_HEADER, ''), token):
+                raise ApiError(401, f"Missing or wrong {TOKEN_HEADER}")
+
+            url = urlsplit(self.path)
+            parts = [p for p in url.path.split('/') if p]
+            query = parse_qs(url.query)
+            manager = self.server.manager
+
+            if method == 'GET' and parts == ['health']:
+                self._send(200, {'status': 'ok', 'version': APP_VERSION, 'queued': manager.queued()})
+            elif method == 'GET' and parts == ['districts']:
+                self._send(200, {'districts': self.server.districts()})
+            elif method == 'GET' and parts == ['runs']:
+                try:
+                    limit = int(query.get('limit', ['50'])[0])
+                except ValueError:
+                    raise ApiError(400, "'limit' must be a number")
+                self._send(200, {'runs': [r.to_dict() for r in manager.history(limit)]})
+            elif method == 'POST' and parts == ['runs']:
+                district, params = parse_run_request(self._body(), self.server.districts())
+                self._send(202, manager.submit(district, params).to_dict())
+            elif len(parts) == 2 and parts[0] == 'runs' and method in ('GET', 'DELETE'):
+                run_id = self._run_id(parts[1])
+                if method == 'DELETE':
+                    self._send(200, manager.cancel(run_id).to_dict())
+                    return
+                record = manager.get(run_id)
+                if record is None:
+                    raise ApiError(404, f"No run {run_id}")
+                self._send(200, record.to_dict())
+            elif method == 'POST' and len(parts) == 3 and parts[0] == 'runs' and parts[2] == 'cancel':
+                self._send(200, manager.cancel(self._run_id(parts[1])).to_dict())
+            else:
+                raise ApiError(404, f"No route for {method} {url.path}")
+        except ApiError as e:
+            self._send(e.status, {'error': str(e)})
+        except Exception as e:
+            logger.exception("API error on %s %s", method, self.path)
+            self._send(500, {'error': str(e)[:200]})
+
+    def do_GET(self) -> None:
+        self._dispatch('GET')
+
+    def do_POST(self) -> None:
+        self._dispatch('POST')
+
+    def do_DELETE(self) -> None:
+        self._dispatch('DELETE')
+
+
+class ApiServer(ThreadingHTTPServer):
+    """HTTP server holding the run manager."""
+
+    daemon_threads = True
+
+    def __init__(
+        self,
+        manager: RunManager,
+        host: str = DEFAULT_HOST,
+        port: int = DEFAULT_PORT,
+        token: Optional[str] = None
+    ) -> None:
+        super().__init__((host, port), ApiHandler)
+        self.manager = manager
+        self.token = token or ''
+        self._districts: Optional[List[str]] = None
+
+    def districts(self) -> List[str]:
+        """Configured districts (read once)."""
+        if self._districts is None:
+            from niagara_url_generator import get_available_districts
+            self._districts = sorted(get_available_districts())
+        return self._districts
+
+
+# ============================================================================
+# CLI
+# ============================================================================
+if __name__ == '__main__':
+    import argparse
+
+    setup_console_encoding()
+
+    parser = argparse.ArgumentParser(description='Niagara Control API v2.0')
+    parser.add_argument('--host', type=str, default=DEFAULT_HOST, help='Bind address')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help='Port')
+    parser.add_argument('--token', type=str, default=os.environ.get(TOKEN_ENV),
+                        help=f'Require this {TOKEN_HEADER} header (default: ${TOKEN_ENV})')
+    parser.add_argument('--output', type=str, help='Override output directory')
+    parser.add_argument('--show-browser', action='store_true', help='Log in with a visible browser')
+
+    args = parser.parse_args()
+
+    if args.host not in ('127.0.0.1', 'localhost', '::1') and not args.token:
+        safe_print("WARNING: listening on a non-local address without --token")
+
+    manager = RunManager(output_dir=args.output, headless=not args.show_browser)
+    server = ApiServer(manager, args.host, args.port, args.token)
+    safe_print(f"Niagara API listening on http://{args.host}:{args.port}")
+    logger.info("API listening on %s:%d", args.host, args.port)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        safe_print("\nStopping...")
+    finally:
+        server.server_close()
+        manager.stop()
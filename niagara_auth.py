@@ -5,7 +5,7 @@ NIAGARA AUTHENTICATION v2.0
 Handles authentication to Niagara BAS systems via Selenium or direct cookies.
 
 Features:
-    - Selenium-based login with Firefox
+    - Selenium-based login with Firefox (warm browsers from browser_pool)
     - Cookie extraction from authenticated session
     - Session validation
     - Headless mode support
@@ -20,29 +20,22 @@ USAGE:
 
 import os
 import time
-from pathlib import Path
-from typing import Dict, List, Optional, Tuple
+from typing import Dict, List, Optional
 
-from config_district_details import district_config
+from district_registry import DistrictRecord, get_district, get_district_names
 from credentials import get_district_credentials
 from logging_config import get_logger
 
 logger = get_logger("auth")
 
-# Driver paths
-SCRIPT_DIR = Path(__file__).parent
-DRIVERS_DIR = SCRIPT_DIR / "drivers"
-GECKODRIVER_PATH = DRIVERS_DIR / "geckodriver.exe"
-FIREFOX_BINARY = Path('C:/Program Files/Mozilla Firefox/firefox.exe')
-
 
 class NiagaraAuth:
     """Authentication handler for Niagara BAS systems."""
 
     def __init__(self, district_name: str) -> None:
         self.district = district_name.upper()
-        self.config = district_config.get(self.district, {})
-        self.base_ip = self.config.get('BASE_IP', '')
+        self.record = get_district(self.district) or DistrictRecord(self.district)
+        self.base_ip = self.record.base_ip
         self.username, self.password = get_district_credentials(self.district)
         self._driver = None
 
@@ -54,7 +47,7 @@ class NiagaraAuth:
     @property
     def has_base_ip(self) -> bool:
         """Check if BASE_IP is configured."""
-        return bool(self.base_ip and self.base_ip.lower() not in ('na', 'n/a', ''))
+        return self.record.has_base_ip
 
     @property
     def driver(self):
@@ -81,78 +74,81 @@ class NiagaraAuth:
             return None
 
         try:
-            from selenium import webdriver
-            from selenium.webdriver.firefox.service import Service
-            from selenium.webdriver.firefox.options import Options
             from selenium.webdriver.common.keys import Keys
         except ImportError:
             logger.error("Selenium not installed. Run: pip install selenium")
             return None
 
-        if not GECKODRIVER_PATH.exists():
-            logger.error("geckodriver not found at %s", GECKODRIVER_PATH)
-            return None
+        from browser_pool import BrowserUnavailable, get_pool
 
         logger.info("Logging into %s...", self.district)
         logger.info("  Base IP: %s", self.base_ip)
         logger.info("  Username: %s", self.username)
 
-        # Configure Firefox
-        firefox_options = Options()
-        firefox_options.add_argument('--ignore-certificate-errors')
-        firefox_options.accept_insecure_certs = True
-
-        if headless:
-            firefox_options.add_argument('--headless')
-
-        if FIREFOX_BINARY.exists():
-            firefox_options.binary_location = str(FIREFOX_BINARY)
-
-        service = Service(executable_path=str(GECKODRIVER_PATH))
-        driver = webdriver.Firefox(service=service, options=firefox_options)
+        pool = get_pool()
+        try:
+            driver = pool.checkout(self.district, headless=headless)
+        except BrowserUnavailable as e:
+            logger.error("%s", e)
+            return None
+        except Exception as e:
+            logger.error("  Could not start browser: %s", e)
+            return None
 
         try:
-            logger.info("  Navigating to login page...")
+            # A pooled browser (or the district's profile) may still be logged in
+            logger.info("  Navigating to station...")
             driver.get(self.base_ip)
-            time.sleep(5)
-
-            logger.info("  Entering credentials...")
-            username_field = driver.switch_to.active_element
-            username_field.send_keys(self.username)
-            username_field.send_keys(Keys.RETURN)
-            time.sleep(3)
+            cookies = self._browser_cookies(driver)
+            if cookies and self.validate_session(cookies):
+                logger.info("  Reusing logged-in browser session")
+            else:
+                driver.delete_all_cookies()
+                driver.get(self.base_ip)
+                time.sleep(5)
 
-            password_field = driver.switch_to.active_element
-            password_field.send_keys(self.password)
-            password_field.send_keys(Keys.RETURN)
-            time.sleep(5)
+                logger.info("  Entering credentials...")
+                username_field = driver.switch_to.active_element
+                username_field.send_keys(self.username)
+                username_field.send_keys(Keys.RETURN)
+                time.sleep(3)
 
-            # Extract cookies
-            cookies: Dict[str, str] = {}
-            for cookie in driver.get_cookies():
-                if cookie['name'] in ['niagara_session', 'JSESSIONID']:
-                    cookies[cookie['name']] = cookie['value']
-                    logger.info("  Session cookie obtained: %s", cookie['name'])
+                password_field = driver.switch_to.active_element
+                password_field.send_keys(self.password)
+                password_field.send_keys(Keys.RETURN)
+                time.sleep(5)
 
-            if not cookies:
-                logger.warning("  No session cookie found, using all cookies")
-                for cookie in driver.get_cookies():
-                    cookies[cookie['name']] = cookie['value']
+                cookies = self._browser_cookies(driver)
 
             if keep_driver:
                 self._driver = driver
                 logger.info("  Driver kept open for session management")
             else:
-                driver.quit()
+                pool.checkin(self.district, driver)
 
             logger.info("  Login successful!")
             return cookies
 
         except Exception as e:
             logger.error("  Login error: %s", e)
-            driver.quit()
+            pool.checkin(self.district, driver, healthy=False)
             return None
 
+    @staticmethod
+    def _browser_cookies(driver) -> Dict[str, str]:
+        """Session cookies from the browser (all cookies if none is named as expected)."""
+        cookies: Dict[str, str] = {}
+        for cookie in driver.get_cookies():
+            if cookie['name'] in ['niagara_session', 'JSESSIONID']:
+                cookies[cookie['name']] = cookie['value']
+                logger.info("  Session cookie obtained: %s", cookie['name'])
+
+        if not cookies:
+            logger.debug("  No session cookie found, using all cookies")
+            for cookie in driver.get_cookies():
+                cookies[cookie['name']] = cookie['value']
+        return cookies
+
     def login_with_cookie(self, cookie_value: str) -> Dict[str, str]:
         """
         Use an existing session cookie instead of logging in.
@@ -209,13 +205,37 @@ class NiagaraAuth:
         except Exception:
             return False
 
+    def hold_browser(self, headless: bool = False) -> bool:
+        """
+        Keep the district's pooled browser for page toggling.
+
+        For sessions logged in elsewhere (e.g. by the auth pipeline), whose
+        browser went back to the pool after the login.
+
+        Args:
+            headless: Window mode the browser was logged in with
+
+        Returns:
+            True if a browser is held (returned by close())
+        """
+        if self._driver:
+            return True
+        from browser_pool import get_pool
+        try:
+            self._driver = get_pool().checkout(self.district, headless=headless)
+        except Exception as e:
+            logger.warning("No browser kept for %s, page toggling off: %s", self.district, e)
+            return False
+        logger.info("  Driver kept open for session management")
+        return True
+
     def toggle_page(self, page_num: int = 1) -> None:
         """Toggle browser page to prevent session timeout."""
         if not self._driver:
             return
 
-        page_one = self.config.get('PAGE_TOGGLE_ONE', self.base_ip)
-        page_two = self.config.get('PAGE_TOGGLE_TWO', self.base_ip)
+        page_one = self.record.page_toggle_one or self.base_ip
+        page_two = self.record.page_toggle_two or self.base_ip
 
         try:
             url = page_one if page_num == 1 else page_two
@@ -225,9 +245,10 @@ class NiagaraAuth:
             logger.warning("Page toggle failed: %s", e)
 
     def close(self) -> None:
-        """Close the browser driver if open."""
+        """Return the kept browser to the pool."""
         if self._driver:
-            self._driver.quit()
+            from browser_pool import get_pool
+            get_pool().checkin(self.district, self._driver)
             self._driver = None
 
     def __enter__(self):
@@ -240,7 +261,7 @@ class NiagaraAuth:
 def list_districts_with_credentials() -> List[str]:
     """Get list of districts that have credentials configured."""
     districts = []
-    for district in sorted(district_config.keys()):
+    for district in get_district_names():
         username, password = get_district_credentials(district)
         if username and password:
             districts.append(district)
@@ -29,38 +29,18 @@ from typing import Optional, List, Dict, Tuple, Any
 from utils import safe_print, print_header, print_separator, setup_console_encoding, APP_VERSION
 from utils import SYM_CHECK, SYM_EMPTY, SYM_FAIL, SYM_OK, SYM_WARN, SYM_BULLET
 from logging_config import get_logger
-from config_district_details import district_config
+from district_registry import DistrictRecord, get_district
 from credentials import get_district_credentials
 
 setup_console_encoding()
 
 logger = get_logger("cli")
 
-# Optional tkinter import
-TK_AVAILABLE: bool = False
-try:
-    import tkinter as tk
-    from tkinter import filedialog
-    TK_AVAILABLE = True
-except ImportError:
-    pass
-
-# Import fast modules (mandatory in V2.0)
-from niagara_download_engine import DownloadEngine, ProgressPrinter, filter_existing_files
 from niagara_url_generator import URLGenerator, get_available_districts, get_point_list_path
-from niagara_auth import NiagaraAuth
-
-# Import fetch_pointlist module for creating new point lists
-try:
-    from fetch_pointlist import (
-        fetch_pointlist_selenium,
-        fetch_pointlist_browser,
-        get_output_path as get_pointlist_output_path,
-        ensure_point_lists_folder
-    )
-    FETCH_POINTLIST_AVAILABLE: bool = True
-except ImportError:
-    FETCH_POINTLIST_AVAILABLE = False
+
+# tkinter, the download engine (requests/urllib3), NiagaraAuth and
+# fetch_pointlist are imported where they are first used so the menu
+# renders without loading them.
 
 # ============================================================================
 # CONFIGURATION
@@ -136,7 +116,10 @@ def save_output_dir_to_env(output_dir: str) -> None:
 def browse_for_folder(title: str = "Select Output Directory",
                       initial_dir: Optional[str] = None) -> Optional[str]:
     """Open folder browser dialog."""
-    if not TK_AVAILABLE:
+    try:
+        import tkinter as tk
+        from tkinter import filedialog
+    except ImportError:
         safe_print(f"  {SYM_WARN} Folder browser not available (tkinter not installed)")
         return None
 
@@ -286,34 +269,45 @@ def check_network_connectivity(host: str = "8.8.8.8", port: int = 53,
 
 def check_vpn_connectivity(test_ip: str) -> bool:
     """Check if we can reach internal IP (VPN connected)."""
-    try:
-        import re
-        ip_match = re.search(r'(\d+\.\d+\.\d+\.\d+)', test_ip)
-        if not ip_match:
-            return False
-
-        ip = ip_match.group(1)
-        socket.setdefaulttimeout(5)
-        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        result = sock.connect_ex((ip, 80))
-        sock.close()
-
-        if result != 0:
-            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            result = sock.connect_ex((ip, 443))
-            sock.close()
-
-        return result == 0
-    except Exception:
-        return False
+    from connectivity import probe_station
+    return probe_station('', test_ip).reachable
+
+
+def verify_districts(districts: List[str]) -> List[str]:
+    """
+    Probe every district's station in parallel and offer to skip the
+    unreachable ones.
+
+    Returns:
+        Districts to download (empty to cancel)
+    """
+    from connectivity import probe_districts
+
+    safe_print(f"\n  Probing {len(districts)} station(s)...")
+    results = probe_districts(districts, max_age=0)  # the VPN may have just changed
+    for district, result in results.items():
+        symbol = SYM_OK if result.reachable else SYM_FAIL
+        safe_print(f"    {symbol} {district:25s} {result.describe()}")
+
+    reachable = [d for d, r in results.items() if r.reachable]
+    unreachable = [d for d, r in results.items() if not r.reachable]
+    if not unreachable:
+        return list(districts)
+    logger.warning("Unreachable districts: %s", ', '.join(unreachable))
+    if not reachable:
+        safe_print(f"\n  {SYM_WARN} No station reachable")
+        return list(districts) if confirm_prompt("  Continue anyway?", default=False) else []
+    if confirm_prompt(f"\n  Skip {len(unreachable)} unreachable district(s)?", default=True):
+        return reachable
+    return list(districts)
 
 
 def get_vpn_info(district_name: str) -> Dict[str, str]:
     """Get VPN connection info for a district."""
     district = district_name.upper()
-    config = district_config.get(district, {})
-    vpn_data = config.get('VPN_DATA', 'Not configured')
-    base_ip = config.get('BASE_IP', '')
+    record = get_district(district) or DistrictRecord(district, vpn_data='Not configured')
+    vpn_data = record.vpn_data
+    base_ip = record.base_ip
 
     vpn_info: Dict[str, str] = {
         'raw': vpn_data,
@@ -411,8 +405,7 @@ def list_districts_with_status() -> List[str]:
     districts = get_available_districts()
 
     for i, district in enumerate(districts, 1):
-        config = district_config.get(district, {})
-        base_ip = config.get('BASE_IP', 'N/A')
+        base_ip = get_district(district).base_ip or 'N/A'
         vpn_type = get_vpn_info(district)['type']
 
         # Credential status via credentials module
@@ -503,8 +496,8 @@ def filter_districts_by_vpn(districts: List[str]) -> Optional[List[str]]:
 # ============================================================================
 # VPN CHECK WORKFLOW
 # ============================================================================
-def run_vpn_check_workflow(selected_districts: List[str]) -> bool:
-    """Run VPN check workflow."""
+def run_vpn_check_workflow(selected_districts: List[str]) -> List[str]:
+    """Run VPN check workflow; returns the districts to download (empty to cancel)."""
     reload_env()
 
     print_header("VPN CONNECTION CHECK")
@@ -512,7 +505,7 @@ def run_vpn_check_workflow(selected_districts: List[str]) -> bool:
     safe_print("\n  Checking internet...")
     if not check_network_connectivity():
         safe_print(f"  {SYM_WARN} No internet connectivity!")
-        return False
+        return []
     safe_print(f"  {SYM_OK} Internet OK")
 
     # Group by VPN type
@@ -533,7 +526,7 @@ def run_vpn_check_workflow(selected_districts: List[str]) -> bool:
 
     if not needs_vpn:
         safe_print(f"\n  {SYM_OK} No VPN required")
-        return confirm_prompt("\n  Ready?")
+        return list(selected_districts) if confirm_prompt("\n  Ready?") else []
 
     print_separator()
     vpn_connected = confirm_prompt("  Are you connected to VPN?", default=False)
@@ -556,30 +549,11 @@ def run_vpn_check_workflow(selected_districts: List[str]) -> bool:
 
         input("\n  Press ENTER when connected...")
 
-        safe_print("\n  Verifying...")
-        test_district = needs_vpn[0]
-        test_ip = district_config[test_district].get('BASE_IP', '')
-
-        if test_ip and check_vpn_connectivity(test_ip):
-            safe_print(f"  {SYM_OK} Connected to {test_district}")
-        else:
-            safe_print(f"  {SYM_WARN} Could not verify {test_district}")
-
-        return confirm_prompt("\n  Proceed?")
+        selected = verify_districts(selected_districts)
+        return selected if selected and confirm_prompt("\n  Proceed?") else []
 
     else:
-        safe_print("\n  Verifying...")
-        test_district = needs_vpn[0]
-        test_ip = district_config[test_district].get('BASE_IP', '')
-
-        if test_ip and check_vpn_connectivity(test_ip):
-            safe_print(f"  {SYM_OK} VPN verified")
-        else:
-            safe_print(f"  {SYM_WARN} Could not verify")
-            if not confirm_prompt("  Continue anyway?"):
-                return False
-
-        return True
+        return verify_districts(selected_districts)
 
 
 # ============================================================================
@@ -590,6 +564,19 @@ def run_download_workflow(selected_districts: List[str], days: int = DEFAULT_DAY
                          workers: int = DEFAULT_WORKERS,
                          auto_fetch: bool = False) -> int:
     """Run download using fast parallel engine."""
+    from niagara_download_engine import DownloadEngine, ProgressPrinter, filter_existing_files
+    from niagara_auth import NiagaraAuth
+
+    try:
+        from fetch_pointlist import (
+            fetch_pointlist_selenium,
+            fetch_pointlist_browser,
+            get_output_path as get_pointlist_output_path,
+        )
+        fetch_pointlist_available = True
+    except ImportError:
+        fetch_pointlist_available = False
+
     print_header("PARALLEL DOWNLOAD")
 
     safe_print(f"\n  Districts: {', '.join(selected_districts)}")
@@ -622,7 +609,7 @@ def run_download_workflow(selected_districts: List[str], days: int = DEFAULT_DAY
             safe_print(f"\n{SYM_FAIL} No point list found for {district}!")
 
             # Ask user if they want to create a new point list
-            if FETCH_POINTLIST_AVAILABLE:
+            if fetch_pointlist_available:
                 if confirm_prompt(f"  Would you like to create a new point list now?", default=True):
                     safe_print(f"\n  Creating point list for {district}...")
                     safe_print(f"  Output: {get_pointlist_output_path(district)}")
@@ -777,7 +764,8 @@ def main_menu() -> int:
             clear_screen()
             selected = select_district()
             if selected:
-                if run_vpn_check_workflow(selected):
+                selected = run_vpn_check_workflow(selected)
+                if selected:
                     output_dir = select_output_directory()
                     if output_dir is None:
                         safe_print("\n  Cancelled.")
@@ -803,8 +791,8 @@ def main_menu() -> int:
                 days = get_user_input("  Days [90]: ", allow_empty=True)
                 days = int(days) if days else DEFAULT_DAYS
 
-                selected = [district.upper()]
-                if run_vpn_check_workflow(selected):
+                selected = run_vpn_check_workflow([district.upper()])
+                if selected:
                     output_dir = select_output_directory()
                     if output_dir:
                         run_download_workflow(selected, days, output_dir)
@@ -11,7 +11,14 @@ Features:
     - Adaptive rate limiting
     - Progress tracking
     - Retry logic with exponential backoff
-    - JSON state file for download resume
+    - Deferred retry queue with per-class policies (retry_queue.py)
+    - Per-host circuit breakers for unreachable stations (circuit_breaker.py)
+    - Optional hedged requests for slow stragglers (hedging.py)
+    - Atomic CSV writes (temp file, fsync, rename) with batched directory sync
+    - Separate bounded writer stage so disk latency never idles network
+      workers (writer_stage.py)
+    - JSON state file for download resume, verified against file sizes
+    - Cooperative cancel (engine.cancel() or a shared threading.Event)
 
 USAGE:
     from niagara_download_engine import DownloadEngine
@@ -25,7 +32,9 @@ import json
 import os
 import time
 import threading
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import (
+    FIRST_COMPLETED, Future, ThreadPoolExecutor, TimeoutError as FuturesTimeout, as_completed, wait
+)
 from dataclasses import dataclass, field, asdict
 from datetime import datetime
 from pathlib import Path
@@ -36,13 +45,26 @@ from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
 import urllib3
 
-from utils import standardize_filename
+from utils import DirectorySyncer, atomic_write, standardize_filename
+from point_list_cache import HTML_MARKERS
+from retry_queue import (
+    RetryPolicy, RetryQueue, RETRY_WORKER_DIVISOR,
+    CIRCUIT, CONNECTION, INVALID, OTHER, classify_exception
+)
+from circuit_breaker import CircuitBreaker, CircuitBreakers, FAILURE_THRESHOLD
+from hedging import (
+    HedgeBudget, HedgeCancelled, LatencyTracker, HEDGE_MAX_FRACTION, HEDGE_SLOT_DIVISOR
+)
+from writer_stage import WriterStage, WRITER_THREADS
 from logging_config import get_logger
 
 logger = get_logger("engine")
 
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
+# Renamed files per directory fsync (resume state saves also flush)
+DIR_SYNC_EVERY = 200
+
 
 # ============================================================================
 # DATA CLASSES
@@ -59,6 +81,18 @@ class DownloadStats:
     start_time: float = field(default_factory=time.time)
     end_time: float = 0
     errors: List[Tuple[str, str]] = field(default_factory=list)
+    errors_by_class: Dict[str, int] = field(default_factory=dict)
+    retried: int = 0    # deferred re-attempts made
+    recovered: int = 0  # points that succeeded on a re-attempt
+    hedged: int = 0     # duplicate requests sent for slow points
+    hedge_wins: int = 0  # duplicates that finished first
+    fetch_seconds: float = 0.0         # network time, summed over workers
+    write_seconds: float = 0.0         # disk time, summed over writer threads
+    backpressure_seconds: float = 0.0  # workers waiting for the writer queue
+    fetch_workers: int = 0
+    write_workers: int = 0             # 0 = workers write their own files
+    cancelled: int = 0                 # points not attempted after cancel()
+    latencies: List[float] = field(default_factory=list, repr=False)  # seconds per request
 
     @property
     def elapsed(self) -> float:
@@ -72,14 +106,78 @@ class DownloadStats:
             return (self.success + self.failed + self.empty) / self.elapsed
         return 0
 
+    def merge(self, other: 'DownloadStats') -> None:
+        """Add another batch's counts to this one (keeps this start time)."""
+        self.total += other.total
+        self.success += other.success
+        self.failed += other.failed
+        self.empty += other.empty
+        self.skipped += other.skipped
+        self.cancelled += other.cancelled
+        self.bytes_downloaded += other.bytes_downloaded
+        self.end_time = max(self.end_time, other.end_time)
+        self.errors.extend(other.errors)
+        for failure_class, count in other.errors_by_class.items():
+            self.errors_by_class[failure_class] = self.errors_by_class.get(failure_class, 0) + count
+        self.retried += other.retried
+        self.recovered += other.recovered
+        self.hedged += other.hedged
+        self.hedge_wins += other.hedge_wins
+        self.fetch_seconds += other.fetch_seconds
+        self.write_seconds += other.write_seconds
+        self.backpressure_seconds += other.backpressure_seconds
+        self.fetch_workers = max(self.fetch_workers, other.fetch_workers)
+        self.write_workers = max(self.write_workers, other.write_workers)
+        self.latencies.extend(other.latencies)
+
+    def latency_percentiles(self) -> Dict[str, float]:
+        """Request latency p50/p90/p95/p99/max in seconds (empty if none)."""
+        if not self.latencies:
+            return {}
+        ordered = sorted(self.latencies)
+        last = len(ordered) - 1
+        result = {f'p{q}': ordered[min(last, int(len(ordered) * q / 100))] for q in (50, 90, 95, 99)}
+        result['max'] = ordered[last]
+        return result
+
     def summary(self) -> str:
+        retries = f"Retried: {self.retried} ({self.recovered} recovered) | " if self.retried else ""
+        hedges = f"Hedged: {self.hedged} ({self.hedge_wins} won) | " if self.hedged else ""
+        cancelled = f"Cancelled: {self.cancelled} | " if self.cancelled else ""
         return (
             f"Total: {self.total} | Success: {self.success} | "
             f"Failed: {self.failed} | Empty: {self.empty} | "
-            f"Skipped: {self.skipped} | "
+            f"Skipped: {self.skipped} | {cancelled}{retries}{hedges}"
             f"Time: {self.elapsed:.1f}s | Rate: {self.rate:.1f}/s"
         )
 
+    def utilisation(self) -> Dict[str, float]:
+        """Busy fraction of each pipeline stage over the batch."""
+        elapsed = self.elapsed
+        result: Dict[str, float] = {}
+        if elapsed > 0 and self.fetch_workers:
+            result['fetch'] = self.fetch_seconds / (elapsed * self.fetch_workers)
+        if elapsed > 0 and self.write_workers:
+            result['write'] = self.write_seconds / (elapsed * self.write_workers)
+        return result
+
+    def pipeline_summary(self) -> str:
+        """Stage utilisation, e.g. 'fetch 92% of 10, write 15% of 2, 0.0s backpressure'."""
+        busy = self.utilisation()
+        parts = []
+        if 'fetch' in busy:
+            parts.append(f"fetch {busy['fetch'] * 100:.0f}% of {self.fetch_workers}")
+        if 'write' in busy:
+            parts.append(f"write {busy['write'] * 100:.0f}% of {self.write_workers}")
+            parts.append(f"{self.backpressure_seconds:.1f}s backpressure")
+        return ', '.join(parts)
+
+    def failure_breakdown(self) -> str:
+        """Final failures per class, e.g. 'timeout: 3, auth: 1'."""
+        return ', '.join(
+            f"{c}: {n}" for c, n in sorted(self.errors_by_class.items(), key=lambda kv: -kv[1])
+        )
+
 
 @dataclass
 class DownloadState:
@@ -90,12 +188,12 @@ class DownloadState:
     completed: List[str] = field(default_factory=list)
     failed: List[Dict[str, str]] = field(default_factory=list)
     empty: List[str] = field(default_factory=list)
+    sizes: Dict[str, int] = field(default_factory=dict)  # point -> bytes written
 
     def save(self, path: Path) -> None:
-        """Save state to JSON file."""
+        """Save state to JSON file (atomically)."""
         path.parent.mkdir(parents=True, exist_ok=True)
-        with open(path, 'w') as f:
-            json.dump(asdict(self), f, indent=2)
+        atomic_write(path, json.dumps(asdict(self), indent=2).encode('utf-8'))
 
     @classmethod
     def load(cls, path: Path) -> Optional['DownloadState']:
@@ -114,6 +212,42 @@ class DownloadState:
     def completed_set(self) -> set:
         return set(self.completed)
 
+    def verify(self, folder: Path) -> List[str]:
+        """
+        Drop completed points whose file is missing or has the wrong size.
+
+        Points completed before sizes were recorded only need the file.
+
+        Args:
+            folder: Folder holding the state's CSV files
+
+        Returns:
+            Points removed from completed (to download again)
+        """
+        on_disk = _csv_sizes(str(folder))
+        bad: List[str] = []
+        for point_path in self.completed:
+            size = on_disk.get(standardize_filename(point_path) + '.csv')
+            recorded = self.sizes.get(point_path)
+            if size is None or (recorded is not None and size != recorded):
+                bad.append(point_path)
+        if bad:
+            bad_set = set(bad)
+            self.completed = [p for p in self.completed if p not in bad_set]
+            self.empty = [p for p in self.empty if p not in bad_set]
+            for point_path in bad:
+                self.sizes.pop(point_path, None)
+        return bad
+
+
+def _csv_sizes(folder: str) -> Dict[str, int]:
+    """CSV file sizes in a folder (one directory scan)."""
+    try:
+        with os.scandir(folder) as entries:
+            return {e.name: e.stat().st_size for e in entries if e.name.endswith('.csv')}
+    except OSError:
+        return {}
+
 
 # ============================================================================
 # SESSION FACTORY
@@ -160,7 +294,18 @@ class DownloadEngine:
         timeout: int = 30,
         min_content_size: int = 50,
         throttle_delay: float = 0.0,
-        progress_callback: Optional[Callable] = None
+        progress_callback: Optional[Callable] = None,
+        retry_policies: Optional[Dict[str, RetryPolicy]] = None,
+        retry_workers: Optional[int] = None,
+        breaker_threshold: int = FAILURE_THRESHOLD,
+        hedge: bool = False,
+        hedge_fraction: float = HEDGE_MAX_FRACTION,
+        fsync: bool = True,
+        dir_sync_every: int = DIR_SYNC_EVERY,
+        writer_threads: Optional[int] = None,
+        cancel_event: Optional[threading.Event] = None,
+        on_file: Optional[Callable[[str], None]] = None,
+        validate: Optional[Callable[[bytes], Optional[str]]] = None
     ) -> None:
         self.cookies = cookies
         self.max_workers = max_workers
@@ -168,71 +313,346 @@ class DownloadEngine:
         self.min_content_size = min_content_size
         self.throttle_delay = throttle_delay
         self.progress_callback = progress_callback
+        self.cancel_event = cancel_event or threading.Event()
+        self.on_file = on_file
+        # Content check (e.g. RollupSpec.check_spacing): a returned reason
+        # fails the point as invalid instead of writing the file
+        self.validate = validate
+        self.retry_policies = retry_policies
+        self.retry_workers = retry_workers or max(1, max_workers // RETRY_WORKER_DIVISOR)
+        # breaker_threshold=0 disables the circuit breakers
+        self.breakers = CircuitBreakers(breaker_threshold) if breaker_threshold > 0 else None
+        # Files are fsynced before their rename; the directory once per batch
+        # of renames (dir_sync_every=0 leaves directory flushing to the OS)
+        self.fsync = fsync
+        self._dir_sync = DirectorySyncer(dir_sync_every) if dir_sync_every > 0 else None
+        # Default: one writer per two network workers; 0 writes in the workers
+        if writer_threads is None:
+            writer_threads = max(WRITER_THREADS, max_workers // 2)
+        self._writer = WriterStage(
+            writer_threads, fsync=fsync, dir_sync=self._dir_sync
+        ) if writer_threads > 0 else None
+
+        # Hedged requests run in their own pool, with room for duplicates and
+        # for losers still waiting on a response nobody needs
+        request_threads = max_workers * 2 if hedge else max_workers
+        self._latency = LatencyTracker() if hedge else None
+        self._hedge_budget = HedgeBudget(
+            max(1, max_workers // HEDGE_SLOT_DIVISOR), hedge_fraction
+        ) if hedge else None
+        self._request_pool = ThreadPoolExecutor(
+            max_workers=request_threads, thread_name_prefix='request'
+        ) if hedge else None
 
         self.session = create_session(
             pool_connections=max_workers,
-            pool_maxsize=max_workers
+            pool_maxsize=request_threads
         )
         self.session.cookies.update(cookies)
 
         self._lock = threading.Lock()
         self._consecutive_failures = 0
         self._throttle_multiplier = 1.0
+        self._fetch_seconds = 0.0
+        self._fetch_times: List[float] = []
 
     def _download_single(
         self,
         point_path: str,
         url: str,
         save_folder: str
-    ) -> Tuple[str, str, int, Optional[str]]:
-        """Download a single point's data."""
+    ) -> Tuple[str, str, int, Optional[str], Optional[str], Optional[Future]]:
+        """
+        Download a single point's data.
+
+        Returns:
+            (point_path, status, size, error, failure_class, write);
+            failure_class is None unless status is 'failed', write is the
+            writer stage's future for the file (None if written inline)
+        """
+        if self.cancel_event.is_set():
+            return (point_path, 'cancelled', 0, None, None, None)
+
+        breaker = self.breakers.get(url) if self.breakers else None
+        if breaker is not None and not breaker.allow():
+            return (point_path, 'failed', 0, f'Circuit open ({breaker.host})', CIRCUIT, None)
+
         try:
             if self.throttle_delay > 0:
                 time.sleep(self.throttle_delay * self._throttle_multiplier)
 
-            response = self.session.get(url, timeout=self.timeout)
-            response.raise_for_status()
+            fetch_start = time.monotonic()
+            try:
+                if self._hedge_budget is not None:
+                    content = self._fetch_hedged(url, breaker)
+                else:
+                    content = self._fetch(url, breaker)
+            finally:
+                fetch_time = time.monotonic() - fetch_start
+                with self._lock:
+                    self._fetch_seconds += fetch_time
+                    self._fetch_times.append(fetch_time)
+
+            head = content[:512].lower()
+            if any(marker in head for marker in HTML_MARKERS):
+                # Station answered with a page (login redirect), not history data
+                self._handle_failure()
+                return (point_path, 'failed', 0, 'HTML response', INVALID, None)
+
+            if self.validate is not None and len(content) >= self.min_content_size:
+                reason = self.validate(content)
+                if reason:
+                    return (point_path, 'failed', 0, reason, INVALID, None)
 
-            content = response.content
             filename = standardize_filename(point_path) + '.csv'
             filepath = os.path.join(save_folder, filename)
 
-            with open(filepath, 'wb') as f:
-                f.write(content)
+            write: Optional[Future] = None
+            if self._writer is not None:
+                write = self._writer.submit(filepath, content)  # waits while the writers are behind
+            else:
+                atomic_write(filepath, content, fsync=self.fsync)
+                if self._dir_sync is not None:
+                    self._dir_sync.wrote(save_folder)
 
             with self._lock:
                 self._consecutive_failures = 0
                 self._throttle_multiplier = max(1.0, self._throttle_multiplier * 0.9)
 
             if len(content) < self.min_content_size:
-                return (point_path, 'empty', len(content), None)
+                return (point_path, 'empty', len(content), None, None, write)
 
-            return (point_path, 'success', len(content), None)
+            return (point_path, 'success', len(content), None, None, write)
 
-        except requests.exceptions.Timeout:
-            self._handle_failure()
-            return (point_path, 'failed', 0, 'Timeout')
+        except requests.exceptions.Timeout as e:
+            self._handle_failure(breaker)
+            return (point_path, 'failed', 0, 'Timeout', classify_exception(e), None)
 
         except requests.exceptions.HTTPError as e:
             self._handle_failure()
             status = e.response.status_code if e.response is not None else 'unknown'
-            return (point_path, 'failed', 0, f'HTTP {status}')
+            return (point_path, 'failed', 0, f'HTTP {status}', classify_exception(e), None)
 
         except requests.exceptions.RequestException as e:
-            self._handle_failure()
-            return (point_path, 'failed', 0, str(e)[:50])
+            failure_class = classify_exception(e)
+            self._handle_failure(breaker if failure_class == CONNECTION else None)
+            return (point_path, 'failed', 0, str(e)[:50], failure_class, None)
 
         except Exception as e:
             self._handle_failure()
-            return (point_path, 'failed', 0, str(e)[:50])
+            return (point_path, 'failed', 0, str(e)[:50], classify_exception(e), None)
+
+    def _fetch(
+        self,
+        url: str,
+        breaker: Optional[CircuitBreaker],
+        cancel: Optional[threading.Event] = None
+    ) -> bytes:
+        """
+        GET a URL and return the body.
+
+        Args:
+            url: Download URL
+            breaker: Breaker of the URL's host (told the host answered)
+            cancel: Set by a hedged duplicate that finished first; the body
+                is streamed so the loser can stop between chunks
+
+        Raises:
+            requests.exceptions.RequestException: On request or HTTP errors
+            HedgeCancelled: If cancel was set while reading the body
+        """
+        start = time.monotonic()
+        response = self.session.get(url, timeout=self.timeout, stream=cancel is not None)
+        if breaker is not None:
+            breaker.record_success()
+
+        if cancel is None:
+            response.raise_for_status()
+            content = response.content
+        else:
+            try:
+                response.raise_for_status()
+                chunks: List[bytes] = []
+                for chunk in response.iter_content(chunk_size=65536):
+                    if cancel.is_set():
+                        raise HedgeCancelled(url)
+                    chunks.append(chunk)
+                content = b''.join(chunks)
+            finally:
+                response.close()
+
+        if self._latency is not None:
+            self._latency.record(time.monotonic() - start)
+        return content
+
+    def _fetch_hedged(self, url: str, breaker: Optional[CircuitBreaker]) -> bytes:
+        """
+        Fetch a URL, sending a duplicate if it runs past the p95 latency.
 
-    def _handle_failure(self) -> None:
-        """Handle download failure with adaptive throttling."""
+        The first successful response wins and the other request is told to
+        stop. If both fail, the original request's error is raised.
+        """
+        budget = self._hedge_budget
+        budget.started()
+        delay = self._latency.hedge_delay()
+        if delay is None:
+            return self._fetch(url, breaker)
+
+        cancel = threading.Event()
+        primary = self._request_pool.submit(self._fetch, url, breaker, cancel)
+        try:
+            return primary.result(timeout=delay)
+        except FuturesTimeout:
+            pass
+
+        if not budget.acquire():
+            return primary.result()
+
+        hedge = self._request_pool.submit(self._fetch, url, breaker, cancel)
+        pending = {primary, hedge}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    cancel.set()
+                    budget.release(won=future is hedge)
+                    return future.result()
+
+        budget.release(won=False)
+        return primary.result()
+
+    def _handle_failure(self, breaker: Optional[CircuitBreaker] = None) -> None:
+        """
+        Handle download failure with adaptive throttling.
+
+        Args:
+            breaker: Breaker of the request's host, for timeouts and
+                connection failures
+        """
+        if breaker is not None:
+            breaker.record_failure()
         with self._lock:
             self._consecutive_failures += 1
             if self._consecutive_failures > 5:
                 self._throttle_multiplier = min(5.0, self._throttle_multiplier * 1.5)
 
+    def _run_batch(
+        self,
+        url_list: List[Tuple[str, str]],
+        save_folder: str,
+        stats: DownloadStats,
+        on_result: Optional[Callable[[str, str, int, Optional[str], Optional[str], int], None]] = None
+    ) -> None:
+        """
+        Download a URL list, then drain the deferred retry queue.
+
+        Failures whose class allows it are re-queued instead of counted; the
+        queue is drained after the main pass with retry_workers workers.
+        Only final outcomes reach stats, on_result and the progress callback.
+
+        Args:
+            url_list: List of (point_path, url) tuples
+            save_folder: Folder to write CSV files to
+            stats: Stats to update
+            on_result: Called as (point_path, status, size, error,
+                failure_class, attempts) for every final outcome
+        """
+        # Cancelling also cuts short the wait for the next retry round
+        queue = RetryQueue(self.retry_policies, sleep=self.cancel_event.wait)
+        completed = 0
+        budget = self._hedge_budget
+        hedged_before = (budget.hedged, budget.wins) if budget else (0, 0)
+        writer = self._writer
+        fetch_before = self._fetch_seconds
+        latency_before = len(self._fetch_times)
+        write_before = (writer.busy_seconds, writer.blocked_seconds) if writer else (0.0, 0.0)
+
+        def run(items: List[Tuple[str, str]], workers: int) -> None:
+            nonlocal completed
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                futures = {
+                    executor.submit(
+                        self._download_single,
+                        point_path,
+                        url,
+                        save_folder
+                    ): (point_path, url)
+                    for point_path, url in items
+                }
+
+                for future in as_completed(futures):
+                    point_path, status, size, error, failure_class, write = future.result()
+                    if write is not None:
+                        try:
+                            write.result()
+                        except OSError as e:
+                            status, size, error, failure_class = 'failed', 0, str(e)[:50], OTHER
+
+                    if status == 'cancelled':
+                        stats.cancelled += 1
+                        continue
+                    if self.on_file is not None and status in ('success', 'empty'):
+                        # File is on disk under its final name (e.g. queue the FTP upload)
+                        self.on_file(os.path.join(save_folder, standardize_filename(point_path) + '.csv'))
+                    if status == 'failed' and queue.offer(point_path, futures[future][1], failure_class):
+                        continue
+
+                    completed += 1
+                    attempts = queue.attempts(point_path)
+                    if status == 'success':
+                        stats.success += 1
+                        stats.bytes_downloaded += size
+                    elif status == 'empty':
+                        stats.empty += 1
+                        stats.bytes_downloaded += size
+                    else:
+                        stats.failed += 1
+                        stats.errors_by_class[failure_class] = stats.errors_by_class.get(failure_class, 0) + 1
+                        if error:
+                            stats.errors.append((point_path, error))
+                    if attempts and status != 'failed':
+                        stats.recovered += 1
+
+                    if on_result:
+                        on_result(point_path, status, size, error, failure_class, attempts)
+
+                    if self.progress_callback:
+                        self.progress_callback(completed, stats.total, point_path, status)
+
+        run(url_list, self.max_workers)
+
+        while queue and not self.cancel_event.is_set():
+            due = queue.next_round()
+            stats.retried += len(due)
+            logger.info("Retrying %d points (%d queued)", len(due), len(queue))
+            run(due, self.retry_workers)
+
+        # Re-attempts still waiting when the run was cancelled: never finished,
+        # so they are counted like cancelled downloads (and resumed next run)
+        leftover = queue.drain()
+        if leftover:
+            stats.cancelled += len(leftover)
+            logger.info("Cancelled with %d retries pending", len(leftover))
+
+        if budget is not None:
+            stats.hedged += budget.hedged - hedged_before[0]
+            stats.hedge_wins += budget.wins - hedged_before[1]
+
+        stats.fetch_workers = self.max_workers
+        stats.fetch_seconds += self._fetch_seconds - fetch_before
+        stats.latencies.extend(self._fetch_times[latency_before:])
+        if writer is not None:
+            stats.write_workers = writer.threads
+            stats.write_seconds += writer.busy_seconds - write_before[0]
+            stats.backpressure_seconds += writer.blocked_seconds - write_before[1]
+
+        self.sync_directories()
+
+    def sync_directories(self) -> None:
+        """Flush pending directory syncs (renames of files written so far)."""
+        if self._dir_sync is not None:
+            self._dir_sync.flush()
+
     def download_batch(
         self,
         url_list: List[Tuple[str, str]],
@@ -265,35 +685,7 @@ class DownloadEngine:
 
         os.makedirs(save_folder, exist_ok=True)
 
-        completed = 0
-        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
-            futures = {
-                executor.submit(
-                    self._download_single,
-                    point_path,
-                    url,
-                    save_folder
-                ): point_path
-                for point_path, url in url_list
-            }
-
-            for future in as_completed(futures):
-                point_path, status, size, error = future.result()
-                completed += 1
-
-                if status == 'success':
-                    stats.success += 1
-                    stats.bytes_downloaded += size
-                elif status == 'empty':
-                    stats.empty += 1
-                    stats.bytes_downloaded += size
-                else:
-                    stats.failed += 1
-                    if error:
-                        stats.errors.append((point_path, error))
-
-                if self.progress_callback:
-                    self.progress_callback(completed, stats.total, point_path, status)
+        self._run_batch(url_list, save_folder, stats)
 
         stats.end_time = time.time()
         return stats
@@ -336,7 +728,10 @@ class DownloadEngine:
                 total_points=len(url_list)
             )
 
-        # Filter already-completed points
+        # Filter already-completed points whose files are intact
+        reverify = state.verify(save_folder)
+        if reverify:
+            logger.warning("%d completed files missing or truncated, downloading again", len(reverify))
         already_done = state.completed_set
         remaining = [(p, u) for p, u in url_list if p not in already_done]
         skipped_by_state = len(url_list) - len(remaining)
@@ -349,57 +744,67 @@ class DownloadEngine:
         if not remaining:
             return stats
 
-        save_folder.mkdir(parents=True, exist_ok=True)
+        # Failures from an earlier run are re-attempted now; keep only the latest
+        retrying = {p for p, _ in remaining}
+        state.failed = [f for f in state.failed if f.get('point') not in retrying]
 
-        completed = 0
-        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
-            futures = {
-                executor.submit(
-                    self._download_single,
-                    point_path,
-                    url,
-                    str(save_folder)
-                ): point_path
-                for point_path, url in remaining
-            }
-
-            for future in as_completed(futures):
-                point_path, status, size, error = future.result()
-                completed += 1
-
-                if status == 'success':
-                    stats.success += 1
-                    stats.bytes_downloaded += size
-                    state.completed.append(point_path)
-                elif status == 'empty':
-                    stats.empty += 1
-                    stats.bytes_downloaded += size
-                    state.empty.append(point_path)
-                    state.completed.append(point_path)
-                else:
-                    stats.failed += 1
-                    if error:
-                        stats.errors.append((point_path, error))
-                    state.failed.append({
-                        'point': point_path,
-                        'error': error or 'unknown',
-                        'time': datetime.now().isoformat()
-                    })
-
-                # Save state periodically (every 50 downloads)
-                if completed % 50 == 0:
-                    state.save(state_path)
-
-                if self.progress_callback:
-                    self.progress_callback(completed, stats.total, point_path, status)
-
-        # Final state save
-        state.save(state_path)
+        recorded = 0
+
+        def on_result(point_path: str, status: str, size: int, error: Optional[str],
+                      failure_class: Optional[str], attempts: int) -> None:
+            nonlocal recorded
+            if status == 'success':
+                state.completed.append(point_path)
+                state.sizes[point_path] = size
+            elif status == 'empty':
+                state.empty.append(point_path)
+                state.completed.append(point_path)
+                state.sizes[point_path] = size
+            else:
+                state.failed.append({
+                    'point': point_path,
+                    'error': error or 'unknown',
+                    'class': failure_class or 'other',
+                    'attempts': str(attempts + 1),
+                    'time': datetime.now().isoformat()
+                })
+
+            # Save state periodically (every 50 downloads), after the files
+            # it lists are durable
+            recorded += 1
+            if recorded % 50 == 0:
+                self.sync_directories()
+                state.save(state_path)
+
+        try:
+            self._run_batch(remaining, str(save_folder), stats, on_result)
+        finally:
+            # Final state save
+            self.sync_directories()
+            state.save(state_path)
+
+        if stats.errors_by_class:
+            logger.warning("Unrecoverable failures: %s", stats.failure_breakdown())
         stats.end_time = time.time()
         return stats
 
+    def cancel(self) -> None:
+        """
+        Stop the current batch: points not yet started are skipped (and stay
+        out of the resume state), in-flight downloads finish normally.
+        """
+        self.cancel_event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self.cancel_event.is_set()
+
     def close(self) -> None:
         """Close the session and release resources."""
+        if self._request_pool is not None:
+            self._request_pool.shutdown(wait=False, cancel_futures=True)
+        if self._writer is not None:
+            self._writer.close()
         self.session.close()
 
     def __enter__(self):
@@ -467,6 +872,10 @@ def filter_existing_files(
     """
     Filter out points that already have downloaded files.
 
+    A file only counts if its size matches the size recorded in the
+    folder's resume state (when the state has one). In-progress '.part'
+    files never count.
+
     Args:
         url_list: List of (point_path, url) tuples
         output_folder: Output folder to check
@@ -484,14 +893,17 @@ def filter_existing_files(
     if not os.path.exists(today_folder):
         return url_list, 0
 
-    existing = {f for f in os.listdir(today_folder) if f.endswith('.csv')}
+    existing = _csv_sizes(today_folder)
+    state = DownloadState.load(Path(today_folder) / '.download_state.json')
+    recorded = state.sizes if state is not None else {}
 
     filtered: List[Tuple[str, str]] = []
     skipped = 0
 
     for point_path, url in url_list:
-        expected = standardize_filename(point_path) + '.csv'
-        if expected in existing:
+        size = existing.get(standardize_filename(point_path) + '.csv')
+        expected = recorded.get(point_path)
+        if size is not None and (expected is None or size == expected):
             skipped += 1
         else:
             filtered.append((point_path, url))
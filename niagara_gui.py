@@ -12,7 +12,6 @@ Build as .exe with: python build_exe.py
 import os
 import sys
 import time
-import socket
 import threading
 import queue
 import re
@@ -46,10 +45,12 @@ from tkinter import filedialog, messagebox
 # ============================================================================
 # BACKEND IMPORTS
 # ============================================================================
-from config_district_details import district_config
-from niagara_download_engine import DownloadEngine, ProgressPrinter, filter_existing_files
+# The download engine (requests/urllib3) and NiagaraAuth are imported in the
+# download thread so the window opens without loading them.
+from district_registry import get_district, get_district_names, reload as reload_districts
 from niagara_url_generator import URLGenerator, get_available_districts, get_point_list_path
-from niagara_auth import NiagaraAuth
+from point_selection import PointSelector
+from download_priority import build_scorer, prioritize, record_run
 from credentials import get_district_credentials
 from utils import APP_VERSION
 from logging_config import get_logger, setup_logging
@@ -127,6 +128,7 @@ class NiagaraApp(ctk.CTk if CTK_AVAILABLE else tk.Tk):
         # State
         self.msg_queue = queue.Queue()
         self.is_running = False
+        self._cancel = threading.Event()
         self._districts_cache = []
         self._selected_districts = []
 
@@ -281,6 +283,27 @@ class NiagaraApp(ctk.CTk if CTK_AVAILABLE else tk.Tk):
             text_color=COLORS['text'], font=(FONT_FAMILY, 12)
         ).grid(row=0, column=3, padx=(10, 0), pady=3)
 
+        # Selection (blank = all points)
+        sel_params = ctk.CTkFrame(param_card, fg_color='transparent')
+        sel_params.pack(fill='x', padx=15, pady=(0, 10))
+        sel_params.grid_columnconfigure(1, weight=1)
+
+        self.selection_entries = {}
+        for row, (key, label, hint) in enumerate([
+            ('buildings', "Buildings:", "all buildings (comma separated)"),
+            ('include', "Include:", "*Temp*, re:AHU\\d+"),
+            ('exclude', "Exclude:", "*Alarm*"),
+        ]):
+            ctk.CTkLabel(sel_params, text=label, font=(FONT_FAMILY, 12),
+                          text_color=COLORS['text_dim']).grid(row=row, column=0, sticky='w', pady=3)
+            entry = ctk.CTkEntry(
+                sel_params, height=32, placeholder_text=hint,
+                fg_color=COLORS['bg_input'], border_color=COLORS['border'],
+                text_color=COLORS['text'], font=(FONT_FAMILY, 11)
+            )
+            entry.grid(row=row, column=1, sticky='ew', padx=(10, 0), pady=3)
+            self.selection_entries[key] = entry
+
         # Output directory
         out_frame = ctk.CTkFrame(param_card, fg_color='transparent')
         out_frame.pack(fill='x', padx=15, pady=(0, 10))
@@ -448,11 +471,11 @@ class NiagaraApp(ctk.CTk if CTK_AVAILABLE else tk.Tk):
         for w in self.district_list.winfo_children():
             w.destroy()
 
-        districts = sorted(district_config.keys())
+        districts = get_district_names()
 
         for i, dist_name in enumerate(districts):
-            config = district_config.get(dist_name, {})
-            base_ip = config.get('BASE_IP', 'N/A')
+            record = get_district(dist_name)
+            base_ip = record.base_ip or 'N/A'
             bg = COLORS['bg_card'] if i % 2 == 0 else COLORS['bg_dark']
 
             row = ctk.CTkFrame(self.district_list, fg_color=bg, corner_radius=2, height=30)
@@ -485,9 +508,7 @@ class NiagaraApp(ctk.CTk if CTK_AVAILABLE else tk.Tk):
                           text_color=pt_color, width=60, anchor='center').pack(side='left', padx=5)
 
             # VPN type — V2.0: VPN_DATA is just the type string
-            vpn_type = config.get('VPN_DATA', 'na')
-            if vpn_type.lower() in ('na', 'n/a', ''):
-                vpn_type = '—'
+            vpn_type = record.vpn_type or '—'
             ctk.CTkLabel(row, text=vpn_type, font=(FONT_FAMILY, 11),
                           text_color=COLORS['text_dim'], width=140, anchor='w').pack(side='left', padx=5)
 
@@ -530,7 +551,7 @@ class NiagaraApp(ctk.CTk if CTK_AVAILABLE else tk.Tk):
         # Initial log entry
         self._log("Application started.")
         self._log(f"App directory: {APP_DIR}")
-        self._log(f"Districts available: {len(district_config)}")
+        self._log(f"Districts available: {len(get_district_names())}")
 
     # ----------------------------------------------------------------
     # STATUS BAR
@@ -541,7 +562,7 @@ class NiagaraApp(ctk.CTk if CTK_AVAILABLE else tk.Tk):
         bar.pack_propagate(False)
 
         ctk.CTkLabel(
-            bar, text=f"  v{APP_VERSION}  |  {len(district_config)} districts",
+            bar, text=f"  v{APP_VERSION}  |  {len(get_district_names())} districts",
             font=(FONT_FAMILY, 10), text_color=COLORS['text_muted']
         ).pack(side='left', padx=10)
 
@@ -659,8 +680,10 @@ class NiagaraApp(ctk.CTk if CTK_AVAILABLE else tk.Tk):
         if dist in ("Select a district...", "No districts found"):
             return
 
-        config = district_config.get(dist, {})
-        base_ip = config.get('BASE_IP', 'N/A')
+        record = get_district(dist)
+        if record is None:
+            return
+        base_ip = record.base_ip or 'N/A'
 
         # Check credentials
         u, p = get_district_credentials(dist)
@@ -669,18 +692,13 @@ class NiagaraApp(ctk.CTk if CTK_AVAILABLE else tk.Tk):
         # Check point list
         path, source = get_point_list_path(dist)
         if path:
-            from niagara_url_generator import load_point_list
-            points = load_point_list(path)
-            pts_info = f"{len(points)} points ({source})"
+            from point_list_cache import count_points
+            pts_info = f"{count_points(path)} points ({source})"
         else:
             pts_info = "No point list"
 
         # VPN type — V2.0: VPN_DATA is just the type string
-        vpn_type = config.get('VPN_DATA', 'na')
-        if vpn_type.lower() in ('na', 'n/a', ''):
-            vpn_display = "None"
-        else:
-            vpn_display = vpn_type
+        vpn_display = record.vpn_type or "None"
 
         info = f"IP: {base_ip}  |  Creds: {has_creds}  |  {pts_info}  |  VPN: {vpn_display}"
         self.dist_info.configure(text=info)
@@ -738,7 +756,8 @@ class NiagaraApp(ctk.CTk if CTK_AVAILABLE else tk.Tk):
         else:
             self._log(".env file not found")
 
-        # Refresh districts
+        # Refresh districts (re-checks config_district_details.py)
+        reload_districts()
         self._refresh_districts()
         self._populate_district_list()
 
@@ -814,6 +833,19 @@ class NiagaraApp(ctk.CTk if CTK_AVAILABLE else tk.Tk):
             messagebox.showwarning("No Output", "Please select an output directory.")
             return
 
+        def split_list(text):
+            return [item.strip() for item in text.split(',') if item.strip()]
+
+        try:
+            selector = PointSelector(
+                split_list(self.selection_entries['buildings'].get()),
+                split_list(self.selection_entries['include'].get()),
+                split_list(self.selection_entries['exclude'].get())
+            )
+        except ValueError as e:
+            messagebox.showwarning("Invalid Filter", str(e))
+            return
+
         # Check credentials
         u, p = get_district_credentials(dist)
         if not (u and p):
@@ -839,6 +871,7 @@ class NiagaraApp(ctk.CTk if CTK_AVAILABLE else tk.Tk):
 
         # Disable start, enable stop
         self.is_running = True
+        self._cancel = threading.Event()
         self.start_btn.configure(state='disabled')
         self.stop_btn.configure(state='normal')
         self._set_status("Downloading...", COLORS['info'])
@@ -848,12 +881,12 @@ class NiagaraApp(ctk.CTk if CTK_AVAILABLE else tk.Tk):
         self.progress_bar.set(0)
         self.progress_label.configure(text="Initializing...")
 
-        self._log(f"Starting download: {dist} ({days} days, {workers} workers)")
+        self._log(f"Starting download: {dist} ({days} days, {workers} workers, {selector.describe()})")
 
         # Launch download thread
         thread = threading.Thread(
             target=self._download_thread,
-            args=(dist, days, workers, output_dir),
+            args=(dist, days, workers, output_dir, selector),
             daemon=True
         )
         thread.start()
@@ -861,10 +894,11 @@ class NiagaraApp(ctk.CTk if CTK_AVAILABLE else tk.Tk):
     def _stop_download(self):
         """Stop the download process."""
         self.is_running = False
+        self._cancel.set()
         self._set_status("Stopping...", COLORS['warning'])
-        self._log("Stop requested — finishing current downloads...")
+        self._log("Stop requested — finishing in-flight downloads, the rest resume next run...")
 
-    def _download_thread(self, district, days, workers, output_dir):
+    def _download_thread(self, district, days, workers, output_dir, selector=None):
         """Background thread for downloading data."""
         # Capture stdout/stderr
         old_stdout = sys.stdout
@@ -873,6 +907,9 @@ class NiagaraApp(ctk.CTk if CTK_AVAILABLE else tk.Tk):
         sys.stderr = OutputCapture(self.msg_queue, 'stderr')
 
         try:
+            from niagara_download_engine import DownloadEngine, filter_existing_files
+            from niagara_auth import NiagaraAuth
+
             self.msg_queue.put(('stdout', f"Authenticating to {district}..."))
 
             # Authenticate
@@ -890,7 +927,15 @@ class NiagaraApp(ctk.CTk if CTK_AVAILABLE else tk.Tk):
             self.msg_queue.put(('stdout', f"Generating URLs for {days} days..."))
 
             url_gen = URLGenerator(district)
-            url_list = url_gen.generate(days=days)
+            points = None
+            if selector is not None and selector.is_active:
+                points = url_gen.select_points(selector)
+                self.msg_queue.put(('stdout', f"Selected {len(points)} of {url_gen.point_count} points"))
+                if not points:
+                    self._finish_download(False, "Selection matched no points")
+                    return
+            url_list = url_gen.generate(days=days, points=points)
+            url_list = prioritize(url_list, build_scorer(url_gen.record, output_dir))
 
             self.msg_queue.put(('stdout', f"Generated {len(url_list)} URLs"))
 
@@ -917,7 +962,8 @@ class NiagaraApp(ctk.CTk if CTK_AVAILABLE else tk.Tk):
             engine = DownloadEngine(
                 cookies=cookies,
                 max_workers=workers,
-                progress_callback=progress_cb
+                progress_callback=progress_cb,
+                cancel_event=self._cancel
             )
 
             stats = engine.download_batch_with_resume(
@@ -926,6 +972,7 @@ class NiagaraApp(ctk.CTk if CTK_AVAILABLE else tk.Tk):
                 district=district
             )
             engine.close()
+            record_run(output_dir, district)
 
             # Report results
             self.msg_queue.put(('stdout', ""))
@@ -935,14 +982,16 @@ class NiagaraApp(ctk.CTk if CTK_AVAILABLE else tk.Tk):
             self.msg_queue.put(('stdout', "=" * 60))
 
             if stats.errors:
-                self.msg_queue.put(('stderr', f"  {len(stats.errors)} errors occurred"))
+                self.msg_queue.put(('stderr', f"  {len(stats.errors)} errors occurred ({stats.failure_breakdown()})"))
                 for pt, err in stats.errors[:10]:
                     self.msg_queue.put(('stderr', f"    {pt}: {err}"))
                 if len(stats.errors) > 10:
                     self.msg_queue.put(('stderr', f"    ... and {len(stats.errors) - 10} more"))
 
-            success = stats.failed == 0
+            success = stats.failed == 0 and not stats.cancelled
             status_msg = f"Done: {stats.success} OK, {stats.failed} failed, {stats.empty} empty"
+            if stats.cancelled:
+                status_msg = f"Stopped: {stats.success} OK, {stats.cancelled} left for next run"
             self._finish_download(success, status_msg)
 
         except Exception as e:
@@ -0,0 +1,632 @@
+"""
+================================================================================
+NIAGARA SCHEDULER v2.0
+================================================================================
+Long-running service mode: pulls districts on a schedule instead of someone
+starting run_cli.bat or the GUI by hand.
+
+Schedule (schedule.json next to this script):
+
+    {
+      "check_interval": 60,
+      "defaults": {"workers": 10, "headless": true},
+      "districts": {
+        "WINDHAMSCHOOLSNH": {"cron": "30 2 * * *"},
+        "NASHUA": {"every": "2d", "window": "22:00-06:00", "mode": "backfill", "days": 30},
+        "HUDSON": {"cron": "0 3 * * *", "gap_fill": {"every": "1d", "days": 90}}
+      }
+    }
+
+Per district:
+    cron      - 5-field cron expression (minute hour day month weekday)
+                firing at most once a day, or
+    every     - interval of at least 1d (from the end of the last run; the
+                first run starts as soon as the window allows)
+    window    - only start between these local times (may wrap midnight)
+    mode      - 'incremental' (default): download the days since the last
+                fully successful run, so a steady-state cycle fetches only
+                new data; 'backfill': always the full `days` window;
+                'gap_fill': only the coverage gaps inside `days` (gap_fill)
+    days      - backfill window; incremental first-run and maximum window
+    workers, throttle, hedge, writers, headless, auto_fetch, upload,
+    postprocess, enabled
+    gap_fill  - a second, low-priority job for the district that heals
+                coverage gaps (its own cron/every/window/days/workers/
+                throttle; default every 1d, 90 days, 2 workers; `true` for
+                the defaults). Due gap fills run after due regular pulls;
+                both share the district lock. `--run DISTRICT:gap_fill`.
+
+Downloads land in per-day folders with resume state and windows that end
+at midnight, so a second cycle on the same day would find nothing new: jobs
+run at most once a day, and a same-day retry after a failure only re-tries
+what is missing or failed.
+
+Between cycles the scheduler keeps each district's session cookies and
+touches the station every few minutes so the next cycle skips the browser
+login. A lock file per district (.cache/locks/) stops two schedulers, or a
+scheduler and a manual run started through it, from pulling the same
+district at once. Schedule state (last run, last success, next run)
+persists in schedule_state.json across restarts.
+
+USAGE:
+    python niagara_scheduler.py                 # run until Ctrl-C
+    python niagara_scheduler.py --once          # run what is due, then exit
+    python niagara_scheduler.py --status        # show schedule state
+    python niagara_scheduler.py --run NASHUA    # run one district now
+    python niagara_scheduler.py --run HUDSON:gap_fill
+================================================================================
+"""
+
+import json
+import os
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field, asdict
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, Iterator, List, Optional, Set, Tuple
+
+from niagara_url_generator import INTERVAL_UNITS
+from utils import CACHE_DIR, atomic_write, safe_print, print_header, setup_console_encoding
+from logging_config import get_logger
+
+logger = get_logger("scheduler")
+
+if TYPE_CHECKING:
+    from auth_pipeline import AuthPipeline
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+SCRIPT_DIR = Path(__file__).parent
+SCHEDULE_FILE = SCRIPT_DIR / "schedule.json"
+STATE_FILE = SCRIPT_DIR / "schedule_state.json"
+LOCK_DIR = CACHE_DIR / "locks"
+
+CHECK_INTERVAL = 60              # seconds between schedule checks
+KEEPALIVE_SECONDS = 10 * 60      # touch cached sessions this often
+RETRY_AFTER_FAILURE = 15 * 60    # seconds before a failed run is retried
+LOCK_STALE_HOURS = 12            # a lock older than this is abandoned
+DEFAULT_DAYS = 7
+MIN_EVERY = 86400                # windows end at midnight: one cycle per day
+MODES = ('incremental', 'backfill', 'gap_fill')
+GAP_FILL_DEFAULTS = {'every': '1d', 'days': 90, 'workers': 2}
+GAP_FILL_OWN = ('cron', 'every', 'window', 'mode', 'days', 'workers', 'throttle', 'gap_fill')
+
+
+# ============================================================================
+# CRON
+# ============================================================================
+class CronSpec:
+    """Minimal 5-field cron expression: minute hour day-of-month month weekday."""
+
+    RANGES = ((0, 59), (0, 23), (1, 31), (1, 12), (0, 6))
+
+    def __init__(self, expression: str) -> None:
+        fields = expression.split()
+        if len(fields) != 5:
+            raise ValueError(f"Cron expression needs 5 fields: '{expression}'")
+        self.expression = expression
+        parsed = [self._parse_field(f, lo, hi) for f, (lo, hi) in zip(fields, self.RANGES)]
+        self.minutes, self.hours, self.days, self.months, weekdays = parsed
+        self.weekdays = {d % 7 for d in weekdays}  # 7 is also Sunday
+        self.any_day = fields[2] == '*'
+        self.any_weekday = fields[4] == '*'
+
+    @staticmethod
+    def _parse_field(spec: str, lo: int, hi: int) -> Set[int]:
+        values: Set[int] = set()
+        for part in spec.split(','):
+            rng, _, step_text = part.partition('/')
+            try:
+                step = int(step_text) if step_text else 1
+                if rng == '*':
+                    start, end = lo, hi
+                elif '-' in rng:
+                    start, end = (int(x) for x in rng.split('-', 1))
+                else:
+                    start = int(rng)
+                    end = hi if step_text else start
+            except ValueError:
+                raise ValueError(f"Invalid cron field '{spec}'")
+            # Weekday 7 is an alias for Sunday
+            if step <= 0 or start < lo or end > (7 if hi == 6 else hi) or start > end:
+                raise ValueError(f"Invalid cron field '{spec}'")
+            values.update(range(start, end + 1, step))
+        return values
+
+    def _day_matches(self, day: datetime) -> bool:
+        if day.month not in self.months:
+            return False
+        weekday = (day.weekday() + 1) % 7  # cron: 0 = Sunday
+        in_days = day.day in self.days
+        in_weekdays = weekday in self.weekdays
+        if self.any_day:
+            return in_weekdays
+        if self.any_weekday:
+            return in_days
+        return in_days or in_weekdays  # both restricted: either matches
+
+    def next_after(self, moment: datetime) -> datetime:
+        """First matching minute strictly after moment."""
+        start = moment.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        hours = sorted(self.hours)
+        minutes = sorted(self.minutes)
+        for offset in range(0, 366 * 4):
+            day = (start + timedelta(days=offset)).replace(hour=0, minute=0)
+            if not self._day_matches(day):
+                continue
+            for hour in hours:
+                for minute in minutes:
+                    candidate = day.replace(hour=hour, minute=minute)
+                    if candidate >= start:
+                        return candidate
+        raise ValueError(f"Cron expression never matches: '{self.expression}'")
+
+
+def parse_every(text: str) -> int:
+    """Interval such as '30m', '6h', '1d' in seconds."""
+    try:
+        seconds = int(text[:-1]) * INTERVAL_UNITS[text[-1].lower()]
+    except (ValueError, KeyError, IndexError):
+        raise ValueError(f"Invalid interval '{text}' (use e.g. 30m, 6h, 1d)")
+    if seconds <= 0:
+        raise ValueError(f"Invalid interval '{text}'")
+    return seconds
+
+
+def parse_window(text: str) -> Tuple[int, int]:
+    """'HH:MM-HH:MM' as minutes after midnight (start, end)."""
+    try:
+        start, end = text.split('-')
+        return tuple(int(h) * 60 + int(m) for h, m in (t.strip().split(':') for t in (start, end)))
+    except ValueError:
+        raise ValueError(f"Invalid window '{text}' (use e.g. 22:00-06:00)")
+
+
+# ============================================================================
+# JOBS
+# ============================================================================
+class Job:
+    """One district's schedule entry."""
+
+    def __init__(self, district: str, spec: Dict[str, Any], defaults: Dict[str, Any]) -> None:
+        options = dict(defaults)
+        options.update(spec)
+        self.district = district.upper()
+        self.enabled = bool(options.get('enabled', True))
+        self.cron = CronSpec(options['cron']) if options.get('cron') else None
+        self.every_text = options.get('every')
+        self.every = parse_every(self.every_text) if self.every_text else None
+        if self.cron is None and self.every is None:
+            raise ValueError(f"{self.district}: schedule needs 'cron' or 'every'")
+        if self.every is not None and self.every < MIN_EVERY:
+            raise ValueError(
+                f"{self.district}: 'every' must be at least 1d (a second cycle on the same day "
+                f"would find nothing new)"
+            )
+        if self.cron is not None and len(self.cron.minutes) * len(self.cron.hours) > 1:
+            raise ValueError(f"{self.district}: cron must fire at most once a day")
+        self.window = parse_window(options['window']) if options.get('window') else None
+        self.mode = options.get('mode', 'incremental')
+        if self.mode not in MODES:
+            raise ValueError(f"{self.district}: mode must be one of {', '.join(MODES)}")
+        self.days = int(options.get('days', DEFAULT_DAYS))
+        self.workers = int(options.get('workers', 10))
+        self.throttle = float(options.get('throttle', 0.0))
+        self.hedge = bool(options.get('hedge', False))
+        self.writers = options.get('writers')
+        self.headless = bool(options.get('headless', True))
+        self.auto_fetch = bool(options.get('auto_fetch', False))
+        self.upload = bool(options.get('upload', False))
+        self.postprocess = bool(options.get('postprocess', False))
+
+    @property
+    def key(self) -> str:
+        """State key: the district, with ':gap_fill' for its gap fill job."""
+        return f"{self.district}:gap_fill" if self.mode == 'gap_fill' else self.district
+
+    def in_window(self, moment: datetime) -> bool:
+        """True if a run may start at moment."""
+        if self.window is None:
+            return True
+        start, end = self.window
+        now = moment.hour * 60 + moment.minute
+        if start <= end:
+            return start <= now < end
+        return now >= start or now < end  # wraps midnight
+
+    def next_run(self, after: datetime) -> datetime:
+        """Next start time after a run finished (or the scheduler started)."""
+        if self.cron is not None:
+            return self.cron.next_after(after)
+        return after + timedelta(seconds=self.every)
+
+    def window_days(self, last_success: Optional[str], today: datetime) -> int:
+        """Days to download this cycle."""
+        if self.mode != 'incremental' or not last_success:
+            return self.days
+        try:
+            since = (today.date() - datetime.fromisoformat(last_success).date()).days
+        except ValueError:
+            return self.days
+        return max(1, min(self.days, since + 1))  # one day of overlap
+
+
+def load_schedule(path: Path = SCHEDULE_FILE) -> Tuple[List[Job], int]:
+    """
+    Load the schedule file.
+
+    Returns:
+        (jobs, check_interval)
+
+    Raises:
+        ValueError: If the file is missing or an entry is invalid
+    """
+    if not path.exists():
+        raise ValueError(f"Schedule file not found: {path}")
+    try:
+        with open(path) as f:
+            config = json.load(f)
+    except json.JSONDecodeError as e:
+        raise ValueError(f"Invalid schedule file {path}: {e}")
+    defaults = config.get('defaults', {})
+    jobs: List[Job] = []
+    for name, spec in config.get('districts', {}).items():
+        jobs.append(Job(name, spec, defaults))
+        gap_spec = spec.get('gap_fill')
+        if gap_spec:
+            options = {k: v for k, v in spec.items() if k not in GAP_FILL_OWN}
+            options.update(GAP_FILL_DEFAULTS)
+            options.update(gap_spec if isinstance(gap_spec, dict) else {})
+            options['mode'] = 'gap_fill'
+            jobs.append(Job(name, options, defaults))
+    return jobs, int(config.get('check_interval', CHECK_INTERVAL))
+
+
+# ============================================================================
+# STATE
+# ============================================================================
+@dataclass
+class SchedulerState:
+    """Per-district run history that survives restarts."""
+    districts: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+
+    def save(self, path: Path = STATE_FILE) -> None:
+        """Save state to JSON file."""
+        atomic_write(path, json.dumps(asdict(self), indent=2).encode('utf-8'))
+
+    @classmethod
+    def load(cls, path: Path = STATE_FILE) -> 'SchedulerState':
+        """Load state from JSON file (empty if missing or corrupt)."""
+        if not path.exists():
+            return cls()
+        try:
+            with open(path) as f:
+                return cls(**json.load(f))
+        except (json.JSONDecodeError, TypeError):
+            logger.warning("Corrupt scheduler state: %s", path)
+            return cls()
+
+    def entry(self, district: str) -> Dict[str, Any]:
+        return self.districts.setdefault(district, {})
+
+
+# ============================================================================
+# DISTRICT LOCKS
+# ============================================================================
+def _lock_is_stale(path: Path) -> bool:
+    try:
+        age = time.time() - path.stat().st_mtime
+        with open(path) as f:
+            pid = int(f.read().split()[0])
+    except (OSError, ValueError, IndexError):
+        return True
+    if age > LOCK_STALE_HOURS * 3600:
+        return True
+    if os.name != 'nt':  # os.kill(pid, 0) terminates the process on Windows
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return True
+        except PermissionError:
+            pass
+    return False
+
+
+@contextmanager
+def district_lock(district: str) -> Iterator[bool]:
+    """
+    Hold a district's lock file for the duration of a run.
+
+    Yields:
+        True if the lock was taken, False if another run holds it
+    """
+    LOCK_DIR.mkdir(parents=True, exist_ok=True)
+    path = LOCK_DIR / f"{district.upper()}.lock"
+    for _ in range(2):
+        try:
+            fd = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            break
+        except FileExistsError:
+            if not _lock_is_stale(path):
+                yield False
+                return
+            logger.warning("Removing stale lock %s", path)
+            try:
+                path.unlink()
+            except OSError:
+                pass
+    else:
+        yield False
+        return
+    try:
+        os.write(fd, f"{os.getpid()} {datetime.now().isoformat(timespec='seconds')}".encode())
+        os.close(fd)
+        yield True
+    finally:
+        try:
+            path.unlink()
+        except OSError:
+            pass
+
+
+# ============================================================================
+# SESSION CACHE
+# ============================================================================
+class SessionCache:
+    """Authenticated cookies per district, kept alive between cycles."""
+
+    def __init__(self) -> None:
+        self._sessions: Dict[str, Tuple[Dict[str, str], float]] = {}  # district -> (cookies, last touch)
+
+    def get(self, district: str, headless: bool = True) -> Optional[Dict[str, str]]:
+        """Cookies for a district: cached if still valid, else a fresh login."""
+        from niagara_auth import NiagaraAuth
+
+        auth = NiagaraAuth(district)
+        cached = self._sessions.get(district)
+        if cached is not None and auth.validate_session(cached[0]):
+            self._sessions[district] = (cached[0], time.time())
+            logger.info("Reusing session for %s", district)
+            return cached[0]
+
+        try:
+            cookies = auth.login(headless=headless)
+        finally:
+            auth.close()
+        if cookies:
+            self._sessions[district] = (cookies, time.time())
+        else:
+            self._sessions.pop(district, None)
+        return cookies
+
+    def drop(self, district: str) -> None:
+        self._sessions.pop(district, None)
+
+    def keep_warm(self) -> None:
+        """Touch sessions idle for KEEPALIVE_SECONDS; drop the expired ones."""
+        from niagara_auth import NiagaraAuth
+
+        now = time.time()
+        for district, (cookies, touched) in list(self._sessions.items()):
+            if now - touched < KEEPALIVE_SECONDS:
+                continue
+            if NiagaraAuth(district).validate_session(cookies):
+                self._sessions[district] = (cookies, now)
+            else:
+                logger.info("Session for %s expired", district)
+                self._sessions.pop(district, None)
+
+
+# ============================================================================
+# SCHEDULER
+# ============================================================================
+class Scheduler:
+    """Runs due districts one at a time."""
+
+    def __init__(
+        self,
+        jobs: List[Job],
+        check_interval: int = CHECK_INTERVAL,
+        state_path: Path = STATE_FILE,
+        output_dir: Optional[str] = None
+    ) -> None:
+        self.jobs = [j for j in jobs if j.enabled]
+        self.check_interval = check_interval
+        self.state_path = state_path
+        self.output_dir = output_dir
+        self.state = SchedulerState.load(state_path)
+        self.sessions = SessionCache()
+
+        now = datetime.now()
+        for job in self.jobs:
+            entry = self.state.entry(job.key)
+            if not entry.get('next_run'):
+                # Interval jobs start right away (due() waits for the window)
+                first = job.next_run(now) if job.cron is not None else now
+                entry['next_run'] = first.isoformat(timespec='seconds')
+        self.state.save(state_path)
+
+    def due(self, now: datetime) -> List[Job]:
+        """Jobs whose next run has passed and whose window is open."""
+        due: List[Job] = []
+        for job in self.jobs:
+            next_run = self.state.entry(job.key).get('next_run')
+            if next_run and datetime.fromisoformat(next_run) <= now and job.in_window(now):
+                due.append(job)
+        due.sort(key=lambda j: j.mode == 'gap_fill')  # regular pulls first
+        return due
+
+    def run_job(self, job: Job, pipeline: Optional['AuthPipeline'] = None) -> bool:
+        """
+        Run one district now; returns True on full success.
+
+        With a pipeline (several due districts), the login was started while
+        the previous district was downloading.
+        """
+        from connectivity import probe_districts
+        from download_niagara_fast import process_district
+
+        entry = self.state.entry(job.key)
+        started = datetime.now()
+        days = job.window_days(entry.get('last_success'), started)
+
+        with district_lock(job.district) as locked:
+            if not locked:
+                logger.warning("%s is already running elsewhere, skipped", job.district)
+                entry['next_run'] = (started + timedelta(seconds=RETRY_AFTER_FAILURE)).isoformat(timespec='seconds')
+                self.state.save(self.state_path)
+                return False
+
+            entry['last_run'] = started.isoformat(timespec='seconds')
+            self.state.save(self.state_path)
+            logger.info("Scheduled run: %s (%s, %d days)", job.district, job.mode, days)
+
+            stats = None
+            probe = probe_districts([job.district])[job.district]
+            cookies = None
+            if not probe.reachable:
+                logger.error("%s unreachable, skipped: %s", job.district, probe.describe())
+            else:
+                if pipeline is not None:
+                    cookies = pipeline.get(job.district)
+                else:
+                    cookies = self.sessions.get(job.district, headless=job.headless)
+                if not cookies:
+                    logger.error("Login failed for %s", job.district)
+            if cookies:
+                try:
+                    stats = process_district(
+                        job.district, days=days, workers=job.workers,
+                        throttle=job.throttle, output_dir=self.output_dir,
+                        headless=job.headless, auto_fetch=job.auto_fetch,
+                        hedge=job.hedge, writers=job.writers,
+                        session_cookies=cookies, upload=job.upload,
+                        postprocess=job.postprocess, gap_fill=job.mode == 'gap_fill',
+                        source='scheduler'
+                    )
+                except Exception:
+                    logger.exception("Scheduled run failed: %s", job.district)
+
+        finished = datetime.now()
+        ok = stats is not None and stats.failed == 0
+        if stats is not None and (stats.errors_by_class.get('auth') or stats.errors_by_class.get('invalid')):
+            self.sessions.drop(job.district)
+
+        entry['last_finished'] = finished.isoformat(timespec='seconds')
+        entry['last_status'] = 'ok' if ok else ('partial' if stats is not None else 'failed')
+        entry['last_summary'] = stats.summary() if stats is not None else ''
+        entry['days'] = days
+        if ok:
+            # Only a complete run moves the incremental window forward
+            entry['last_success'] = started.isoformat(timespec='seconds')
+            entry['failures'] = 0
+            entry['next_run'] = job.next_run(finished).isoformat(timespec='seconds')
+        else:
+            entry['failures'] = entry.get('failures', 0) + 1
+            retry = finished + timedelta(seconds=RETRY_AFTER_FAILURE * min(8, 2 ** (entry['failures'] - 1)))
+            entry['next_run'] = min(retry, job.next_run(finished)).isoformat(timespec='seconds')
+        self.state.save(self.state_path)
+        return ok
+
+    def run_due(self) -> int:
+        """Run every due job once; returns the number run."""
+        due = self.due(datetime.now())
+        if len(due) < 2:
+            for job in due:
+                self.run_job(job)
+            return len(due)
+
+        from auth_pipeline import AuthPipeline
+        from connectivity import probe_districts
+
+        districts = list(dict.fromkeys(job.district for job in due))
+        probes = probe_districts(districts)  # all at once; run_job reads the cache
+        headless = {job.district: job.headless for job in due}
+        with AuthPipeline(
+            [district for district in districts if probes[district].reachable],
+            login=lambda district, _: self.sessions.get(district, headless=headless[district])
+        ) as pipeline:
+            for job in due:
+                self.run_job(job, pipeline)
+        logger.info(pipeline.summary())
+        return len(due)
+
+    def seconds_until_next(self) -> float:
+        """Seconds until the earliest scheduled run (capped at check_interval)."""
+        now = datetime.now()
+        upcoming = [
+            datetime.fromisoformat(self.state.entry(j.key)['next_run'])
+            for j in self.jobs if self.state.entry(j.key).get('next_run')
+        ]
+        if not upcoming:
+            return self.check_interval
+        return max(1.0, min(self.check_interval, (min(upcoming) - now).total_seconds()))
+
+    def run_forever(self) -> None:
+        """Run due jobs until interrupted."""
+        logger.info("Scheduler started with %d districts", len(self.jobs))
+        try:
+            while True:
+                if not self.run_due():
+                    self.sessions.keep_warm()
+                time.sleep(self.seconds_until_next())
+        except KeyboardInterrupt:
+            logger.info("Scheduler stopped")
+        finally:
+            self.state.save(self.state_path)
+
+    def print_status(self) -> None:
+        """Print each district's schedule state."""
+        print_header("SCHEDULE")
+        for job in self.jobs:
+            entry = self.state.entry(job.key)
+            when = job.cron.expression if job.cron else f"every {job.every_text}"
+            safe_print(
+                f"  {job.key:25s} {when:16s} {job.mode:11s} "
+                f"next {entry.get('next_run', '-'):19s}  last {entry.get('last_status', '-')}"
+            )
+            if entry.get('last_summary'):
+                safe_print(f"  {'':25s} {entry['last_summary']}")
+
+
+# ============================================================================
+# CLI
+# ============================================================================
+if __name__ == '__main__':
+    import argparse
+    import sys
+
+    setup_console_encoding()
+
+    parser = argparse.ArgumentParser(description='Niagara Scheduler v2.0')
+    parser.add_argument('--config', type=str, default=str(SCHEDULE_FILE), help='Schedule file')
+    parser.add_argument('--output', type=str, help='Override output directory')
+    parser.add_argument('--once', action='store_true', help='Run due districts, then exit')
+    parser.add_argument('--status', action='store_true', help='Show schedule state')
+    parser.add_argument('--run', type=str, metavar='DISTRICT',
+                        help="Run one district now (DISTRICT:gap_fill for its gap fill job)")
+
+    args = parser.parse_args()
+
+    try:
+        jobs, check_interval = load_schedule(Path(args.config))
+    except ValueError as e:
+        safe_print(f"ERROR: {e}")
+        sys.exit(1)
+
+    scheduler = Scheduler(jobs, check_interval, output_dir=args.output)
+
+    if args.status:
+        scheduler.print_status()
+    elif args.run:
+        job = next((j for j in scheduler.jobs if j.key.upper() == args.run.upper()), None)
+        if job is None:
+            safe_print(f"ERROR: {args.run} is not in the schedule")
+            sys.exit(1)
+        sys.exit(0 if scheduler.run_job(job) else 1)
+    elif args.once:
+        safe_print(f"Ran {scheduler.run_due()} due districts")
+    else:
+        scheduler.run_forever()
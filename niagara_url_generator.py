@@ -18,14 +18,17 @@ USAGE:
 """
 
 import os
-from datetime import datetime
+from datetime import datetime, timedelta
 from pathlib import Path
-from dateutil.relativedelta import relativedelta
-from typing import List, Tuple, Optional, Union
+from typing import TYPE_CHECKING, Dict, List, Tuple, Optional, Sequence, Union
 
-from config_district_details import district_config
+from district_registry import get_district, get_district_names
+from point_list_cache import HistoryMeta, count_points, get_point_list
 from logging_config import get_logger
 
+if TYPE_CHECKING:
+    from point_selection import BuildingIndex, PointSelector
+
 logger = get_logger("url_generator")
 
 # ============================================================================
@@ -35,6 +38,29 @@ SCRIPT_DIR = Path(__file__).parent
 POINT_LISTS_DIR = SCRIPT_DIR / "point_lists"
 POINT_LIST_PREFIX = "pointlist_"
 
+# History space columns fetched with the point list. Everything after `id`
+# is metadata the download planner uses (see point_list_cache.HistoryMeta).
+POINT_LIST_COLUMNS = ('id', 'recordCount', 'firstTimestamp', 'lastTimestamp')
+POINT_LIST_URL_SUFFIX = f"/ord?history:|bql:select%20{','.join(POINT_LIST_COLUMNS)}|view:file:ITableToCsv"
+
+# Rollup downloads: the station aggregates each interval so only one row per
+# interval is transferred. Placeholders: {base_ip} {point} {start} {end}
+# {interval} (e.g. 15m) {interval_ms} {aggregate}. Districts whose stations
+# expect a different form set ROLLUP_URL_TEMPLATE in config_district_details.
+# A station that ignores the rollup parameters answers with raw rows, so
+# every rollup file is checked with RollupSpec.check_spacing() and failed as
+# invalid when its rows are closer together than the interval.
+ROLLUP_URL_TEMPLATE = (
+    '{base_ip}/ord?history:{point}'
+    '?period=timeRange;start={start};end={end}'
+    ';rollup={interval_ms};rollupAggregate={aggregate}'
+    '|bql:select%20timestamp,value|view:file:ITableToCsv'
+)
+ROLLUP_AGGREGATES = ('avg', 'min', 'max', 'last')
+ROLLUP_SUBFOLDER = "rollup"
+INTERVAL_UNITS = {'m': 60, 'h': 3600, 'd': 86400}
+ROLLUP_SPACING_TOLERANCE = 0.9   # median row spacing must reach this share of the interval
+
 
 def get_point_list_path(district_name: str) -> Tuple[Optional[str], str]:
     """
@@ -51,10 +77,10 @@ def get_point_list_path(district_name: str) -> Tuple[Optional[str], str]:
         Tuple of (path_if_exists, source) where source is 'config', 'local', or 'none'
     """
     district = district_name.upper()
-    config = district_config.get(district, {})
+    record = get_district(district)
 
     # Check config path
-    config_path = config.get('TREND_POINT_LIST', '')
+    config_path = record.trend_point_list if record else ''
     if config_path and Path(config_path).exists():
         return config_path, 'config'
 
@@ -70,37 +96,26 @@ def load_point_list(filepath: str) -> List[str]:
     """
     Load points from a point list file.
 
+    Served from point_list_cache: entries are validated and de-duplicated,
+    and the file is only parsed again when it changes.
+
     Args:
         filepath: Path to point list file
 
     Returns:
         List of point paths
     """
-    points: List[str] = []
-
-    with open(filepath, 'r', encoding='utf-8-sig') as f:
-        for line in f:
-            line = line.strip()
-            if not line or line.startswith('#'):
-                continue
-
-            # Handle CSV format (first column is point path)
-            point_path = line.split(',')[0].strip()
-            point_path = point_path.replace('"', '').replace('\n', '')
-
-            if point_path:
-                points.append(point_path)
-
-    return points
+    return list(get_point_list(filepath).points)
 
 
-def format_datetime(dt: Union[datetime, str], tz_offset: str = '-04:00') -> str:
+def format_datetime(dt: Union[datetime, str], tz_offset: str = '-04:00', keep_time: bool = False) -> str:
     """
     Format datetime for Niagara URL.
 
     Args:
         dt: datetime object or string 'YYYY-MM-DD'
         tz_offset: Timezone offset string
+        keep_time: Keep the hour and minute (default: midnight of the day)
 
     Returns:
         Formatted datetime string
@@ -108,23 +123,85 @@ def format_datetime(dt: Union[datetime, str], tz_offset: str = '-04:00') -> str:
     if isinstance(dt, str):
         dt = datetime.strptime(dt, '%Y-%m-%d')
 
+    if keep_time:
+        return dt.replace(second=0, microsecond=0).strftime(f'%Y-%m-%dT%H:%M:%S.000{tz_offset}')
     return dt.replace(minute=0, hour=0, second=0).strftime(
         f'%Y-%m-%dT%H:%M:%S.000{tz_offset}'
     )
 
 
+class RollupSpec:
+    """Rollup interval and aggregate for a download."""
+
+    __slots__ = ('interval', 'seconds', 'aggregate')
+
+    def __init__(self, interval: str, aggregate: str = 'avg') -> None:
+        interval = interval.strip().lower()
+        aggregate = aggregate.strip().lower()
+        try:
+            amount, unit = int(interval[:-1]), interval[-1]
+            seconds = amount * INTERVAL_UNITS[unit]
+        except (ValueError, KeyError, IndexError):
+            raise ValueError(f"Invalid rollup interval '{interval}' (use e.g. 15m, 1h, 1d)")
+        if seconds <= 0:
+            raise ValueError(f"Invalid rollup interval '{interval}'")
+        if aggregate not in ROLLUP_AGGREGATES:
+            raise ValueError(
+                f"Invalid rollup aggregate '{aggregate}' (use {', '.join(ROLLUP_AGGREGATES)})"
+            )
+        self.interval = interval
+        self.seconds = seconds
+        self.aggregate = aggregate
+
+    @classmethod
+    def parse(cls, spec: str) -> 'RollupSpec':
+        """Parse 'INTERVAL[:AGGREGATE]', e.g. '15m:avg' or '1h'."""
+        interval, _, aggregate = spec.partition(':')
+        return cls(interval, aggregate or 'avg')
+
+    def check_spacing(self, content: bytes) -> Optional[str]:
+        """
+        Check that a downloaded file really is rolled up to this interval.
+
+        Args:
+            content: Downloaded CSV
+
+        Returns:
+            Reason the file is not a rollup, or None if it is (or has too
+            few rows to tell)
+        """
+        from post_process import parse_trend_csv
+
+        timestamps = sorted(set(parse_trend_csv(content)[0]))
+        if len(timestamps) < 3:
+            return None
+        steps = sorted(b - a for a, b in zip(timestamps, timestamps[1:]))
+        median = steps[len(steps) // 2]
+        if median < self.seconds * ROLLUP_SPACING_TOLERANCE:
+            return f"Rows every {median:.0f}s, not rolled up to {self.interval}"
+        return None
+
+    @property
+    def resolution(self) -> str:
+        """Resolution tag used for folder names, e.g. '15m_avg'."""
+        return f"{self.interval}_{self.aggregate}"
+
+    def __repr__(self) -> str:
+        return f"RollupSpec({self.interval!r}, {self.aggregate!r})"
+
+
 class URLGenerator:
     """Generate download URLs for Niagara BAS trend data."""
 
     def __init__(self, district_name: str) -> None:
         self.district = district_name.upper()
-        self.config = district_config.get(self.district)
+        self.record = get_district(self.district)
 
-        if not self.config:
+        if not self.record:
             raise ValueError(f"District '{self.district}' not found in config")
 
-        self.base_ip = self.config.get('BASE_IP', '')
-        if not self.base_ip or self.base_ip.lower() in ('na', 'n/a', ''):
+        self.base_ip = self.record.base_ip
+        if not self.record.has_base_ip:
             raise ValueError(f"No BASE_IP configured for {self.district}")
 
         self.point_list_path, self.point_list_source = get_point_list_path(self.district)
@@ -143,13 +220,36 @@ class URLGenerator:
         """Number of points in list."""
         return len(self.points)
 
+    def building_index(self) -> 'BuildingIndex':
+        """Building index for this district's point list (built once per list)."""
+        from point_selection import get_building_index
+        return get_building_index(self._cached_points(), self.record.building_dictionary)
+
+    def select_points(self, selector: 'PointSelector') -> List[str]:
+        """Points matching a building/pattern selector, in point list order."""
+        return selector.select(self._cached_points(), self.record.building_dictionary)
+
+    def _cached_points(self) -> Sequence[str]:
+        """Shared point tuple from the point list cache (stable for indexing)."""
+        if not self.point_list_path:
+            return ()
+        return get_point_list(self.point_list_path).points
+
+    @property
+    def metadata(self) -> Dict[str, HistoryMeta]:
+        """History metadata per point (empty if the list was fetched id-only)."""
+        if not self.point_list_path:
+            return {}
+        return get_point_list(self.point_list_path).metadata()
+
     @property
     def output_folder(self) -> str:
         """Get configured output folder for this district."""
-        return self.config.get(
-            'FOLDER_LOCATION_TREND_DATA',
-            str(SCRIPT_DIR / 'output' / self.district)
-        )
+        return self.record.trend_folder or str(SCRIPT_DIR / 'output' / self.district)
+
+    def rollup_folder(self, rollup: RollupSpec, output_folder: Optional[str] = None) -> str:
+        """Output folder for rollup data, kept apart from raw downloads."""
+        return os.path.join(output_folder or self.output_folder, ROLLUP_SUBFOLDER, rollup.resolution)
 
     def _build_url(self, point_path: str, start_time: str, end_time: str) -> str:
         """Build download URL for a single point."""
@@ -159,12 +259,26 @@ class URLGenerator:
             f'|bql:select%20timestamp,value|view:file:ITableToCsv'
         )
 
+    def _build_rollup_url(self, point_path: str, start_time: str, end_time: str, rollup: RollupSpec) -> str:
+        """Build rollup download URL for a single point."""
+        template = self.record.rollup_url_template or ROLLUP_URL_TEMPLATE
+        try:
+            return template.format(
+                base_ip=self.base_ip, point=point_path, start=start_time, end=end_time,
+                interval=rollup.interval, interval_ms=rollup.seconds * 1000,
+                aggregate=rollup.aggregate
+            )
+        except (KeyError, IndexError) as e:
+            raise ValueError(f"Invalid ROLLUP_URL_TEMPLATE for {self.district}: unknown placeholder {e}")
+
     def generate(
         self,
         days: Optional[int] = None,
         start_date: Optional[Union[str, datetime]] = None,
         end_date: Optional[Union[str, datetime]] = None,
-        tz_offset: str = '-04:00'
+        tz_offset: str = '-04:00',
+        points: Optional[Sequence[str]] = None,
+        rollup: Optional[RollupSpec] = None
     ) -> List[Tuple[str, str]]:
         """
         Generate list of (point_path, url) tuples.
@@ -174,6 +288,8 @@ class URLGenerator:
             start_date: Start date (YYYY-MM-DD string or datetime)
             end_date: End date (YYYY-MM-DD string or datetime)
             tz_offset: Timezone offset for URL
+            points: Subset of points to generate (default: whole point list)
+            rollup: Download station-side rollups instead of raw records
 
         Returns:
             List of (point_path, url) tuples
@@ -186,7 +302,7 @@ class URLGenerator:
 
         if days is not None:
             end_dt = datetime.today()
-            start_dt = end_dt - relativedelta(days=days)
+            start_dt = end_dt - timedelta(days=days)
         elif start_date and end_date:
             start_dt = start_date if isinstance(start_date, datetime) else datetime.strptime(start_date, '%Y-%m-%d')
             end_dt = end_date if isinstance(end_date, datetime) else datetime.strptime(end_date, '%Y-%m-%d')
@@ -197,15 +313,45 @@ class URLGenerator:
         end_time = format_datetime(end_dt, tz_offset)
 
         urls: List[Tuple[str, str]] = []
-        for point_path in self.points:
-            url = self._build_url(point_path, start_time, end_time)
+        for point_path in (self.points if points is None else points):
+            if rollup is None:
+                url = self._build_url(point_path, start_time, end_time)
+            else:
+                url = self._build_rollup_url(point_path, start_time, end_time, rollup)
             urls.append((point_path, url))
 
         return urls
 
+    def generate_ranges(
+        self,
+        ranges: Sequence[Tuple[str, datetime, datetime]],
+        tz_offset: str = '-04:00'
+    ) -> List[Tuple[str, str]]:
+        """
+        Generate (point_path, url) tuples for individual time ranges.
+
+        Unlike generate(), the times keep their hour and minute, so a
+        request can cover just part of a day (e.g. a gap in coverage).
+
+        Args:
+            ranges: (point_path, start, end) per request
+            tz_offset: Timezone offset for URL
+
+        Returns:
+            List of (point_path, url) tuples
+        """
+        return [
+            (point_path, self._build_url(
+                point_path,
+                format_datetime(start, tz_offset, keep_time=True),
+                format_datetime(end, tz_offset, keep_time=True)
+            ))
+            for point_path, start, end in ranges
+        ]
+
     def get_point_list_url(self) -> str:
         """Get URL to fetch point list from Niagara."""
-        return f"{self.base_ip.rstrip('/')}/ord?history:|bql:select%20id|view:file:ITableToCsv"
+        return f"{self.base_ip.rstrip('/')}{POINT_LIST_URL_SUFFIX}"
 
     def info(self) -> dict:
         """Get information about this generator."""
@@ -221,7 +367,7 @@ class URLGenerator:
 
 def get_available_districts() -> List[str]:
     """Get list of all configured districts."""
-    return sorted(district_config.keys())
+    return get_district_names()
 
 
 def get_districts_with_pointlists() -> List[str]:
@@ -245,9 +391,8 @@ def get_districts_missing_pointlists() -> List[Tuple[str, bool]]:
     for district in get_available_districts():
         path, source = get_point_list_path(district)
         if not path:
-            config = district_config.get(district, {})
-            base_ip = config.get('BASE_IP', '')
-            has_ip = bool(base_ip and base_ip.lower() not in ('na', 'n/a', ''))
+            record = get_district(district)
+            has_ip = bool(record and record.has_base_ip)
             missing.append((district, has_ip))
     return missing
 
@@ -270,8 +415,7 @@ if __name__ == '__main__':
         print("\nDistricts with point lists:")
         for d in get_districts_with_pointlists():
             path, _ = get_point_list_path(d)
-            points = load_point_list(path) if path else []
-            print(f"  {d}: {len(points)} points")
+            print(f"  {d}: {count_points(path) if path else 0} points")
 
         print("\nDistricts missing point lists:")
         for d, has_ip in get_districts_missing_pointlists():
@@ -293,8 +437,7 @@ if __name__ == '__main__':
     elif args.count:
         path, source = get_point_list_path(args.count)
         if path:
-            points = load_point_list(path)
-            print(f"{args.count.upper()}: {len(points)} points ({source})")
+            print(f"{args.count.upper()}: {count_points(path)} points ({source})")
         else:
             print(f"{args.count.upper()}: No point list found")
 
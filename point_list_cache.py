@@ -0,0 +1,429 @@
+"""
+================================================================================
+NIAGARA POINT LIST CACHE v2.0
+================================================================================
+Parse-once cache for point list files.
+
+Each point list is parsed a single time: entries are validated (HTML login
+pages and other garbage saved in place of a CSV are rejected), de-duplicated
+in file order, and stored as a marshalled snapshot keyed by the source
+file's mtime/size and SHA-1. Later loads in any process read the snapshot;
+repeat lookups in the same process cost one os.stat().
+
+Lists fetched with history metadata (recordCount, firstTimestamp,
+lastTimestamp columns) keep it per point as HistoryMeta; id-only lists
+still load, with no metadata.
+
+USAGE:
+    from point_list_cache import get_point_list, count_points
+
+    plist = get_point_list('point_lists/pointlist_WINDHAMSCHOOLSNH.txt')
+    print(plist.count, plist.rejected)
+================================================================================
+"""
+
+import csv
+import hashlib
+import marshal
+import os
+import re
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from utils import CACHE_DIR
+from logging_config import get_logger
+
+logger = get_logger("point_cache")
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+SNAPSHOT_DIR = CACHE_DIR / "point_lists"
+SNAPSHOT_VERSION = 2
+
+# A history id is /<station>/<history name>; Niagara escapes spaces and
+# punctuation ($20, $2d, ...) so a valid id never contains whitespace,
+# quotes or markup characters.
+VALID_POINT_RE = re.compile(r'^/[^/\s<>"\']+/[^\s<>"\']+$')
+HTML_MARKERS = (b'<html', b'<!doctype', b'<head', b'<body')
+
+# Metadata columns by normalised header name (lower case, no spaces/underscores)
+META_COLUMNS = ('recordcount', 'firsttimestamp', 'lasttimestamp')
+
+# Display formats Niagara may use for BAbsTime in CSV exports (after the
+# time zone abbreviation is stripped); ISO 8601 is tried first.
+TIMESTAMP_FORMATS = (
+    '%d-%b-%y %I:%M:%S %p',
+    '%d-%b-%y %I:%M %p',
+    '%d-%b-%Y %I:%M:%S %p',
+    '%Y-%m-%d %H:%M:%S',
+    '%m/%d/%Y %I:%M:%S %p',
+)
+
+
+# ============================================================================
+# HISTORY METADATA
+# ============================================================================
+def parse_niagara_timestamp(text: str) -> float:
+    """
+    Parse a Niagara timestamp to epoch seconds.
+
+    Args:
+        text: ISO 8601 or Niagara display format (e.g. '17-Oct-26 2:15:00 PM EDT')
+
+    Returns:
+        Epoch seconds, or 0.0 if empty or unparseable
+    """
+    text = text.strip()
+    if not text or text.lower() == 'null':
+        return 0.0
+    try:
+        return datetime.fromisoformat(text).timestamp()
+    except ValueError:
+        pass
+
+    parts = text.rsplit(' ', 1)
+    if len(parts) == 2 and parts[1].isalpha() and parts[1].upper() not in ('AM', 'PM'):
+        text = parts[0]  # zone abbreviation: treat as local time
+    for fmt in TIMESTAMP_FORMATS:
+        try:
+            return datetime.strptime(text, fmt).timestamp()
+        except ValueError:
+            continue
+    return 0.0
+
+
+def _parse_count(text: str) -> int:
+    """Parse a record count ('1,234' allowed); -1 if unknown."""
+    try:
+        return int(text.replace(',', '').strip())
+    except ValueError:
+        return -1
+
+
+class HistoryMeta:
+    """History metadata from an enriched point list fetch."""
+
+    __slots__ = ('record_count', 'first_ts', 'last_ts')
+
+    def __init__(self, record_count: int = -1, first_ts: float = 0.0, last_ts: float = 0.0) -> None:
+        self.record_count = record_count  # -1 = unknown
+        self.first_ts = first_ts          # epoch seconds, 0.0 = unknown
+        self.last_ts = last_ts
+
+    @property
+    def interval(self) -> Optional[float]:
+        """Estimated collection interval in seconds (None if unknown)."""
+        if self.record_count > 1 and self.first_ts and self.last_ts > self.first_ts:
+            return (self.last_ts - self.first_ts) / (self.record_count - 1)
+        return None
+
+    def estimate_records(self, start_ts: float, end_ts: float, live: bool = False) -> Optional[float]:
+        """
+        Estimated records between two epoch times.
+
+        Args:
+            start_ts: Window start (epoch seconds)
+            end_ts: Window end (epoch seconds)
+            live: History is still collecting past last_ts
+
+        Returns:
+            Record estimate, or None if the interval is unknown
+        """
+        if self.record_count == 0:
+            return 0.0
+        interval = self.interval
+        if interval is None:
+            return None
+        last_ts = end_ts if live else min(end_ts, self.last_ts)
+        overlap = last_ts - max(start_ts, self.first_ts)
+        return max(overlap, 0.0) / interval
+
+    def __repr__(self) -> str:
+        return f"HistoryMeta({self.record_count}, {self.first_ts}, {self.last_ts})"
+
+
+# ============================================================================
+# POINT LIST
+# ============================================================================
+class PointList:
+    """Validated, de-duplicated contents of one point list file."""
+
+    __slots__ = ('path', 'points', 'header', 'rejected', 'duplicates', 'sha1', 'is_html', 'meta')
+
+    def __init__(
+        self,
+        path: str,
+        points: Tuple[str, ...],
+        header: Tuple[str, ...] = (),
+        rejected: int = 0,
+        duplicates: int = 0,
+        sha1: str = '',
+        is_html: bool = False,
+        meta: Tuple[Tuple[int, float, float], ...] = ()
+    ) -> None:
+        self.path = path
+        self.points = points
+        self.header = header
+        self.rejected = rejected
+        self.duplicates = duplicates
+        self.sha1 = sha1
+        self.is_html = is_html
+        self.meta = meta  # (record_count, first_ts, last_ts) per point, or ()
+
+    @property
+    def count(self) -> int:
+        """Number of valid points."""
+        return len(self.points)
+
+    @property
+    def has_metadata(self) -> bool:
+        """True if the list was fetched with history metadata columns."""
+        return bool(self.meta)
+
+    def metadata(self) -> Dict[str, HistoryMeta]:
+        """Map point path to HistoryMeta (points with blank metadata are left out)."""
+        return {
+            p: HistoryMeta(*m) for p, m in zip(self.points, self.meta)
+            if m[0] >= 0 or m[2]
+        }
+
+    def to_snapshot(self) -> tuple:
+        return (
+            self.points, self.header, self.rejected, self.duplicates,
+            self.sha1, self.is_html, self.meta
+        )
+
+    @classmethod
+    def from_snapshot(cls, path: str, data: tuple) -> 'PointList':
+        return cls(path, *data)
+
+
+def _split_csv_line(line: str) -> List[str]:
+    """Split a point list line into unquoted columns."""
+    if '"' in line:
+        return [col.strip() for col in next(csv.reader([line]))]
+    return [col.strip() for col in line.split(',')]
+
+
+def _meta_indexes(header: Tuple[str, ...]) -> Optional[Tuple[int, int, int]]:
+    """Column indexes of the metadata columns, or None if any is missing."""
+    normalised = [h.replace(' ', '').replace('_', '').lower() for h in header]
+    try:
+        return tuple(normalised.index(name) for name in META_COLUMNS)
+    except ValueError:
+        return None
+
+
+def parse_point_list(path: str, raw: bytes) -> PointList:
+    """
+    Parse and validate point list content.
+
+    Args:
+        path: Source path
+        raw: File content
+
+    Returns:
+        PointList with valid, de-duplicated points in file order
+    """
+    text = raw.decode('utf-8-sig', errors='replace')
+    head = raw[:2048].lower()
+    is_html = any(marker in head for marker in HTML_MARKERS)
+
+    points: List[str] = []
+    seen = set()
+    header: Tuple[str, ...] = ()
+    meta_idx: Optional[Tuple[int, int, int]] = None
+    meta: List[Tuple[int, float, float]] = []
+    rejected = duplicates = 0
+
+    for line in text.splitlines():
+        line = line.strip()
+        if not line or line.startswith('#'):
+            continue
+
+        columns = _split_csv_line(line)
+        point_path = columns[0]
+
+        if not header and not points and not rejected and not point_path.startswith('/'):
+            # First row of an ITableToCsv export: "Id" or "id,recordCount,..."
+            if point_path.lower() == 'id':
+                header = tuple(columns)
+                meta_idx = _meta_indexes(header)
+                continue
+
+        if not VALID_POINT_RE.match(point_path):
+            rejected += 1
+            continue
+
+        if point_path in seen:
+            duplicates += 1
+            continue
+
+        seen.add(point_path)
+        points.append(point_path)
+
+        if meta_idx is not None:
+            count_i, first_i, last_i = meta_idx
+            width = len(columns)
+            meta.append((
+                _parse_count(columns[count_i]) if count_i < width else -1,
+                parse_niagara_timestamp(columns[first_i]) if first_i < width else 0.0,
+                parse_niagara_timestamp(columns[last_i]) if last_i < width else 0.0,
+            ))
+
+    if is_html and points:
+        is_html = False  # markup fragment inside an otherwise valid list
+
+    return PointList(
+        path, tuple(points), header, rejected, duplicates,
+        hashlib.sha1(raw).hexdigest(), is_html, tuple(meta)
+    )
+
+
+def _report(plist: PointList) -> None:
+    """Log what validation dropped from a freshly parsed list."""
+    name = os.path.basename(plist.path)
+    if plist.is_html:
+        logger.warning("%s is an HTML page, not a point list (expired session or login page?)", name)
+    elif plist.rejected:
+        logger.warning("%s: rejected %d invalid entries", name, plist.rejected)
+    if plist.duplicates:
+        logger.info("%s: dropped %d duplicate entries", name, plist.duplicates)
+
+
+# ============================================================================
+# SNAPSHOTS
+# ============================================================================
+def _snapshot_path(path: str) -> Path:
+    """Snapshot file for a point list (unique per absolute source path)."""
+    digest = hashlib.sha1(path.encode('utf-8')).hexdigest()[:12]
+    return SNAPSHOT_DIR / f"{Path(path).stem}-{digest}.snap"
+
+
+def _load_snapshot(path: str) -> Optional[Tuple[Tuple[int, int], tuple]]:
+    """Return ((mtime_ns, size), data) from a snapshot, or None."""
+    try:
+        with open(_snapshot_path(path), 'rb') as f:
+            version, stat_key, data = marshal.loads(f.read())
+    except FileNotFoundError:
+        return None
+    except (OSError, EOFError, ValueError, TypeError):
+        logger.debug("Corrupt point list snapshot for %s", path)
+        return None
+    if version != SNAPSHOT_VERSION:
+        return None
+    return stat_key, data
+
+
+def _save_snapshot(path: str, stat_key: Tuple[int, int], plist: PointList) -> None:
+    """Write a snapshot atomically; failures only cost a re-parse later."""
+    snap_path = _snapshot_path(path)
+    try:
+        snap_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = snap_path.with_suffix(f'.{os.getpid()}.tmp')
+        with open(tmp_path, 'wb') as f:
+            marshal.dump((SNAPSHOT_VERSION, stat_key, plist.to_snapshot()), f)
+        os.replace(tmp_path, snap_path)
+    except OSError as e:
+        logger.debug("Could not write point list snapshot: %s", e)
+
+
+# ============================================================================
+# CACHE
+# ============================================================================
+_lock = threading.Lock()
+_memo: Dict[str, Tuple[Tuple[int, int], PointList]] = {}
+
+
+def get_point_list(filepath: str) -> PointList:
+    """
+    Get the parsed point list for a file.
+
+    Checks, in order: the in-process memo, the on-disk snapshot (by mtime and
+    size, then by content hash), and finally parses the file.
+
+    Args:
+        filepath: Path to point list file
+
+    Returns:
+        PointList
+
+    Raises:
+        OSError: If the file cannot be read
+    """
+    path = os.path.abspath(filepath)
+    st = os.stat(path)
+    stat_key = (st.st_mtime_ns, st.st_size)
+
+    cached = _memo.get(path)
+    if cached is not None and cached[0] == stat_key:
+        return cached[1]
+
+    with _lock:
+        cached = _memo.get(path)
+        if cached is not None and cached[0] == stat_key:
+            return cached[1]
+
+        plist: Optional[PointList] = None
+        snapshot = _load_snapshot(path)
+        if snapshot is not None and tuple(snapshot[0]) == stat_key:
+            plist = PointList.from_snapshot(path, snapshot[1])
+        else:
+            with open(path, 'rb') as f:
+                raw = f.read()
+            if snapshot is not None and snapshot[1][4] == hashlib.sha1(raw).hexdigest():
+                # Touched or copied but unchanged: reuse the parse
+                plist = PointList.from_snapshot(path, snapshot[1])
+            else:
+                plist = parse_point_list(path, raw)
+                _report(plist)
+            _save_snapshot(path, stat_key, plist)
+
+        _memo[path] = (stat_key, plist)
+        return plist
+
+
+def count_points(filepath: str) -> int:
+    """Number of valid points in a file (0 if it cannot be read)."""
+    try:
+        return get_point_list(filepath).count
+    except OSError:
+        return 0
+
+
+def invalidate(filepath: Optional[str] = None) -> None:
+    """Forget memoised lists (one file, or all when filepath is None)."""
+    with _lock:
+        if filepath is None:
+            _memo.clear()
+        else:
+            _memo.pop(os.path.abspath(filepath), None)
+
+
+# ============================================================================
+# CLI
+# ============================================================================
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Point List Cache v2.0')
+    parser.add_argument('files', nargs='+', help='Point list file(s)')
+
+    args = parser.parse_args()
+
+    for fp in args.files:
+        try:
+            pl = get_point_list(fp)
+        except OSError as e:
+            print(f"{fp}: {e}")
+            continue
+        note = "  HTML page, not a point list" if pl.is_html else ""
+        if pl.has_metadata:
+            note += f"  (metadata: {sum(1 for m in pl.meta if m[0] >= 0)} with record counts)"
+        print(
+            f"{os.path.basename(fp)}: {pl.count} points, {pl.rejected} rejected, "
+            f"{pl.duplicates} duplicates{note}"
+        )
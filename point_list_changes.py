@@ -0,0 +1,254 @@
+"""
+================================================================================
+NIAGARA POINT LIST CHANGES v2.0
+================================================================================
+Diffs fetched point lists against the previous version and keeps a
+per-district changelog.
+
+Every re-fetch records which histories were added, removed or renamed
+(same history name under a different station). New and renamed histories
+are queued for backfill: the downloader fetches them over a long window
+once, while unchanged points keep using the normal incremental window.
+
+State lives next to the point list: point_lists/changes_{DISTRICT}.json
+
+USAGE:
+    from point_list_changes import record_changes, get_pending_backfill
+
+    diff = record_changes('WINDHAMSCHOOLSNH', old_points, new_points)
+    print(diff.summary())
+================================================================================
+"""
+
+import json
+import os
+from dataclasses import dataclass, field, asdict
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from logging_config import get_logger
+
+logger = get_logger("pointlist_changes")
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+SCRIPT_DIR = Path(__file__).parent
+CHANGES_DIR = SCRIPT_DIR / "point_lists"
+CHANGES_PREFIX = "changes_"
+MAX_HISTORY = 50  # changelog entries kept per district
+
+
+# ============================================================================
+# DIFF
+# ============================================================================
+@dataclass
+class PointListDiff:
+    """Differences between two versions of a point list."""
+    added: List[str] = field(default_factory=list)
+    removed: List[str] = field(default_factory=list)
+    renamed: List[Tuple[str, str]] = field(default_factory=list)
+
+    @property
+    def is_empty(self) -> bool:
+        return not (self.added or self.removed or self.renamed)
+
+    @property
+    def needs_backfill(self) -> List[str]:
+        """Points with no history downloaded under their current id."""
+        return self.added + [new for _, new in self.renamed]
+
+    def summary(self) -> str:
+        return f"+{len(self.added)} added, -{len(self.removed)} removed, ~{len(self.renamed)} renamed"
+
+
+def _history_name(point_path: str) -> str:
+    """History name without the station: '/Station/AHU1$2dSAT' -> 'ahu1$2dsat'."""
+    return point_path.rsplit('/', 1)[-1].lower()
+
+
+def diff_point_lists(old: Sequence[str], new: Sequence[str]) -> PointListDiff:
+    """
+    Compare two point lists.
+
+    A removed and an added point are treated as a rename when they share a
+    history name and that name is unambiguous on both sides (e.g. a station
+    renamed from _01 to _02).
+
+    Args:
+        old: Previous point paths
+        new: Fetched point paths
+
+    Returns:
+        PointListDiff with entries in list order
+    """
+    old_set = set(old)
+    new_set = set(new)
+    removed = [p for p in old if p not in new_set]
+    added = [p for p in new if p not in old_set]
+
+    if not removed or not added:
+        return PointListDiff(added=added, removed=removed)
+
+    def by_name(points: List[str]) -> Dict[str, Optional[str]]:
+        index: Dict[str, Optional[str]] = {}
+        for p in points:
+            name = _history_name(p)
+            index[name] = None if name in index else p  # None marks ambiguous
+        return index
+
+    removed_by_name = by_name(removed)
+    added_by_name = by_name(added)
+
+    renamed: List[Tuple[str, str]] = []
+    for name, old_path in removed_by_name.items():
+        new_path = added_by_name.get(name)
+        if old_path and new_path:
+            renamed.append((old_path, new_path))
+
+    if renamed:
+        renamed_old = {o for o, _ in renamed}
+        renamed_new = {n for _, n in renamed}
+        removed = [p for p in removed if p not in renamed_old]
+        added = [p for p in added if p not in renamed_new]
+
+    return PointListDiff(added=added, removed=removed, renamed=renamed)
+
+
+# ============================================================================
+# CHANGELOG
+# ============================================================================
+@dataclass
+class PointListChanges:
+    """Persistent per-district changelog and backfill queue."""
+    district: str = ""
+    history: List[Dict] = field(default_factory=list)
+    pending_backfill: Dict[str, str] = field(default_factory=dict)  # point -> detected at
+
+    def save(self, path: Path) -> None:
+        """Save changelog to JSON file."""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix('.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump(asdict(self), f, indent=2)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: Path) -> Optional['PointListChanges']:
+        """Load changelog from JSON file."""
+        if not path.exists():
+            return None
+        try:
+            with open(path) as f:
+                data = json.load(f)
+            return cls(**data)
+        except (json.JSONDecodeError, TypeError, KeyError):
+            logger.warning("Corrupt changelog: %s", path)
+            return None
+
+
+def get_changes_path(district_name: str) -> Path:
+    """Changelog path for a district."""
+    return CHANGES_DIR / f"{CHANGES_PREFIX}{district_name.upper()}.json"
+
+
+def load_changes(district_name: str) -> PointListChanges:
+    """Load a district's changelog (empty if none recorded yet)."""
+    district = district_name.upper()
+    return PointListChanges.load(get_changes_path(district)) or PointListChanges(district=district)
+
+
+def record_changes(
+    district_name: str,
+    old_points: Sequence[str],
+    new_points: Sequence[str]
+) -> PointListDiff:
+    """
+    Diff a fetched point list against the previous one and log the result.
+
+    Added and renamed points are queued for backfill; removed points leave
+    the queue. Nothing is recorded when the lists are identical.
+
+    Args:
+        district_name: District name
+        old_points: Points in the list being replaced
+        new_points: Points in the fetched list
+
+    Returns:
+        PointListDiff
+    """
+    diff = diff_point_lists(old_points, new_points)
+    if diff.is_empty:
+        return diff
+
+    changes = load_changes(district_name)
+    now = datetime.now().isoformat(timespec='seconds')
+
+    changes.history.append({
+        'time': now,
+        'old_count': len(old_points),
+        'new_count': len(new_points),
+        'added': diff.added,
+        'removed': diff.removed,
+        'renamed': [list(pair) for pair in diff.renamed],
+    })
+    del changes.history[:-MAX_HISTORY]
+
+    for point in diff.removed + [old for old, _ in diff.renamed]:
+        changes.pending_backfill.pop(point, None)
+    for point in diff.needs_backfill:
+        changes.pending_backfill.setdefault(point, now)
+
+    changes.save(get_changes_path(district_name))
+    logger.info("%s point list changed: %s", changes.district, diff.summary())
+    return diff
+
+
+def get_pending_backfill(district_name: str) -> Dict[str, str]:
+    """Points waiting for a full backfill (point -> detected at)."""
+    return load_changes(district_name).pending_backfill
+
+
+def mark_backfilled(district_name: str, points: Sequence[str]) -> int:
+    """
+    Remove points from the backfill queue.
+
+    Args:
+        district_name: District name
+        points: Points whose backfill completed
+
+    Returns:
+        Number of points removed from the queue
+    """
+    changes = load_changes(district_name)
+    done = [p for p in points if p in changes.pending_backfill]
+    if not done:
+        return 0
+    for point in done:
+        del changes.pending_backfill[point]
+    changes.save(get_changes_path(district_name))
+    return len(done)
+
+
+# ============================================================================
+# CLI
+# ============================================================================
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Point List Changes v2.0')
+    parser.add_argument('--district', type=str, required=True, help='District name')
+    parser.add_argument('--last', type=int, default=5, help='Changelog entries to show')
+
+    args = parser.parse_args()
+
+    changes = load_changes(args.district)
+    if not changes.history:
+        print(f"No point list changes recorded for {changes.district}")
+    for entry in changes.history[-args.last:]:
+        print(
+            f"{entry['time']}  {entry['old_count']} -> {entry['new_count']}  "
+            f"+{len(entry['added'])} -{len(entry['removed'])} ~{len(entry['renamed'])}"
+        )
+    print(f"Pending backfill: {len(changes.pending_backfill)} points")
@@ -0,0 +1,310 @@
+"""
+================================================================================
+NIAGARA POINT SELECTION v2.0
+================================================================================
+Selects a subset of a district's points by building, by include/exclude
+patterns and by exact point path, for targeted re-pulls.
+
+Buildings come from the district's BUILDING_DICTIONARY: a point's station
+(the first path segment, e.g. /JC01_GoldenBrook_01/) belongs to the building
+whose dictionary key is the longest one contained in the normalised station
+name (upper case, letters and digits only).
+
+Patterns are shell globs matched against the full point path, or regular
+expressions (searched anywhere in the path) when prefixed with 're:'.
+Both are case-insensitive.
+
+The building index (point positions per building) is built once per point
+list and building dictionary, so selecting buildings does no per-point work;
+all include patterns, and all exclude patterns, are compiled into one
+regular expression each.
+
+USAGE:
+    from point_selection import PointSelector
+
+    selector = PointSelector(buildings=['GOLDENBROOK'], exclude=['*Alarm*'])
+    urls = url_gen.generate(days=7, points=url_gen.select_points(selector))
+================================================================================
+"""
+
+import fnmatch
+import re
+from typing import Dict, List, Optional, Pattern, Sequence, Tuple
+
+from logging_config import get_logger
+
+logger = get_logger("selection")
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+REGEX_PREFIX = "re:"
+UNASSIGNED = ""  # building of stations that match no dictionary key
+MAX_CACHED_INDEXES = 16
+
+
+def normalise(name: str) -> str:
+    """Upper case, letters and digits only: 'JC01_GoldenBrook_01' -> 'JC01GOLDENBROOK01'."""
+    return ''.join(ch for ch in name.upper() if ch.isalnum())
+
+
+def station_of(point_path: str) -> str:
+    """Station segment of a point path: '/Station/History' -> 'Station'."""
+    return point_path[1:].split('/', 1)[0]
+
+
+# ============================================================================
+# BUILDING INDEX
+# ============================================================================
+class BuildingIndex:
+    """Building lookup for one point list, built once."""
+
+    __slots__ = ('building_of_station', 'positions', 'aliases')
+
+    def __init__(self, points: Sequence[str], building_dictionary: Dict[str, str]) -> None:
+        # Longest key first so 'WINDHAMMIDDLE' wins over 'WINDHAM'
+        keys: List[Tuple[str, str]] = sorted(
+            ((normalise(k), v.upper()) for k, v in building_dictionary.items() if normalise(k)),
+            key=lambda kv: -len(kv[0])
+        )
+
+        self.building_of_station: Dict[str, str] = {}
+        self.positions: Dict[str, List[int]] = {}  # building -> point indexes
+        self.aliases: Dict[str, str] = {k.upper(): v.upper() for k, v in building_dictionary.items()}
+
+        for i, point_path in enumerate(points):
+            station = station_of(point_path)
+            building = self.building_of_station.get(station)
+            if building is None:
+                normalised = normalise(station)
+                building = next((b for k, b in keys if k in normalised), UNASSIGNED)
+                self.building_of_station[station] = building
+            self.positions.setdefault(building, []).append(i)
+
+    def resolve(self, building: str) -> str:
+        """Building name for a name or BUILDING_DICTIONARY key."""
+        building = building.strip().upper()
+        return building if building in self.positions else self.aliases.get(building, building)
+
+    def building_of(self, point_path: str) -> str:
+        """Building of a point ('' if its station matches no key)."""
+        return self.building_of_station.get(station_of(point_path), UNASSIGNED)
+
+    def buildings(self) -> List[str]:
+        """Buildings present in the point list (sorted, unassigned last)."""
+        return sorted(self.positions, key=lambda b: (b == UNASSIGNED, b))
+
+    def stations(self, building: str) -> List[str]:
+        """Stations assigned to a building."""
+        return sorted(s for s, b in self.building_of_station.items() if b == building)
+
+
+_index_cache: Dict[Tuple[int, Tuple[Tuple[str, str], ...]], Tuple[Sequence[str], BuildingIndex]] = {}
+
+
+def get_building_index(points: Sequence[str], building_dictionary: Dict[str, str]) -> BuildingIndex:
+    """
+    Get the building index for a point list, building it on first use.
+
+    Pass the point tuple from point_list_cache so repeat calls for the same
+    list reuse the index.
+
+    Args:
+        points: Point paths
+        building_dictionary: District BUILDING_DICTIONARY
+
+    Returns:
+        BuildingIndex
+    """
+    key = (id(points), tuple(sorted(building_dictionary.items())))
+    cached = _index_cache.get(key)
+    if cached is not None and cached[0] is points:
+        return cached[1]
+    index = BuildingIndex(points, building_dictionary)
+    if len(_index_cache) >= MAX_CACHED_INDEXES:
+        _index_cache.clear()  # old point list versions
+    _index_cache[key] = (points, index)  # holding points keeps id() unique
+    return index
+
+
+# ============================================================================
+# PATTERNS
+# ============================================================================
+def glob_to_regex(pattern: str) -> str:
+    """
+    Translate a glob for re.search.
+
+    Leading and trailing '*' become unanchored ends instead of '.*', which
+    keeps the common '*Name*' form a plain substring search.
+    """
+    core = pattern.strip('*')
+    expr = fnmatch.translate(core) if core else '(?s:)'
+    if expr.endswith('\\Z'):
+        expr = expr[:-2]
+    head = '' if pattern.startswith('*') else '^'
+    tail = '' if pattern.endswith('*') else '\\Z'
+    return f'{head}{expr}{tail}'
+
+
+def compile_patterns(patterns: Sequence[str]) -> Optional[Pattern[str]]:
+    """
+    Compile globs and 're:' regexes into one case-insensitive expression.
+
+    Args:
+        patterns: Patterns, e.g. ['*ZoneTemp*', 're:AHU\\d+']
+
+    Returns:
+        Compiled pattern, or None if there are no patterns
+
+    Raises:
+        ValueError: If a regular expression is invalid
+    """
+    parts: List[str] = []
+    for pattern in patterns:
+        pattern = pattern.strip()
+        if not pattern:
+            continue
+        if pattern.startswith(REGEX_PREFIX):
+            expr = pattern[len(REGEX_PREFIX):]
+            try:
+                re.compile(expr)
+            except re.error as e:
+                raise ValueError(f"Invalid regex '{expr}': {e}")
+            parts.append(f'(?:{expr})')  # searched anywhere in the path
+        else:
+            parts.append(f'(?:{glob_to_regex(pattern)})')
+    if not parts:
+        return None
+    return re.compile('|'.join(parts), re.IGNORECASE)
+
+
+# ============================================================================
+# SELECTOR
+# ============================================================================
+_selection_cache: Dict[tuple, Tuple[Sequence[str], Tuple[str, ...]]] = {}
+
+
+class PointSelector:
+    """Building and pattern filter for a point list."""
+
+    def __init__(
+        self,
+        buildings: Optional[Sequence[str]] = None,
+        include: Optional[Sequence[str]] = None,
+        exclude: Optional[Sequence[str]] = None,
+        points: Optional[Sequence[str]] = None
+    ) -> None:
+        self.points = [p.strip() for p in points or [] if p.strip()]
+        self.buildings = [b.strip().upper() for b in buildings or [] if b.strip()]
+        self.include_patterns = [p for p in include or [] if p.strip()]
+        self.exclude_patterns = [p for p in exclude or [] if p.strip()]
+        self.include = compile_patterns(self.include_patterns)
+        self.exclude = compile_patterns(self.exclude_patterns)
+
+    @property
+    def is_active(self) -> bool:
+        """True if any filter is set."""
+        return bool(self.points or self.buildings or self.include or self.exclude)
+
+    def describe(self) -> str:
+        """Short description for logs."""
+        parts: List[str] = []
+        if self.points:
+            parts.append(f"points={len(self.points)}")
+        if self.buildings:
+            parts.append(f"buildings={','.join(self.buildings)}")
+        if self.include_patterns:
+            parts.append(f"include={','.join(self.include_patterns)}")
+        if self.exclude_patterns:
+            parts.append(f"exclude={','.join(self.exclude_patterns)}")
+        return ' '.join(parts) or 'all points'
+
+    def select(self, points: Sequence[str], building_dictionary: Dict[str, str]) -> List[str]:
+        """
+        Select points, keeping point list order.
+
+        Args:
+            points: Point paths (ideally the point_list_cache tuple)
+            building_dictionary: District BUILDING_DICTIONARY
+
+        Returns:
+            Selected point paths
+        """
+        if not self.is_active:
+            return list(points)
+
+        key = (
+            id(points), tuple(self.points), tuple(self.buildings), tuple(self.include_patterns),
+            tuple(self.exclude_patterns), tuple(sorted(building_dictionary.items()))
+        )
+        cached = _selection_cache.get(key)
+        if cached is not None and cached[0] is points:
+            return list(cached[1])
+
+        selected = self._select(points, building_dictionary)
+        if len(_selection_cache) >= MAX_CACHED_INDEXES:
+            _selection_cache.clear()
+        _selection_cache[key] = (points, tuple(selected))
+        return selected
+
+    def _select(self, points: Sequence[str], building_dictionary: Dict[str, str]) -> List[str]:
+        """Apply the point, building and pattern filters."""
+        candidates: Sequence[str] = points
+        if self.points:
+            wanted_points = set(self.points)
+            candidates = [p for p in candidates if p in wanted_points]
+            missing = len(wanted_points) - len(candidates)
+            if missing:
+                logger.warning("%d requested points are not in this list", missing)
+        if self.buildings:
+            index = get_building_index(points, building_dictionary)
+            wanted: List[int] = []
+            for building in self.buildings:
+                positions = index.positions.get(index.resolve(building))
+                if positions is None:
+                    logger.warning("Building %s has no points in this list", building)
+                    continue
+                wanted.extend(positions)
+            positions_wanted = set(wanted)
+            if self.points:
+                in_buildings = {points[i] for i in positions_wanted}
+                candidates = [p for p in candidates if p in in_buildings]
+            else:
+                candidates = [points[i] for i in sorted(positions_wanted)]
+
+        include = self.include.search if self.include else None
+        exclude = self.exclude.search if self.exclude else None
+        if include is None and exclude is None:
+            return list(candidates)
+
+        return [
+            p for p in candidates
+            if (include is None or include(p)) and (exclude is None or not exclude(p))
+        ]
+
+
+# ============================================================================
+# CLI
+# ============================================================================
+if __name__ == '__main__':
+    import argparse
+    from niagara_url_generator import URLGenerator
+
+    parser = argparse.ArgumentParser(description='Point Selection v2.0')
+    parser.add_argument('--district', type=str, required=True, help='District name')
+    parser.add_argument('--building', nargs='+', default=[], help='Building name(s)')
+    parser.add_argument('--include', action='append', default=[], help="Glob or 're:' regex")
+    parser.add_argument('--exclude', action='append', default=[], help="Glob or 're:' regex")
+
+    args = parser.parse_args()
+
+    gen = URLGenerator(args.district)
+    index = gen.building_index()
+    print(f"{gen.district}: {gen.point_count} points")
+    for building in index.buildings():
+        stations = ', '.join(index.stations(building))
+        print(f"  {building or '(unassigned)':28s} {len(index.positions[building]):6d}  {stations}")
+
+    selector = PointSelector(args.building, args.include, args.exclude)
+    if selector.is_active:
+        print(f"Selected ({selector.describe()}): {len(gen.select_points(selector))}")
@@ -0,0 +1,447 @@
+"""
+================================================================================
+NIAGARA POST-PROCESSING v2.0
+================================================================================
+CPU-bound work on downloaded CSVs, run in a pool of worker processes so it
+never competes with the download threads for the GIL.
+
+For every file the engine finishes (DownloadEngine on_file hook) a worker
+process:
+
+    parse      - timestamp,value rows (ISO 8601 or Niagara display format;
+                 the format of the first row is reused for the rest)
+    validate   - unparseable timestamps, non-numeric values, out-of-order
+                 and duplicate timestamps
+    hash       - SHA-256 of the CSV as downloaded
+    columnar   - timestamps and values as two float64 columns,
+                 zlib-compressed, in <date folder>/columnar/<name>.tcol
+
+Only a FileSummary (a tuple of a dozen numbers and short strings) comes
+back to the main process; the parsed data never crosses the process
+boundary. Summaries are kept per date folder in .postprocess.json, so
+first/last timestamps and row counts can be read without opening the CSVs.
+
+.tcol layout (little-endian):
+    header  '<4sHHI'  magic b'NTCL', version, flags (1 = zlib), row count
+    body    count float64 timestamps (epoch seconds), then count float64
+            values (NaN for non-numeric); zlib-compressed when flagged
+
+USAGE:
+    stage = PostProcessStage()
+    engine = DownloadEngine(cookies, on_file=stage.submit)
+    ...
+    print(stage.close().summary())
+
+    python post_process.py output/NASHUA/2026-10-18     # existing folder
+================================================================================
+"""
+
+import csv
+import hashlib
+import io
+import json
+import math
+import os
+import struct
+import sys
+import threading
+import time
+import zlib
+from array import array
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from utils import atomic_write
+from logging_config import get_logger
+
+logger = get_logger("post_process")
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+COLUMNAR_SUBFOLDER = "columnar"
+COLUMNAR_SUFFIX = ".tcol"
+MANIFEST_FILE = ".postprocess.json"
+COMPRESS_LEVEL = 6
+WORKER_NICENESS = 5          # POSIX: below the download process
+
+TCOL_MAGIC = b'NTCL'
+TCOL_VERSION = 1
+TCOL_HEADER = struct.Struct('<4sHHI')
+FLAG_ZLIB = 1
+
+BOOLEAN_VALUES = {'true': 1.0, 'false': 0.0, 'on': 1.0, 'off': 0.0}
+TIMESTAMP_FORMATS = (
+    '%d-%b-%y %I:%M:%S %p',
+    '%d-%b-%y %I:%M %p',
+    '%d-%b-%Y %I:%M:%S %p',
+    '%Y-%m-%d %H:%M:%S',
+    '%m/%d/%Y %I:%M:%S %p',
+)
+
+
+# ============================================================================
+# PARSING (runs in worker processes)
+# ============================================================================
+def _strip_zone(text: str) -> str:
+    parts = text.rsplit(' ', 1)
+    if len(parts) == 2 and parts[1].isalpha() and parts[1].upper() not in ('AM', 'PM'):
+        return parts[0]  # zone abbreviation: treat as local time
+    return text
+
+
+def timestamp_parser(sample: str) -> Optional[Callable[[str], float]]:
+    """
+    Pick a parser for a file's timestamps from its first one.
+
+    Args:
+        sample: First timestamp text in the file
+
+    Returns:
+        Function from text to epoch seconds (raises ValueError on other
+        formats), or None if the sample is not a timestamp
+    """
+    sample = sample.strip()
+    try:
+        datetime.fromisoformat(sample)
+        return lambda text: datetime.fromisoformat(text.strip()).timestamp()
+    except ValueError:
+        pass
+    stripped = _strip_zone(sample)
+    for fmt in TIMESTAMP_FORMATS:
+        try:
+            datetime.strptime(stripped, fmt)
+        except ValueError:
+            continue
+        return lambda text, fmt=fmt: datetime.strptime(_strip_zone(text.strip()), fmt).timestamp()
+    return None
+
+
+def parse_value(text: str) -> Optional[float]:
+    """Numeric value of a cell ('72.5', '72.5 °F', 'true'); None if not numeric."""
+    text = text.strip()
+    try:
+        return float(text)
+    except ValueError:
+        pass
+    head = text.split(' ', 1)[0]
+    try:
+        return float(head)
+    except ValueError:
+        return BOOLEAN_VALUES.get(text.lower())
+
+
+def parse_trend_csv(content: bytes) -> Tuple[array, array, Dict[str, int]]:
+    """
+    Parse a downloaded history CSV.
+
+    Args:
+        content: File contents
+
+    Returns:
+        (timestamps, values, counts); counts holds 'bad_timestamps',
+        'non_numeric', 'unordered' and 'duplicates'. Rows with a bad
+        timestamp are dropped, non-numeric values become NaN.
+    """
+    timestamps = array('d')
+    values = array('d')
+    counts = {'bad_timestamps': 0, 'non_numeric': 0, 'unordered': 0, 'duplicates': 0}
+    text = content.decode('utf-8-sig', errors='replace')
+    parse_ts: Optional[Callable[[str], float]] = None
+    previous = -math.inf
+
+    for row in csv.reader(io.StringIO(text)):
+        if len(row) < 2:
+            continue
+        if parse_ts is None:
+            parse_ts = timestamp_parser(row[0])
+            if parse_ts is None:
+                continue  # header row
+        try:
+            ts = parse_ts(row[0])
+        except ValueError:
+            counts['bad_timestamps'] += 1
+            continue
+        value = parse_value(row[1])
+        if value is None:
+            counts['non_numeric'] += 1
+            value = math.nan
+        if ts < previous:
+            counts['unordered'] += 1
+        elif ts == previous:
+            counts['duplicates'] += 1
+        previous = max(previous, ts)
+        timestamps.append(ts)
+        values.append(value)
+    return timestamps, values, counts
+
+
+def pack_columnar(timestamps: array, values: array, level: int = COMPRESS_LEVEL) -> bytes:
+    """Encode two float64 columns as a .tcol file (level 0 = uncompressed)."""
+    if sys.byteorder != 'little':
+        timestamps, values = array('d', timestamps), array('d', values)
+        timestamps.byteswap()
+        values.byteswap()
+    body = timestamps.tobytes() + values.tobytes()
+    flags = 0
+    if level > 0:
+        body = zlib.compress(body, level)
+        flags |= FLAG_ZLIB
+    return TCOL_HEADER.pack(TCOL_MAGIC, TCOL_VERSION, flags, len(timestamps)) + body
+
+
+def read_columnar(path: str) -> Tuple[array, array]:
+    """
+    Read a .tcol file.
+
+    Returns:
+        (timestamps, values) as float64 arrays
+
+    Raises:
+        ValueError: If the file is not a .tcol file or is truncated
+    """
+    with open(path, 'rb') as f:
+        data = f.read()
+    if len(data) < TCOL_HEADER.size:
+        raise ValueError(f"{path}: truncated")
+    magic, version, flags, count = TCOL_HEADER.unpack_from(data)
+    if magic != TCOL_MAGIC or version != TCOL_VERSION:
+        raise ValueError(f"{path}: not a columnar trend file")
+    body = data[TCOL_HEADER.size:]
+    if flags & FLAG_ZLIB:
+        body = zlib.decompress(body)
+    if len(body) != count * 16:
+        raise ValueError(f"{path}: expected {count} rows")
+    timestamps, values = array('d'), array('d')
+    timestamps.frombytes(body[:count * 8])
+    values.frombytes(body[count * 8:])
+    if sys.byteorder != 'little':
+        timestamps.byteswap()
+        values.byteswap()
+    return timestamps, values
+
+
+class FileSummary(NamedTuple):
+    """What a worker sends back for one file (no row data)."""
+    name: str
+    rows: int = 0
+    bad_timestamps: int = 0
+    non_numeric: int = 0
+    unordered: int = 0
+    duplicates: int = 0
+    first_ts: float = 0.0
+    last_ts: float = 0.0
+    sha256: str = ''
+    csv_bytes: int = 0
+    columnar_bytes: int = 0
+    cpu_seconds: float = 0.0
+    error: str = ''
+
+
+def process_file(path: str, columnar: bool = True, level: int = COMPRESS_LEVEL) -> FileSummary:
+    """
+    Parse, validate, hash and convert one CSV (worker process entry point).
+
+    Args:
+        path: Downloaded CSV
+        columnar: Write the .tcol file next to the date folder
+        level: zlib level for the .tcol file (0 = uncompressed)
+
+    Returns:
+        FileSummary (error set instead of raising)
+    """
+    start = time.process_time()
+    name = os.path.basename(path)
+    try:
+        with open(path, 'rb') as f:
+            content = f.read()
+        timestamps, values, counts = parse_trend_csv(content)
+        packed_bytes = 0
+        if columnar:
+            folder = os.path.join(os.path.dirname(path), COLUMNAR_SUBFOLDER)
+            os.makedirs(folder, exist_ok=True)
+            packed = pack_columnar(timestamps, values, level)
+            atomic_write(os.path.join(folder, os.path.splitext(name)[0] + COLUMNAR_SUFFIX), packed, fsync=False)
+            packed_bytes = len(packed)
+        return FileSummary(
+            name=name,
+            rows=len(timestamps),
+            first_ts=min(timestamps) if timestamps else 0.0,
+            last_ts=max(timestamps) if timestamps else 0.0,
+            sha256=hashlib.sha256(content).hexdigest(),
+            csv_bytes=len(content),
+            columnar_bytes=packed_bytes,
+            cpu_seconds=time.process_time() - start,
+            **counts
+        )
+    except Exception as e:
+        return FileSummary(name=name, cpu_seconds=time.process_time() - start, error=str(e)[:100])
+
+
+def _init_worker() -> None:
+    """Keep post-processing below the download process in CPU priority."""
+    if hasattr(os, 'nice'):
+        try:
+            os.nice(WORKER_NICENESS)
+        except OSError:
+            pass
+
+
+# ============================================================================
+# STAGE (main process)
+# ============================================================================
+@dataclass
+class PostStats:
+    """Post-processing results for a run."""
+    files: int = 0
+    failed: int = 0
+    rows: int = 0
+    bad_timestamps: int = 0
+    non_numeric: int = 0
+    unordered: int = 0
+    csv_bytes: int = 0
+    columnar_bytes: int = 0
+    cpu_seconds: float = 0.0
+    workers: int = 0
+    errors: List[Tuple[str, str]] = field(default_factory=list)
+
+    def add(self, summary: FileSummary) -> None:
+        self.cpu_seconds += summary.cpu_seconds
+        if summary.error:
+            self.failed += 1
+            self.errors.append((summary.name, summary.error))
+            return
+        self.files += 1
+        self.rows += summary.rows
+        self.bad_timestamps += summary.bad_timestamps
+        self.non_numeric += summary.non_numeric
+        self.unordered += summary.unordered + summary.duplicates
+        self.csv_bytes += summary.csv_bytes
+        self.columnar_bytes += summary.columnar_bytes
+
+    def summary(self) -> str:
+        issues = self.bad_timestamps + self.non_numeric + self.unordered
+        ratio = f" | Columnar: {self.columnar_bytes / self.csv_bytes * 100:.0f}% of CSV" if self.columnar_bytes and self.csv_bytes else ""
+        return (
+            f"Processed: {self.files} | Failed: {self.failed} | Rows: {self.rows:,} | "
+            f"Row issues: {issues}{ratio} | CPU: {self.cpu_seconds:.1f}s on {self.workers} processes"
+        )
+
+
+class PostProcessStage:
+    """Process pool fed with finished CSV files; keeps per-folder manifests."""
+
+    def __init__(
+        self,
+        workers: Optional[int] = None,
+        columnar: bool = True,
+        level: int = COMPRESS_LEVEL
+    ) -> None:
+        # Leave one core for the download process
+        self.workers = max(1, workers if workers else (os.cpu_count() or 2) - 1)
+        self.columnar = columnar
+        self.level = level
+        self.stats = PostStats(workers=self.workers)
+        self._executor = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker)
+        self._lock = threading.Lock()
+        self._manifests: Dict[str, Dict[str, dict]] = {}  # folder -> name -> summary
+        self._queued = 0
+        self._closed = False
+
+    def submit(self, path: str) -> 'Future[FileSummary]':
+        """
+        Queue a finished file; returns at once.
+
+        Args:
+            path: CSV under its final name
+
+        Returns:
+            Future resolving to the file's FileSummary
+        """
+        if self._closed:
+            raise RuntimeError("Post-processing stage is closed")
+        future = self._executor.submit(process_file, path, self.columnar, self.level)
+        folder = os.path.dirname(os.path.abspath(path))
+        future.add_done_callback(lambda f, folder=folder: self._collect(folder, f))
+        with self._lock:
+            self._queued += 1
+        return future
+
+    def _collect(self, folder: str, future: 'Future[FileSummary]') -> None:
+        if future.cancelled():
+            return
+        error = future.exception()
+        summary = future.result() if error is None else FileSummary(name='?', error=str(error)[:100])
+        with self._lock:
+            self.stats.add(summary)
+            if not summary.error:
+                self._manifests.setdefault(folder, {})[summary.name] = summary._asdict()
+
+    def _save_manifests(self) -> None:
+        for folder, entries in self._manifests.items():
+            path = os.path.join(folder, MANIFEST_FILE)
+            try:
+                with open(path) as f:
+                    existing = json.load(f)
+            except (OSError, json.JSONDecodeError):
+                existing = {}
+            existing.update(entries)
+            atomic_write(path, json.dumps(existing, indent=1).encode('utf-8'), fsync=False)
+
+    def close(self) -> PostStats:
+        """Wait for queued files, write manifests and stop the workers."""
+        if not self._closed:
+            self._closed = True
+            self._executor.shutdown(wait=True)
+            with self._lock:
+                self._save_manifests()
+            logger.info("Post-processing: %s", self.stats.summary())
+        return self.stats
+
+    def __enter__(self) -> 'PostProcessStage':
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.close()
+
+
+def load_manifest(folder: str) -> Dict[str, FileSummary]:
+    """Summaries written for a date folder (empty if none)."""
+    try:
+        with open(os.path.join(folder, MANIFEST_FILE)) as f:
+            data = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return {}
+    return {name: FileSummary(**entry) for name, entry in data.items()}
+
+
+# ============================================================================
+# CLI
+# ============================================================================
+if __name__ == '__main__':
+    import argparse
+
+    from utils import safe_print, print_header, setup_console_encoding
+
+    setup_console_encoding()
+
+    parser = argparse.ArgumentParser(description='Post-Processing v2.0')
+    parser.add_argument('folder', help='Date folder with downloaded CSVs')
+    parser.add_argument('--workers', type=int, help='Worker processes (default: cores - 1)')
+    parser.add_argument('--no-columnar', dest='columnar', action='store_false',
+                        help='Only parse, validate and hash')
+    args = parser.parse_args()
+
+    files = sorted(
+        os.path.join(args.folder, name) for name in os.listdir(args.folder) if name.endswith('.csv')
+    )
+    started = time.perf_counter()
+    with PostProcessStage(workers=args.workers, columnar=args.columnar) as stage:
+        for file_path in files:
+            stage.submit(file_path)
+    print_header(f"POST-PROCESSED {len(files)} FILES ({time.perf_counter() - started:.1f}s)")
+    safe_print(stage.stats.summary())
+    for file_name, err in stage.stats.errors[:10]:
+        safe_print(f"  {file_name}: {err}")
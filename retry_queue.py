@@ -0,0 +1,207 @@
+"""
+================================================================================
+NIAGARA RETRY QUEUE v2.0
+================================================================================
+Failure classification and deferred re-attempts for the download engine.
+
+Every failed download is classified:
+
+    timeout     - request timed out
+    auth        - HTTP 401/403 (session rejected)
+    client      - other HTTP 4xx (bad ORD, missing history)
+    server      - HTTP 5xx and 429 (station busy or restarting)
+    connection  - refused / reset / DNS failures
+    invalid     - HTTP 200 with an HTML page instead of CSV (usually the
+                  login page after the session expired)
+    circuit     - not attempted: the host's circuit breaker is open
+    other       - anything else
+
+Transient classes are put on a deferred queue instead of failing the point.
+The engine drains the queue after the main pass at reduced concurrency, each
+class waiting its own delay (growing per attempt) before being re-tried, so
+a station that was briefly busy has time to recover. Classes with no
+attempts (auth, client) fail immediately: retrying cannot fix them.
+
+The urllib3 Retry on the session still covers fast connection-level retries
+within a single request; this queue handles what those retries give up on.
+
+USAGE:
+    from retry_queue import RetryQueue, classify_exception
+
+    queue = RetryQueue()
+    if not queue.offer(point_path, url, 'timeout'):
+        ...  # out of attempts, record the failure
+    while queue:
+        for point_path, url in queue.next_round():
+            ...
+================================================================================
+"""
+
+import heapq
+import itertools
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Tuple
+
+import requests
+
+from logging_config import get_logger
+
+logger = get_logger("retry")
+
+# ============================================================================
+# FAILURE CLASSES
+# ============================================================================
+TIMEOUT = 'timeout'
+AUTH = 'auth'
+CLIENT = 'client'
+SERVER = 'server'
+CONNECTION = 'connection'
+INVALID = 'invalid'
+CIRCUIT = 'circuit'
+OTHER = 'other'
+
+FAILURE_CLASSES = (TIMEOUT, AUTH, CLIENT, SERVER, CONNECTION, INVALID, CIRCUIT, OTHER)
+
+
+def classify_status(status_code: Optional[int]) -> str:
+    """Failure class for an HTTP error status."""
+    if status_code in (401, 403):
+        return AUTH
+    if status_code == 429:
+        return SERVER  # rate limited: back off and retry like a busy station
+    if status_code is not None and 400 <= status_code < 500:
+        return CLIENT
+    if status_code is not None and status_code >= 500:
+        return SERVER
+    return OTHER
+
+
+def classify_exception(error: BaseException) -> str:
+    """
+    Failure class for an exception raised by a download.
+
+    Args:
+        error: Exception from session.get / raise_for_status
+
+    Returns:
+        One of FAILURE_CLASSES
+    """
+    # ConnectTimeout is both a Timeout and a ConnectionError; treat as timeout
+    if isinstance(error, requests.exceptions.Timeout):
+        return TIMEOUT
+    if isinstance(error, requests.exceptions.HTTPError):
+        response = error.response
+        return classify_status(response.status_code if response is not None else None)
+    if isinstance(error, (requests.exceptions.ConnectionError, ConnectionError)):
+        return CONNECTION
+    return OTHER
+
+
+# ============================================================================
+# POLICIES
+# ============================================================================
+@dataclass(frozen=True)
+class RetryPolicy:
+    """Deferred re-attempts for one failure class."""
+    attempts: int = 0       # re-attempts after the first failure
+    delay: float = 5.0      # seconds before the first re-attempt
+    backoff: float = 2.0    # delay multiplier per further attempt
+
+    def delay_for(self, attempt: int) -> float:
+        """Delay before re-attempt number attempt (1-based)."""
+        return self.delay * self.backoff ** max(0, attempt - 1)
+
+
+DEFAULT_POLICIES: Dict[str, RetryPolicy] = {
+    TIMEOUT: RetryPolicy(attempts=2, delay=10.0),
+    SERVER: RetryPolicy(attempts=3, delay=5.0),
+    CONNECTION: RetryPolicy(attempts=3, delay=5.0),
+    INVALID: RetryPolicy(attempts=1, delay=15.0),
+    CIRCUIT: RetryPolicy(attempts=3, delay=10.0),  # ~70 s for a host to come back
+    OTHER: RetryPolicy(attempts=1, delay=5.0),
+    AUTH: RetryPolicy(attempts=0),
+    CLIENT: RetryPolicy(attempts=0),
+}
+
+# Retry rounds run with max_workers // RETRY_WORKER_DIVISOR workers
+RETRY_WORKER_DIVISOR = 4
+
+
+# ============================================================================
+# QUEUE
+# ============================================================================
+class RetryQueue:
+    """Deferred re-attempts ordered by due time."""
+
+    def __init__(
+        self,
+        policies: Optional[Dict[str, RetryPolicy]] = None,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep
+    ) -> None:
+        self.policies = dict(DEFAULT_POLICIES)
+        self.policies.update(policies or {})
+        self._clock = clock
+        self._sleep = sleep
+        self._heap: List[Tuple[float, int, str, str]] = []
+        self._seq = itertools.count()
+        self._attempts: Dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def attempts(self, point_path: str) -> int:
+        """Re-attempts queued so far for a point."""
+        return self._attempts.get(point_path, 0)
+
+    def offer(self, point_path: str, url: str, failure_class: str) -> bool:
+        """
+        Queue a failed point for a later re-attempt.
+
+        Args:
+            point_path: Point path
+            url: Download URL
+            failure_class: Class from classify_exception
+
+        Returns:
+            True if queued, False if the class's attempts are used up
+        """
+        policy = self.policies.get(failure_class, self.policies[OTHER])
+        attempt = self._attempts.get(point_path, 0) + 1
+        if attempt > policy.attempts:
+            return False
+        self._attempts[point_path] = attempt
+        due = self._clock() + policy.delay_for(attempt)
+        heapq.heappush(self._heap, (due, next(self._seq), point_path, url))
+        return True
+
+    def next_round(self) -> List[Tuple[str, str]]:
+        """
+        Wait for the earliest re-attempt and take every entry that is due.
+
+        Returns:
+            (point_path, url) tuples in due order
+        """
+        if not self._heap:
+            return []
+        wait = self._heap[0][0] - self._clock()
+        if wait > 0:
+            self._sleep(wait)
+        now = self._clock()
+        due: List[Tuple[str, str]] = []
+        while self._heap and self._heap[0][0] <= now:
+            _, _, point_path, url = heapq.heappop(self._heap)
+            due.append((point_path, url))
+        return due
+
+    def drain(self) -> List[Tuple[str, str]]:
+        """
+        Take every queued entry without waiting (e.g. after a cancel).
+
+        Returns:
+            (point_path, url) tuples in due order
+        """
+        entries = [(point_path, url) for _, _, point_path, url in sorted(self._heap)]
+        self._heap.clear()
+        return entries
@@ -0,0 +1,436 @@
+"""
+================================================================================
+NIAGARA RUN HISTORY v2.0
+================================================================================
+Every district download is stored in a local SQLite database instead of
+only being printed: window, counts, bytes, request latency percentiles,
+worker counts and failures by class.
+
+The report groups runs per district or per station host and per day, week
+or month, so a controller that is getting slower shows up as a falling
+request rate or a rising p95 long before downloads start timing out:
+
+    python run_history.py                          # trend per district, by week
+    python run_history.py --by host --bucket day --days 30
+    python run_history.py --district NASHUA --runs 20
+    python run_history.py --degraded               # slower than their baseline
+
+A district counts as degraded when its recent runs (DEGRADE_RECENT) are
+clearly worse than the runs before them (DEGRADE_BASELINE): request rate
+per worker down by DEGRADE_RATE or p95 latency up by DEGRADE_P95.
+
+Database: .cache/run_history.db (one table, 'runs')
+
+USAGE:
+    from run_history import save_run
+
+    save_run(district, stats, host=host, source='cli', workers=workers,
+             window_start='2026-03-01', window_end='2026-03-08')
+================================================================================
+"""
+
+import json
+import sqlite3
+import statistics
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, Iterator, List, Optional
+
+from utils import CACHE_DIR
+from logging_config import get_logger
+
+if TYPE_CHECKING:
+    from niagara_download_engine import DownloadStats
+
+logger = get_logger("run_history")
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+HISTORY_DB = CACHE_DIR / "run_history.db"
+
+DEGRADE_RECENT = 3           # latest runs compared ...
+DEGRADE_BASELINE = 10        # ... with this many runs before them
+DEGRADE_RATE = 0.33          # rate per worker down by a third
+DEGRADE_P95 = 0.5            # p95 latency up by half
+MIN_REQUESTS = 20            # smaller runs are left out of trends
+
+BUCKETS = {
+    'day': '%Y-%m-%d',
+    'week': '%Y-W%W',
+    'month': '%Y-%m',
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    started TEXT NOT NULL,
+    finished TEXT NOT NULL,
+    district TEXT NOT NULL,
+    host TEXT NOT NULL DEFAULT '',
+    source TEXT NOT NULL DEFAULT '',
+    window_start TEXT,
+    window_end TEXT,
+    rollup TEXT,
+    workers INTEGER,
+    writers INTEGER,
+    total INTEGER,
+    success INTEGER,
+    failed INTEGER,
+    empty INTEGER,
+    skipped INTEGER,
+    cancelled INTEGER,
+    retried INTEGER,
+    recovered INTEGER,
+    hedged INTEGER,
+    bytes INTEGER,
+    elapsed REAL,
+    rate REAL,
+    p50 REAL,
+    p90 REAL,
+    p95 REAL,
+    p99 REAL,
+    max_latency REAL,
+    fetch_busy REAL,
+    errors_by_class TEXT
+);
+CREATE INDEX IF NOT EXISTS runs_district ON runs (district, started);
+CREATE INDEX IF NOT EXISTS runs_host ON runs (host, started);
+"""
+
+
+# ============================================================================
+# DATABASE
+# ============================================================================
+class RunHistory:
+    """SQLite store of finished district runs."""
+
+    def __init__(self, path: Path = HISTORY_DB) -> None:
+        self.path = path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(path), timeout=30, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        with self._conn:
+            self._conn.executescript(SCHEMA)
+
+    @contextmanager
+    def _cursor(self) -> Iterator[sqlite3.Cursor]:
+        with self._lock, self._conn:
+            yield self._conn.cursor()
+
+    def add(
+        self,
+        district: str,
+        stats: 'DownloadStats',
+        host: str = "",
+        source: str = "",
+        workers: int = 0,
+        window_start: Optional[str] = None,
+        window_end: Optional[str] = None,
+        rollup: Optional[str] = None
+    ) -> int:
+        """
+        Store a finished run.
+
+        Args:
+            district: District name
+            stats: The run's DownloadStats
+            host: Station host (BASE_IP host[:port])
+            source: What started the run ('cli', 'scheduler', 'api')
+            workers: Fetch workers
+            window_start: First day downloaded (YYYY-MM-DD)
+            window_end: Last day downloaded (YYYY-MM-DD)
+            rollup: Rollup resolution, None for raw records
+
+        Returns:
+            Row id
+        """
+        latency = stats.latency_percentiles()
+        busy = stats.utilisation().get('fetch')
+        end = stats.end_time or time.time()
+        row = {
+            'started': datetime.fromtimestamp(stats.start_time).isoformat(timespec='seconds'),
+            'finished': datetime.fromtimestamp(end).isoformat(timespec='seconds'),
+            'district': district.upper(),
+            'host': host,
+            'source': source,
+            'window_start': window_start,
+            'window_end': window_end,
+            'rollup': rollup,
+            'workers': workers or stats.fetch_workers,
+            'writers': stats.write_workers,
+            'total': stats.total,
+            'success': stats.success,
+            'failed': stats.failed,
+            'empty': stats.empty,
+            'skipped': stats.skipped,
+            'cancelled': stats.cancelled,
+            'retried': stats.retried,
+            'recovered': stats.recovered,
+            'hedged': stats.hedged,
+            'bytes': stats.bytes_downloaded,
+            'elapsed': round(stats.elapsed, 3),
+            'rate': round(stats.rate, 3),
+            'p50': latency.get('p50'),
+            'p90': latency.get('p90'),
+            'p95': latency.get('p95'),
+            'p99': latency.get('p99'),
+            'max_latency': latency.get('max'),
+            'fetch_busy': round(busy, 3) if busy is not None else None,
+            'errors_by_class': json.dumps(stats.errors_by_class, sort_keys=True),
+        }
+        columns = ', '.join(row)
+        marks = ', '.join(f':{name}' for name in row)
+        with self._cursor() as cur:
+            cur.execute(f"INSERT INTO runs ({columns}) VALUES ({marks})", row)
+            return int(cur.lastrowid)
+
+    def runs(
+        self,
+        district: Optional[str] = None,
+        host: Optional[str] = None,
+        since: Optional[datetime] = None,
+        limit: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Stored runs, newest first.
+
+        Args:
+            district: Only this district
+            host: Only this station host
+            since: Only runs started at or after this time
+            limit: At most this many
+
+        Returns:
+            One dict per run (errors_by_class decoded)
+        """
+        where, args = [], []
+        if district:
+            where.append("district = ?")
+            args.append(district.upper())
+        if host:
+            where.append("host = ?")
+            args.append(host)
+        if since is not None:
+            where.append("started >= ?")
+            args.append(since.isoformat(timespec='seconds'))
+        sql = "SELECT * FROM runs"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY started DESC, id DESC"
+        if limit:
+            sql += f" LIMIT {int(limit)}"
+        with self._cursor() as cur:
+            rows = cur.execute(sql, args).fetchall()
+        result = []
+        for row in rows:
+            item = dict(row)
+            item['errors_by_class'] = json.loads(item['errors_by_class'] or '{}')
+            result.append(item)
+        return result
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def __enter__(self) -> 'RunHistory':
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.close()
+
+
+def save_run(
+    district: str,
+    stats: 'DownloadStats',
+    path: Path = HISTORY_DB,
+    **details: Any
+) -> None:
+    """
+    Store a finished run; any error is logged, never raised.
+
+    Args:
+        district: District name
+        stats: The run's DownloadStats
+        path: Database file
+        **details: host, source, workers, window_start, window_end, rollup
+    """
+    try:
+        with RunHistory(path) as history:
+            history.add(district, stats, **details)
+    except Exception as e:
+        # A finished download must not fail over its history entry
+        logger.warning("Could not record run for %s: %s", district, e)
+
+
+# ============================================================================
+# TRENDS
+# ============================================================================
+@dataclass
+class TrendRow:
+    """Aggregated runs of one district/host in one period."""
+    key: str
+    period: str
+    runs: int
+    requests: int
+    failed: int
+    bytes: int
+    rate_per_worker: float
+    p95: Optional[float]
+
+    def describe(self) -> str:
+        p95 = f"{self.p95 * 1000:7.0f}" if self.p95 is not None else f"{'-':>7s}"
+        fail_pct = self.failed / self.requests * 100 if self.requests else 0.0
+        return (
+            f"{self.key:25s} | {self.period:10s} | {self.runs:4d} | {self.requests:7d} | "
+            f"{fail_pct:5.1f}% | {self.bytes / 1024 / 1024:8.1f} | {self.rate_per_worker:7.2f} | {p95}"
+        )
+
+
+def _requests(run: Dict[str, Any]) -> int:
+    return (run['success'] or 0) + (run['failed'] or 0) + (run['empty'] or 0)
+
+
+def _rate_per_worker(run: Dict[str, Any]) -> float:
+    return (run['rate'] or 0.0) / max(1, run['workers'] or 1)
+
+
+def trends(runs: List[Dict[str, Any]], by: str = 'district', bucket: str = 'week') -> List[TrendRow]:
+    """
+    Aggregate runs per district or host and period.
+
+    Rate is requests/s per worker so runs with different worker counts
+    compare; p95 is the median of the runs' p95 latencies.
+
+    Args:
+        runs: Rows from RunHistory.runs()
+        by: 'district' or 'host'
+        bucket: 'day', 'week' or 'month'
+
+    Returns:
+        TrendRow list sorted by key, then period
+    """
+    fmt = BUCKETS[bucket]
+    groups: Dict[tuple, List[Dict[str, Any]]] = {}
+    for run in runs:
+        if _requests(run) < MIN_REQUESTS:
+            continue
+        period = datetime.fromisoformat(run['started']).strftime(fmt)
+        groups.setdefault((run[by] or '?', period), []).append(run)
+
+    rows = []
+    for (key, period), group in sorted(groups.items()):
+        p95s = [r['p95'] for r in group if r['p95'] is not None]
+        rows.append(TrendRow(
+            key=key,
+            period=period,
+            runs=len(group),
+            requests=sum(_requests(r) for r in group),
+            failed=sum(r['failed'] or 0 for r in group),
+            bytes=sum(r['bytes'] or 0 for r in group),
+            rate_per_worker=statistics.median(_rate_per_worker(r) for r in group),
+            p95=statistics.median(p95s) if p95s else None,
+        ))
+    return rows
+
+
+def degraded(runs: List[Dict[str, Any]], by: str = 'district') -> List[str]:
+    """
+    Districts (or hosts) whose latest runs are clearly slower than before.
+
+    Args:
+        runs: Rows from RunHistory.runs(), newest first
+        by: 'district' or 'host'
+
+    Returns:
+        One description per degraded district/host
+    """
+    per_key: Dict[str, List[Dict[str, Any]]] = {}
+    for run in runs:
+        if _requests(run) >= MIN_REQUESTS:
+            per_key.setdefault(run[by] or '?', []).append(run)
+
+    found = []
+    for key, group in sorted(per_key.items()):
+        recent = group[:DEGRADE_RECENT]
+        baseline = group[DEGRADE_RECENT:DEGRADE_RECENT + DEGRADE_BASELINE]
+        if len(recent) < DEGRADE_RECENT or len(baseline) < DEGRADE_RECENT:
+            continue
+        reasons = []
+        rate_now = statistics.median(_rate_per_worker(r) for r in recent)
+        rate_before = statistics.median(_rate_per_worker(r) for r in baseline)
+        if rate_before > 0 and rate_now < rate_before * (1 - DEGRADE_RATE):
+            reasons.append(f"rate/worker {rate_before:.2f} -> {rate_now:.2f}/s")
+        p95_now = [r['p95'] for r in recent if r['p95'] is not None]
+        p95_before = [r['p95'] for r in baseline if r['p95'] is not None]
+        if p95_now and p95_before:
+            now, before = statistics.median(p95_now), statistics.median(p95_before)
+            if before > 0 and now > before * (1 + DEGRADE_P95):
+                reasons.append(f"p95 {before * 1000:.0f} -> {now * 1000:.0f} ms")
+        if reasons:
+            found.append(f"{key}: {', '.join(reasons)}")
+    return found
+
+
+# ============================================================================
+# CLI
+# ============================================================================
+if __name__ == '__main__':
+    import argparse
+
+    from utils import safe_print, print_header, setup_console_encoding
+
+    setup_console_encoding()
+
+    parser = argparse.ArgumentParser(description='Run History v2.0')
+    parser.add_argument('--district', type=str, help='Only this district')
+    parser.add_argument('--host', type=str, help='Only this station host')
+    parser.add_argument('--days', type=int, default=180, help='Runs from the last N days')
+    parser.add_argument('--by', choices=['district', 'host'], default='district')
+    parser.add_argument('--bucket', choices=sorted(BUCKETS), default='week')
+    parser.add_argument('--runs', type=int, metavar='N', help='List the last N runs instead of trends')
+    parser.add_argument('--degraded', action='store_true', help='Only list degraded districts/hosts')
+
+    args = parser.parse_args()
+
+    if not HISTORY_DB.exists():
+        safe_print("No runs recorded yet")
+        raise SystemExit(0)
+
+    with RunHistory() as db:
+        rows = db.runs(
+            district=args.district, host=args.host,
+            since=datetime.now() - timedelta(days=args.days), limit=args.runs
+        )
+
+    if args.runs:
+        print_header(f"LAST {len(rows)} RUNS")
+        safe_print(f"{'Started':19s} | {'District':25s} | {'Reqs':>6s} | {'Fail':>4s} | {'MB':>7s} | "
+                   f"{'Rate':>6s} | {'W':>3s} | {'p50':>6s} | {'p95':>6s} | Failures")
+        for run in rows:
+            p50 = f"{run['p50'] * 1000:6.0f}" if run['p50'] is not None else f"{'-':>6s}"
+            p95 = f"{run['p95'] * 1000:6.0f}" if run['p95'] is not None else f"{'-':>6s}"
+            failures = ', '.join(f"{c}: {n}" for c, n in run['errors_by_class'].items())
+            safe_print(
+                f"{run['started'].replace('T', ' '):19s} | {run['district']:25s} | {_requests(run):6d} | "
+                f"{run['failed']:4d} | {run['bytes'] / 1024 / 1024:7.1f} | {run['rate']:6.1f} | "
+                f"{run['workers']:3d} | {p50} | {p95} | {failures}"
+            )
+    elif args.degraded:
+        print_header("DEGRADED")
+        for line in degraded(rows, by=args.by) or ["None"]:
+            safe_print(f"  {line}")
+    else:
+        print_header(f"TRENDS BY {args.by.upper()} ({args.bucket}, last {args.days} days)")
+        safe_print(f"{args.by.capitalize():25s} | {'Period':10s} | {'Runs':>4s} | {'Reqs':>7s} | "
+                   f"{'Fail':>6s} | {'MB':>8s} | {'Req/s/W':>7s} | {'p95 ms':>7s}")
+        safe_print("-" * 95)
+        for trend in trends(rows, by=args.by, bucket=args.bucket):
+            safe_print(trend.describe())
+        for line in degraded(rows, by=args.by):
+            safe_print(f"  DEGRADED {line}")
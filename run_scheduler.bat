@@ -0,0 +1,13 @@
+@echo off
+REM ============================================================================
+REM Niagara BAS Data Download - Scheduler Launcher v2.0
+REM ============================================================================
+
+cd /d "%~dp0"
+if exist .venv\Scripts\activate.bat (
+    call .venv\Scripts\activate.bat
+    .venv\Scripts\python.exe niagara_scheduler.py %*
+) else (
+    python niagara_scheduler.py %*
+)
+pause
@@ -0,0 +1,541 @@
+"""
+================================================================================
+NIAGARA TREND STORE v2.0
+================================================================================
+Read API over downloaded trend data: one memory-mapped binary file per
+district instead of thousands of per-point CSVs in dated folders.
+
+    store = TrendStore()
+    series = store.read('NASHUA', '/NASHUA/AHU1_SAT', start, end)
+    series.timestamps, series.values     # zero-copy views into the mmap
+
+Layout, in <district output>/trend_store/:
+
+    data-<gen>.bin  16-byte records '<dd' (epoch seconds, value); each
+                    point's records are one contiguous run sorted by time
+    index.snap      marshalled sidecar: point -> (first record, count,
+                    first ts, last ts), the data file name, and the source
+                    files already ingested (size, mtime)
+
+A time slice is two binary searches in the point's run, so reading a year
+of one point or the same hour across 5,000 points does not touch the rest
+of the file. With NumPy installed the views are float64 arrays (strided,
+no copy); without it they are memoryviews of doubles.
+
+Ingest is incremental: only date folder files that are new or changed
+since the last ingest are read (the .tcol copy from post_process when it
+is current, else the CSV). A changed point's merged run is appended to the
+data file and the index is swapped atomically, so open readers keep a
+consistent view. Replaced runs are dead space; when it passes
+COMPACT_RATIO of the file the store is rewritten into a new generation.
+
+Values downloaded more than once (overlapping daily windows) are stored
+once; the newest download wins.
+
+USAGE:
+    python trend_store.py ingest --district NASHUA
+    python trend_store.py read --district NASHUA --point /NASHUA/AHU1_SAT --start 2026-03-01 --end 2026-04-01
+    python trend_store.py bench --district NASHUA
+================================================================================
+"""
+
+import bisect
+import marshal
+import mmap
+import os
+import struct
+import sys
+import threading
+import time
+from array import array
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple, Union
+
+from utils import district_output_folder, download_files, point_key
+from logging_config import get_logger
+
+logger = get_logger("trend_store")
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+STORE_SUBFOLDER = "trend_store"
+INDEX_FILE = "index.snap"
+INDEX_VERSION = 1
+RECORD = struct.Struct('<dd')        # timestamp, value
+RECORD_SIZE = RECORD.size            # 16 bytes
+COMPACT_RATIO = 0.5                  # dead records / all records
+
+TimeArg = Union[None, float, datetime, str]
+
+
+def _to_epoch(value: TimeArg, default: float) -> float:
+    """Epoch seconds from a datetime, 'YYYY-MM-DD[ HH:MM]' string or number."""
+    if value is None:
+        return default
+    if isinstance(value, datetime):
+        return value.timestamp()
+    if isinstance(value, str):
+        return datetime.fromisoformat(value).timestamp()
+    return float(value)
+
+
+def _numpy() -> Any:
+    """NumPy if installed (imported on first read), else None."""
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
+
+
+# ============================================================================
+# READ RESULTS
+# ============================================================================
+class TrendSeries(NamedTuple):
+    """A time slice of one point, as views into the store's mmap."""
+    point: str
+    timestamps: Any     # numpy float64 array or memoryview of doubles
+    values: Any
+
+    def __len__(self) -> int:
+        return len(self.timestamps)
+
+
+class _Timestamps(Sequence):
+    """Timestamps of a run of interleaved records, for bisect without copying."""
+
+    def __init__(self, doubles: memoryview, start: int, count: int) -> None:
+        self._doubles = doubles
+        self._start = start
+        self._count = count
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __getitem__(self, i: int) -> float:
+        return self._doubles[2 * (self._start + i)]
+
+
+# ============================================================================
+# DISTRICT STORE
+# ============================================================================
+class DistrictStore:
+    """One district's data file and index, mapped for reading."""
+
+    def __init__(self, folder: Path) -> None:
+        self.folder = folder
+        self.index: Dict[str, Any] = {}
+        self.points: Dict[str, Tuple[int, int, float, float]] = {}
+        self._mm: Optional[mmap.mmap] = None
+        self._file = None
+        self._doubles: Optional[memoryview] = None
+        self._records: Any = None
+        self._index_stat: Optional[Tuple[int, int]] = None
+
+    # ------------------------------------------------------------------ index
+    @property
+    def index_path(self) -> Path:
+        return self.folder / INDEX_FILE
+
+    def _stat_key(self) -> Optional[Tuple[int, int]]:
+        try:
+            st = self.index_path.stat()
+        except FileNotFoundError:
+            return None
+        return st.st_mtime_ns, st.st_size
+
+    def load(self) -> bool:
+        """(Re)map the store if its index changed; False if there is none."""
+        key = self._stat_key()
+        if key is None:
+            self.unmap()
+            self.index, self.points, self._index_stat = {}, {}, None
+            return False
+        if key == self._index_stat:
+            return True
+        with open(self.index_path, 'rb') as f:
+            index = marshal.loads(f.read())
+        if index.get('version') != INDEX_VERSION:
+            raise ValueError(f"{self.index_path}: unsupported index version")
+        self.unmap()
+        self.index = index
+        self.points = index['points']
+        self._index_stat = key
+        data_path = self.folder / index['data_file']
+        if index['records']:
+            self._file = open(data_path, 'rb')
+            self._mm = mmap.mmap(self._file.fileno(), index['records'] * RECORD_SIZE, access=mmap.ACCESS_READ)
+            self._doubles = memoryview(self._mm).cast('d')
+            np = _numpy()
+            if np is not None:
+                self._records = np.frombuffer(self._mm, dtype='<f8').reshape(-1, 2)
+        return True
+
+    def unmap(self) -> None:
+        """Release the mapping (needed before the data file can be replaced on Windows)."""
+        self._records = None
+        if self._doubles is not None:
+            self._doubles.release()
+            self._doubles = None
+        if self._mm is not None:
+            try:
+                self._mm.close()
+            except BufferError:
+                pass  # a caller still holds a view; the map goes with it
+            self._mm = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    # ------------------------------------------------------------------- read
+    def read(self, point: str, start: float, end: float) -> Optional[TrendSeries]:
+        """Records of a point with start <= ts < end (None if unknown)."""
+        entry = self.points.get(point_key(point))
+        if entry is None:
+            return None
+        first, count = entry[0], entry[1]
+        if count == 0 or self._doubles is None or end <= entry[2] or start > entry[3]:
+            return self._slice(point, first, 0)
+        stamps = _Timestamps(self._doubles, first, count)
+        lo = bisect.bisect_left(stamps, start) if start > entry[2] else 0
+        hi = bisect.bisect_left(stamps, end, lo) if end <= entry[3] else count
+        return self._slice(point, first + lo, hi - lo)
+
+    def _slice(self, point: str, first: int, count: int) -> TrendSeries:
+        if self._records is not None:
+            rows = self._records[first:first + count]
+            return TrendSeries(point, rows[:, 0], rows[:, 1])
+        if self._doubles is None:
+            empty = memoryview(array('d'))
+            return TrendSeries(point, empty, empty)
+        doubles = self._doubles[2 * first:2 * (first + count)]
+        return TrendSeries(point, doubles[0::2], doubles[1::2])
+
+    def run(self, key: str) -> Tuple[array, array]:
+        """A point's whole run copied into arrays (for merging)."""
+        timestamps, values = array('d'), array('d')
+        entry = self.points.get(key)
+        if entry is None or self._doubles is None:
+            return timestamps, values
+        doubles = self._doubles[2 * entry[0]:2 * (entry[0] + entry[1])]
+        timestamps.frombytes(doubles[0::2].tobytes())
+        values.frombytes(doubles[1::2].tobytes())
+        return timestamps, values
+
+
+# ============================================================================
+# TREND STORE
+# ============================================================================
+class TrendStore:
+    """Memory-mapped trend data for every district, opened on first use."""
+
+    def __init__(self, root: Optional[str] = None) -> None:
+        """
+        Args:
+            root: Output root holding <DISTRICT>/ folders (like --output);
+                default: each district's configured trend folder
+        """
+        self.root = root
+        self._stores: Dict[str, DistrictStore] = {}
+        self._lock = threading.Lock()
+
+    def district_folder(self, district: str) -> Path:
+        """Folder with the district's date folders."""
+        return district_output_folder(district, self.root)
+
+    def _store(self, district: str) -> DistrictStore:
+        district = district.upper()
+        with self._lock:
+            store = self._stores.get(district)
+            if store is None:
+                store = self._stores[district] = DistrictStore(self.district_folder(district) / STORE_SUBFOLDER)
+        store.load()
+        return store
+
+    def points(self, district: str) -> List[str]:
+        """Point keys (CSV file stems) in the district's store."""
+        return sorted(self._store(district).points)
+
+    def span(self, district: str, point: str) -> Optional[Tuple[float, float, int]]:
+        """(first ts, last ts, record count) of a point, None if not stored."""
+        entry = self._store(district).points.get(point_key(point))
+        return None if entry is None else (entry[2], entry[3], entry[1])
+
+    def read(self, district: str, point: str, start: TimeArg = None, end: TimeArg = None) -> Optional[TrendSeries]:
+        """
+        One point's records in [start, end).
+
+        Args:
+            district: District name
+            point: Point path ('/Station/History') or CSV file stem
+            start: Datetime, 'YYYY-MM-DD[ HH:MM]' or epoch seconds (None = all)
+            end: Same, exclusive (None = all)
+
+        Returns:
+            TrendSeries of zero-copy views, or None if the point is not stored
+        """
+        return self._store(district).read(point, _to_epoch(start, -1e18), _to_epoch(end, 1e18))
+
+    def read_many(
+        self,
+        district: str,
+        points: Optional[Iterable[str]] = None,
+        start: TimeArg = None,
+        end: TimeArg = None
+    ) -> Dict[str, TrendSeries]:
+        """
+        The same time slice across many points (default: all stored points).
+
+        Returns:
+            Point -> TrendSeries (points not in the store are left out)
+        """
+        store = self._store(district)
+        lo, hi = _to_epoch(start, -1e18), _to_epoch(end, 1e18)
+        result: Dict[str, TrendSeries] = {}
+        for point in (store.points if points is None else points):
+            series = store.read(point, lo, hi)
+            if series is not None:
+                result[point] = series
+        return result
+
+    def close(self) -> None:
+        """Unmap every district."""
+        with self._lock:
+            for store in self._stores.values():
+                store.unmap()
+            self._stores.clear()
+
+    def __enter__(self) -> 'TrendStore':
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.close()
+
+    # ----------------------------------------------------------------- ingest
+    def ingest(self, district: str, force: bool = False) -> Dict[str, int]:
+        """
+        Merge new or changed downloads into the district's store.
+
+        Args:
+            district: District name
+            force: Rebuild from every date folder
+
+        Returns:
+            Counts: 'files' read, 'points' updated, 'records' in the store
+        """
+        district = district.upper()
+        folder = self.district_folder(district)
+        store_folder = folder / STORE_SUBFOLDER
+        with self._lock:
+            store = self._stores.get(district) or DistrictStore(store_folder)
+            self._stores[district] = store
+        store.load()
+
+        sources: Dict[str, Tuple[int, int]] = {} if force else dict(store.index.get('sources', {}))
+        changed = _changed_sources(folder, sources)
+        if not changed and not force:
+            return {'files': 0, 'points': 0, 'records': store.index.get('records', 0)}
+
+        # New data per point, oldest download first so the newest wins
+        incoming: Dict[str, Dict[float, float]] = {}
+        for relpath, stat_key in changed:
+            timestamps, values = _read_download(folder / relpath)
+            merged = incoming.setdefault(Path(relpath).stem, {})
+            merged.update(zip(timestamps, values))
+            sources[relpath] = stat_key
+
+        points = {} if force else dict(store.points)
+        runs: Dict[str, Tuple[array, array]] = {}
+        for key, new in incoming.items():
+            old_ts, old_vs = (array('d'), array('d')) if force else store.run(key)
+            runs[key] = _merge(old_ts, old_vs, new)
+
+        _write(store, store_folder, points, runs, sources, compact=force)
+        return {'files': len(changed), 'points': len(runs), 'records': store.index['records']}
+
+
+def _changed_sources(folder: Path, known: Dict[str, Tuple[int, int]]) -> List[Tuple[str, Tuple[int, int]]]:
+    """Date folder CSVs not ingested yet (or changed since), oldest folder first."""
+    changed: List[Tuple[str, Tuple[int, int]]] = []
+    for _, path in download_files(folder):
+        st = os.stat(path)
+        relpath = os.path.relpath(path, folder)
+        stat_key = (st.st_mtime_ns, st.st_size)
+        if tuple(known.get(relpath, ())) != stat_key:
+            changed.append((relpath, stat_key))
+    return changed
+
+
+def _read_download(path: Path) -> Tuple[array, array]:
+    """A downloaded file's records, from its .tcol copy when that is current."""
+    from post_process import COLUMNAR_SUBFOLDER, COLUMNAR_SUFFIX, parse_trend_csv, read_columnar
+
+    columnar = path.parent / COLUMNAR_SUBFOLDER / (path.stem + COLUMNAR_SUFFIX)
+    try:
+        if columnar.stat().st_mtime_ns >= path.stat().st_mtime_ns:
+            return read_columnar(str(columnar))
+    except (OSError, ValueError):
+        pass
+    with open(path, 'rb') as f:
+        timestamps, values, _ = parse_trend_csv(f.read())
+    return timestamps, values
+
+
+def _merge(old_ts: array, old_vs: array, new: Dict[float, float]) -> Tuple[array, array]:
+    """Sorted union of a stored run and new records (new values win)."""
+    if not new:
+        return old_ts, old_vs
+    first_new = min(new)
+    split = bisect.bisect_left(old_ts, first_new)
+    if split == len(old_ts):
+        tail = sorted(new.items())  # only newer data: append
+    else:
+        merged = dict(zip(old_ts[split:], old_vs[split:]))
+        merged.update(new)
+        tail = sorted(merged.items())
+    timestamps, values = old_ts[:split], old_vs[:split]
+    timestamps.extend(ts for ts, _ in tail)
+    values.extend(value for _, value in tail)
+    return timestamps, values
+
+
+def _interleave(timestamps: array, values: array) -> bytes:
+    """Records as '<dd' bytes."""
+    doubles = array('d', bytes(len(timestamps) * RECORD_SIZE))
+    doubles[0::2] = timestamps
+    doubles[1::2] = values
+    if sys.byteorder != 'little':
+        doubles.byteswap()
+    return doubles.tobytes()
+
+
+def _write(
+    store: DistrictStore,
+    folder: Path,
+    points: Dict[str, Tuple[int, int, float, float]],
+    runs: Dict[str, Tuple[array, array]],
+    sources: Dict[str, Tuple[int, int]],
+    compact: bool = False
+) -> None:
+    """Append changed runs (or rewrite everything) and swap in the new index."""
+    folder.mkdir(parents=True, exist_ok=True)
+    index = store.index
+    records = index.get('records', 0)
+    appended = sum(len(ts) for ts, _ in runs.values())
+    dead = records - sum(entry[1] for key, entry in points.items() if key not in runs)
+    # Dead share of the file as it would be after appending
+    compact = compact or not index or (records and dead / max(1, records + appended) > COMPACT_RATIO)
+
+    if compact:
+        generation = index.get('generation', 0) + 1
+        data_file = f"data-{generation}.bin"
+        new_points: Dict[str, Tuple[int, int, float, float]] = {}
+        position = 0
+        with open(folder / data_file, 'wb') as f:
+            for key in sorted(set(points) | set(runs)):
+                timestamps, values = runs[key] if key in runs else store.run(key)
+                f.write(_interleave(timestamps, values))
+                new_points[key] = _entry(position, timestamps)
+                position += len(timestamps)
+            f.flush()
+            os.fsync(f.fileno())
+        records = position
+    else:
+        generation = index['generation']
+        data_file = index['data_file']
+        new_points = dict(points)
+        store.unmap()  # Windows cannot resize a mapped file
+        with open(folder / data_file, 'r+b') as f:
+            f.seek(records * RECORD_SIZE)
+            for key in sorted(runs):
+                timestamps, values = runs[key]
+                f.write(_interleave(timestamps, values))
+                new_points[key] = _entry(records, timestamps)
+                records += len(timestamps)
+            f.truncate()
+            f.flush()
+            os.fsync(f.fileno())
+
+    new_index = {
+        'version': INDEX_VERSION,
+        'generation': generation,
+        'data_file': data_file,
+        'records': records,
+        'points': new_points,
+        'sources': sources,
+        'updated': time.time(),
+    }
+    tmp_path = folder / f"{INDEX_FILE}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        marshal.dump(new_index, f)
+    old_file = index.get('data_file')
+    store.unmap()
+    os.replace(tmp_path, folder / INDEX_FILE)
+    store.load()
+    if compact and old_file and old_file != data_file:
+        try:
+            os.remove(folder / old_file)
+        except OSError as e:  # still mapped by another process (Windows)
+            logger.debug("Old store file kept: %s", e)
+    logger.info("Trend store %s: %d points, %d records (%s)", folder, len(new_points), records,
+                'rewritten' if compact else f'{len(runs)} runs appended')
+
+
+def _entry(position: int, timestamps: array) -> Tuple[int, int, float, float]:
+    if not timestamps:
+        return (position, 0, 0.0, 0.0)
+    return (position, len(timestamps), timestamps[0], timestamps[-1])
+
+
+# ============================================================================
+# CLI
+# ============================================================================
+if __name__ == '__main__':
+    import argparse
+
+    from utils import safe_print, print_header, setup_console_encoding
+
+    setup_console_encoding()
+
+    parser = argparse.ArgumentParser(description='Trend Store v2.0')
+    parser.add_argument('command', choices=['ingest', 'read', 'bench'])
+    parser.add_argument('--district', required=True)
+    parser.add_argument('--output', type=str, help='Output root (as for download_niagara_fast --output)')
+    parser.add_argument('--point', type=str, help='Point path or file stem (read)')
+    parser.add_argument('--start', type=str, help='YYYY-MM-DD[ HH:MM]')
+    parser.add_argument('--end', type=str, help='YYYY-MM-DD[ HH:MM]')
+    parser.add_argument('--force', action='store_true', help='Rebuild the store (ingest)')
+    args = parser.parse_args()
+
+    trend_store = TrendStore(args.output)
+    if args.command == 'ingest':
+        began = time.perf_counter()
+        counts = trend_store.ingest(args.district, force=args.force)
+        safe_print(f"Ingested {counts['files']} files, {counts['points']} points updated, "
+                   f"{counts['records']:,} records ({time.perf_counter() - began:.1f}s)")
+    elif args.command == 'read':
+        if not args.point:
+            parser.error("read needs --point")
+        found = trend_store.read(args.district, args.point, args.start, args.end)
+        if found is None:
+            safe_print(f"{args.point} is not in the store")
+        else:
+            for ts, value in zip(found.timestamps, found.values):
+                safe_print(f"{datetime.fromtimestamp(ts).isoformat(sep=' ')},{value}")
+    else:
+        keys = trend_store.points(args.district)
+        if not keys:
+            safe_print("Store is empty; run ingest first")
+            raise SystemExit(1)
+        print_header(f"TREND STORE BENCH: {args.district} ({len(keys)} points)")
+        began = time.perf_counter()
+        one = trend_store.read(args.district, keys[0])
+        safe_print(f"  one point, all records: {len(one):,} in {(time.perf_counter() - began) * 1000:.2f} ms")
+        first, last, _ = trend_store.span(args.district, keys[0])
+        hour_start = last - 3600
+        began = time.perf_counter()
+        hour = trend_store.read_many(args.district, start=hour_start, end=last + 1)
+        safe_print(f"  same hour, every point: {sum(len(s) for s in hour.values()):,} records from "
+                   f"{len(hour)} points in {(time.perf_counter() - began) * 1000:.2f} ms")
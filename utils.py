@@ -8,14 +8,23 @@ Consolidates duplicated code from multiple modules into a single source.
 ================================================================================
 """
 
+import os
+import re
 import sys
-from typing import Any
+import threading
+from pathlib import Path
+from typing import Any, List, Optional, Set, Tuple, Union
 
 # ============================================================================
 # VERSION
 # ============================================================================
 APP_VERSION = "2.0"
 
+# ============================================================================
+# PATHS
+# ============================================================================
+CACHE_DIR = Path(__file__).parent / ".cache"
+
 # ============================================================================
 # ASCII-SAFE SYMBOLS (for Windows console compatibility)
 # ============================================================================
@@ -83,3 +92,151 @@ def standardize_filename(point_path: str) -> str:
     for char in '<>:"|?*':
         filename = filename.replace(char, '_')
     return filename
+
+
+def point_key(point: str) -> str:
+    """
+    Key of a point in the local stores: its CSV file stem.
+
+    Args:
+        point: Point path ('/Station/History'), file name or file stem
+
+    Returns:
+        File stem (e.g. 'Station_History')
+    """
+    if point.endswith('.csv'):
+        return point[:-4]
+    return standardize_filename(point) if '/' in point else point
+
+
+# ============================================================================
+# DOWNLOAD FOLDER LAYOUT
+# ============================================================================
+# <district folder>/YYYY-MM-DD/<point>.csv           regular downloads
+# <district folder>/backfill/YYYY-MM-DD/<point>.csv  new-point backfill
+# <district folder>/backfill/gaps/YYYY-MM-DD/...     gap fill (gap_fill)
+DATE_FOLDER_RE = re.compile(r'^\d{4}-\d{2}-\d{2}$')
+BACKFILL_SUBFOLDER = "backfill"
+GAP_FILL_SUBFOLDER = "gaps"
+
+
+def district_output_folder(district: str, output_dir: Optional[str] = None) -> Path:
+    """
+    Folder holding a district's date folders, as the downloader uses it.
+
+    Args:
+        district: District name
+        output_dir: Output root given on the command line (--output)
+
+    Returns:
+        output_dir/DISTRICT, else the district's trend folder from the
+        config, else output/DISTRICT next to the scripts
+    """
+    district = district.upper()
+    if output_dir:
+        return Path(output_dir) / district
+    from district_registry import get_district
+
+    record = get_district(district)
+    if record is not None and record.trend_folder:
+        return Path(record.trend_folder)
+    return Path(__file__).parent / 'output' / district
+
+
+def download_files(district_folder: Union[str, Path]) -> List[Tuple[str, str]]:
+    """
+    Downloaded CSVs of a district, oldest date folder first.
+
+    Args:
+        district_folder: Folder holding the district's date folders
+
+    Returns:
+        (date folder name, file path) pairs
+    """
+    files: List[Tuple[str, str]] = []
+    backfill = os.path.join(district_folder, BACKFILL_SUBFOLDER)
+    for base in (str(district_folder), backfill, os.path.join(backfill, GAP_FILL_SUBFOLDER)):
+        try:
+            days = [e for e in os.scandir(base) if e.is_dir() and DATE_FOLDER_RE.match(e.name)]
+        except OSError:
+            continue
+        for day in days:
+            with os.scandir(day.path) as entries:
+                files.extend((day.name, e.path) for e in entries if e.name.endswith('.csv'))
+    files.sort()
+    return files
+
+
+# ============================================================================
+# ATOMIC FILE WRITES
+# ============================================================================
+PART_SUFFIX = ".part"  # in-progress writes; never counted as downloaded
+
+
+def fsync_directory(directory: Union[str, Path]) -> None:
+    """Flush a directory's entries to disk (renames into it survive a crash).
+
+    No-op on Windows, where directories cannot be opened for fsync and NTFS
+    journals renames itself.
+    """
+    if os.name == 'nt':
+        return
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def atomic_write(path: Union[str, Path], data: bytes, fsync: bool = True) -> None:
+    """
+    Write a file so it is either complete or absent, never truncated.
+
+    Writes to '<path>.part', optionally fsyncs it, then renames it over
+    path. The directory entry itself is flushed by DirectorySyncer (batched)
+    or not at all.
+
+    Args:
+        path: Destination file
+        data: File content
+        fsync: Flush the content to disk before the rename
+    """
+    tmp_path = f"{path}{PART_SUFFIX}"
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+        if fsync:
+            f.flush()
+            os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+class DirectorySyncer:
+    """Batches directory fsyncs: one per `every` writes instead of one per file."""
+
+    def __init__(self, every: int = 200) -> None:
+        self.every = every
+        self._dirty: Set[str] = set()
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    def wrote(self, directory: Union[str, Path]) -> None:
+        """Note a rename into directory; syncs when the batch is full."""
+        with self._lock:
+            self._dirty.add(str(directory))
+            self._pending += 1
+            full = self.every > 0 and self._pending >= self.every
+        if full:
+            self.flush()
+
+    def flush(self) -> None:
+        """Sync every directory written to since the last flush."""
+        with self._lock:
+            dirty, self._dirty = self._dirty, set()
+            self._pending = 0
+        for directory in dirty:
+            fsync_directory(directory)
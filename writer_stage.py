@@ -0,0 +1,151 @@
+"""
+================================================================================
+NIAGARA WRITER STAGE v2.0
+================================================================================
+Bounded disk-writer stage for the download engine.
+
+Network workers hand each downloaded buffer to a small pool of writer
+threads instead of writing it themselves, so a slow output folder (D:\\ or a
+NAS mount) does not hold network connections idle. The queue between the
+two stages is bounded by bytes and by files: when the writers fall behind,
+network workers block in submit() until there is room (backpressure), which
+keeps memory flat.
+
+Both stages are measured so each side can be sized on its own:
+
+    write busy      - seconds writer threads spent writing
+    backpressure    - seconds network workers spent waiting for room
+
+DownloadStats.utilisation() turns these into busy fractions per stage.
+
+USAGE:
+    writer = WriterStage(threads=2)
+    future = writer.submit(filepath, content)   # blocks while full
+    future.result()                             # raises OSError if the write failed
+    writer.close()
+================================================================================
+"""
+
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from typing import Deque, List, Optional, Tuple
+
+from utils import DirectorySyncer, atomic_write
+from logging_config import get_logger
+
+logger = get_logger("writer")
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+WRITER_THREADS = 2                     # minimum; the engine uses max_workers // 2
+MAX_PENDING_BYTES = 64 * 1024 * 1024   # buffered downloads waiting for disk
+MAX_PENDING_FILES = 256
+
+
+# ============================================================================
+# WRITER STAGE
+# ============================================================================
+class WriterStage:
+    """Writer threads fed by a bounded queue of (path, content) jobs."""
+
+    def __init__(
+        self,
+        threads: int = WRITER_THREADS,
+        max_pending_bytes: int = MAX_PENDING_BYTES,
+        max_pending_files: int = MAX_PENDING_FILES,
+        fsync: bool = True,
+        dir_sync: Optional[DirectorySyncer] = None
+    ) -> None:
+        self.threads = max(1, threads)
+        self.max_pending_bytes = max_pending_bytes
+        self.max_pending_files = max_pending_files
+        self.fsync = fsync
+        self.dir_sync = dir_sync
+
+        self._lock = threading.Lock()
+        self._not_empty = threading.Condition(self._lock)  # writers wait here
+        self._not_full = threading.Condition(self._lock)   # network workers wait here
+        self._queue: Deque[Tuple[str, bytes, Future]] = deque()
+        self._pending_bytes = 0
+        self._pending_files = 0  # queued + being written
+        self._closed = False
+
+        self.busy_seconds = 0.0
+        self.blocked_seconds = 0.0
+        self.written = 0
+
+        self._workers: List[threading.Thread] = [
+            threading.Thread(target=self._run, name=f'writer-{i}', daemon=True)
+            for i in range(self.threads)
+        ]
+        for worker in self._workers:
+            worker.start()
+
+    def _full(self, size: int) -> bool:
+        # An oversized buffer still goes through once the queue is empty
+        if not self._pending_files:
+            return False
+        return (self._pending_files >= self.max_pending_files
+                or self._pending_bytes + size > self.max_pending_bytes)
+
+    def submit(self, path: str, data: bytes) -> 'Future[int]':
+        """
+        Queue a file for writing, waiting while the queue is full.
+
+        Args:
+            path: Destination file
+            data: File content
+
+        Returns:
+            Future resolving to the bytes written (or raising the write error)
+        """
+        future: 'Future[int]' = Future()
+        start = time.monotonic()
+        with self._lock:
+            while self._full(len(data)):
+                self._not_full.wait()
+            if self._closed:
+                raise RuntimeError("Writer stage is closed")
+            self.blocked_seconds += time.monotonic() - start
+            self._queue.append((path, data, future))
+            self._pending_bytes += len(data)
+            self._pending_files += 1
+            self._not_empty.notify()
+        return future
+
+    def _run(self) -> None:
+        while True:
+            with self._lock:
+                while not self._queue and not self._closed:
+                    self._not_empty.wait()
+                if not self._queue:
+                    return
+                path, data, future = self._queue.popleft()
+
+            start = time.monotonic()
+            try:
+                atomic_write(path, data, fsync=self.fsync)
+                if self.dir_sync is not None:
+                    self.dir_sync.wrote(os.path.dirname(path))
+                future.set_result(len(data))
+            except Exception as e:
+                future.set_exception(e)
+
+            with self._lock:
+                self.busy_seconds += time.monotonic() - start
+                self.written += 1
+                self._pending_bytes -= len(data)
+                self._pending_files -= 1
+                self._not_full.notify_all()
+
+    def close(self) -> None:
+        """Finish queued writes and stop the writer threads."""
+        with self._lock:
+            self._closed = True
+            self._not_empty.notify_all()
+        for worker in self._workers:
+            worker.join()